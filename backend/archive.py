@@ -0,0 +1,56 @@
+"""
+Archive old finished games.
+
+Moves the rounds of finished games played before a date from the hot
+`rounds` table into `rounds_archive`. On Postgres, archive partitions for
+old years can then be detached. With --pack, the games' rounds are packed
+into one `packed_rounds` row per player instead.
+
+Usage (from the backend directory):
+    python -m archive --before 2024-01-01
+    python -m archive --before 2024-01-01 --pack
+    python -m archive --before 2024-01-01 --detach-before 2020 --compact
+"""
+
+import argparse
+from datetime import datetime
+
+from database import SessionLocal
+from services import ArchiveService, PackService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--before", required=True, type=datetime.fromisoformat,
+                        help="Archive finished games played before this date (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="Games moved per transaction (default: 100)")
+    parser.add_argument("--pack", action="store_true",
+                        help="Pack the games into packed_rounds instead of the archive table")
+    parser.add_argument("--detach-before", type=int, metavar="YEAR",
+                        help="Postgres: detach archive partitions for years before YEAR")
+    parser.add_argument("--compact", action="store_true",
+                        help="VACUUM afterwards to reclaim space")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = ArchiveService(db)
+        if args.pack:
+            result = PackService(db).pack_games(args.before, args.batch_size)
+            print(f"Packed {result['games']} games ({result['rounds']} rounds)")
+        else:
+            result = service.archive_games(args.before, args.batch_size)
+            print(f"Archived {result['games']} games ({result['rounds']} rounds)")
+        if args.detach_before:
+            for name in service.detach_partitions(args.detach_before):
+                print(f"Detached partition {name}")
+        if args.compact:
+            service.compact()
+            print("Compacted database")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Micro-benchmarks for Parvis backend.
+
+Run from the backend directory, e.g. `python -m benchmarks.bench_metrics`.
+"""
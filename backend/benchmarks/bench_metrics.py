@@ -0,0 +1,62 @@
+"""
+Benchmark the per-request overhead of MetricsMiddleware.
+
+Drives a minimal ASGI app directly (no HTTP, no FastAPI routing) with and
+without the middleware and reports the difference per request. Exits
+non-zero if the overhead exceeds the 50us budget.
+
+Usage:
+    python -m benchmarks.bench_metrics [iterations]
+"""
+
+import asyncio
+import sys
+import time
+
+from observability.metrics import MetricsMiddleware, MetricsRegistry
+
+BUDGET_US = 50.0
+
+
+class _Route:
+    path = "/games/{game_id}/rounds"
+
+
+async def _app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"x" * 512})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+async def _drive(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/games/1/rounds"}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), _receive, _send)
+    return time.perf_counter() - started
+
+
+def main(iterations: int = 200_000) -> int:
+    instrumented = MetricsMiddleware(_app, registry=MetricsRegistry())
+
+    # Best of three to smooth out scheduler noise
+    baseline = min(asyncio.run(_drive(_app, iterations)) for _ in range(3))
+    measured = min(asyncio.run(_drive(instrumented, iterations)) for _ in range(3))
+
+    overhead_us = (measured - baseline) / iterations * 1e6
+    print(f"baseline:     {baseline / iterations * 1e6:8.2f} us/request")
+    print(f"instrumented: {measured / iterations * 1e6:8.2f} us/request")
+    print(f"overhead:     {overhead_us:8.2f} us/request (budget {BUDGET_US:.0f} us)")
+    return 0 if overhead_us < BUDGET_US else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
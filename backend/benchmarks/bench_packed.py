@@ -0,0 +1,101 @@
+"""
+Benchmark packed storage of finished games against per-cell rows.
+
+Seeds a SQLite file with finished games, then measures the database size
+and the time of the whole-game and player-history reads (game rounds,
+game stats, player stats, bet distribution) before and after packing
+every game with `PackService.pack_games`.
+
+Usage:
+    python -m benchmarks.bench_packed [games] [iterations]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from database import Base, Game, GamePlayer, Player, Round, engine_options
+from services import GameService, PackService, PlayerService, RoundService
+
+PLAYERS = 6
+ROUNDS = 20
+
+
+def _seed(db: Session, games: int) -> None:
+    db.add_all([Player(id=p, alias=f"p{p}") for p in range(1, PLAYERS + 1)])
+    started = datetime(2020, 1, 1)
+    db.execute(insert(Game), [
+        {"id": g, "total_rounds": ROUNDS, "current_round": ROUNDS, "is_active": False,
+         "is_valid": True, "date": started + timedelta(hours=g)}
+        for g in range(1, games + 1)
+    ])
+    db.execute(insert(GamePlayer), [
+        {"game_id": g, "player_id": p} for g in range(1, games + 1) for p in range(1, PLAYERS + 1)
+    ])
+    db.execute(insert(Round), [
+        {"game_id": g, "round_number": r, "player_id": p, "bet": (g + r + p) % 6,
+         "success": (g * r + p) % 3 == 0, "score": 10 + (g + r + p) % 6 if (g * r + p) % 3 == 0 else 0}
+        for g in range(1, games + 1) for r in range(1, ROUNDS + 1) for p in range(1, PLAYERS + 1)
+    ])
+    db.commit()
+
+
+def _size(db: Session, path: str) -> int:
+    db.execute(text("VACUUM"))
+    return os.path.getsize(path)
+
+
+def _time(call, iterations: int) -> float:
+    call()  # warm up
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def _reads(db: Session, games: int, iterations: int) -> dict:
+    sample = range(1, games + 1, max(1, games // 20))
+    return {
+        "game rounds (x20)": _time(lambda: [RoundService(db).get_game_rounds(g) for g in sample], iterations),
+        "game stats (x20)": _time(lambda: [GameService(db).get_game_stats(g) for g in sample], iterations),
+        "player stats": _time(lambda: PlayerService(db).get_player_stats(1), iterations),
+        "bet distribution": _time(lambda: PlayerService(db).get_bet_distribution(1), iterations),
+    }
+
+
+def main(games: int = 2000, iterations: int = 10) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        url = f"sqlite:///{path}"
+        engine = create_engine(url, **engine_options(url))
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            _seed(db, games)
+            rows_size = _size(db, path)
+            rows_reads = _reads(db, games, iterations)
+
+            PackService(db).pack_games(before=datetime.utcnow())
+            packed_size = _size(db, path)
+            packed_reads = _reads(db, games, iterations)
+        engine.dispose()
+
+    print(f"{games} finished games, {PLAYERS} players x {ROUNDS} rounds, median of {iterations} runs")
+    print(f"database size:     rows {rows_size / 1024:8.0f} KiB   packed {packed_size / 1024:8.0f} KiB "
+          f"({rows_size / packed_size:.1f}x)")
+    for name, before in rows_reads.items():
+        after = packed_reads[name]
+        print(f"{name:19}rows {before:8.2f} ms    packed {after:8.2f} ms ({before / after:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
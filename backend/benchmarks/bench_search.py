@@ -0,0 +1,88 @@
+"""
+Benchmark indexed player search (`PlayerSearch.search`) on SQLite.
+
+Seeds a SQLite file with players whose names are drawn from a small pool
+of common first and last names (so prefixes like "han" match thousands
+of players), then reports the p50 and p95 latency of typical queries:
+alias prefixes, name prefixes, full names and typos.
+
+Usage:
+    python -m benchmarks.bench_search [players] [iterations]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from database import Base, Player, engine_options
+from services import PlayerSearch
+
+FIRST_NAMES = [
+    "Kari", "Ola", "Per", "Anne", "Lars", "Ingrid", "Jon", "Marit", "Erik", "Liv",
+    "Nils", "Randi", "Knut", "Sigrid", "Bjørn", "Hilde", "Tor", "Solveig", "Arne", "Åse",
+]
+LAST_NAMES = [
+    "Hansen", "Johansen", "Olsen", "Larsen", "Andersen", "Pedersen", "Nilsen", "Kristiansen",
+    "Jensen", "Karlsen", "Johnsen", "Pettersen", "Eriksen", "Berg", "Haugen", "Hagen",
+]
+QUERIES = ["kari", "han", "ola hansen", "per b", "nilsen", "p12345", "johanson", "kristiansne", "zzz"]
+
+
+def _seed(db: Session, players: int) -> None:
+    rng = random.Random(1)
+    started = datetime(2020, 1, 1)
+    rows = []
+    for p in range(1, players + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append({
+            "id": p, "alias": f"{first.lower()}{p}", "first_name": first,
+            "middle_name": rng.choice(FIRST_NAMES) if p % 4 == 0 else None, "last_name": last,
+            "last_game_date": started + timedelta(minutes=rng.randrange(2_000_000)) if p % 3 else None,
+        })
+    for start in range(0, players, 10_000):
+        db.execute(insert(Player), rows[start:start + 10_000])
+    db.commit()
+
+
+def _latencies(db: Session, q: str, iterations: int) -> list:
+    search = PlayerSearch(db)
+    search.search(q)  # warm up
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        search.search(q)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main(players: int = 100_000, iterations: int = 50) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        url = f"sqlite:///{path}"
+        engine = create_engine(url, **engine_options(url))
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            _seed(db, players)
+            results = {q: _latencies(db, q, iterations) for q in QUERIES}
+        engine.dispose()
+
+    print(f"{players} players, limit 20, {iterations} runs per query")
+    every = []
+    for q, samples in results.items():
+        every.extend(samples)
+        p50, p95 = statistics.quantiles(samples, n=20)[9], statistics.quantiles(samples, n=20)[18]
+        print(f"{q!r:16} p50 {p50:6.2f} ms   p95 {p95:6.2f} ms")
+    print(f"{'all queries':16} p95 {statistics.quantiles(every, n=20)[18]:6.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
@@ -0,0 +1,82 @@
+"""
+Benchmark response serialization for a large rounds list.
+
+Serves the same 10k round rows (from a column-only select on in-memory
+SQLite) through two routes: the default `response_model` path, and
+`fast_json_response`. Both routes return pre-fetched rows, so the
+difference is validation plus encoding.
+
+Usage:
+    python -m benchmarks.bench_serialization [rows] [iterations]
+"""
+
+import statistics
+import sys
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from database import Base, Game, Player, Round
+from models import Round as RoundSchema
+from services.pack_service import ROUND_COLUMNS
+from utils import fast_json_response
+
+
+def _rows(count: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([Player(id=i, alias=f"p{i}") for i in range(1, 9)])
+        games = count // 80 + 1
+        db.add_all([Game(id=g, total_rounds=10) for g in range(1, games + 1)])
+        db.execute(insert(Round), [
+            {
+                "game_id": 1 + i // 80, "round_number": 1 + (i // 8) % 10, "player_id": 1 + i % 8,
+                "bet": i % 5, "success": i % 3 == 0, "score": 10 + i % 5 if i % 3 == 0 else 0
+            }
+            for i in range(count)
+        ])
+        db.commit()
+        return db.execute(select(*ROUND_COLUMNS)).all()
+
+
+def _time(client: TestClient, path: str, iterations: int) -> float:
+    client.get(path)  # warm up
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(path)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main(count: int = 10_000, iterations: int = 20) -> int:
+    rows = _rows(count)
+    app = FastAPI()
+
+    @app.get("/default", response_model=List[RoundSchema])
+    def default():
+        return rows
+
+    @app.get("/fast", response_model=List[RoundSchema])
+    def fast():
+        return fast_json_response(rows, RoundSchema)
+
+    client = TestClient(app)
+    assert client.get("/default").content == client.get("/fast").content
+
+    before = _time(client, "/default", iterations)
+    after = _time(client, "/fast", iterations)
+    print(f"{count} rounds, median of {iterations} requests")
+    print(f"response_model: {before:8.2f} ms")
+    print(f"fast path:      {after:8.2f} ms ({before / after:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
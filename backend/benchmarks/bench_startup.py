@@ -0,0 +1,68 @@
+"""
+Measure cold start: importing the app plus serving the first request.
+
+Each run is a fresh interpreter against a migrated SQLite database, so the
+numbers match a worker (re)start on a small host. Exits non-zero if the
+median total exceeds the budget; CI runs it on every push.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BUDGET_MS = 2000.0
+
+_CHILD = """
+import json, time
+started = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    assert client.get("/games").status_code == 200
+    first = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (first - ready) * 1000,
+}))
+"""
+
+
+def _run_once(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to time (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help=f"Maximum median import + first request (default: {BUDGET_MS:.0f})")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'parvis.db')}")
+        env.pop("DATABASE_REPLICA_URL", None)
+        subprocess.run([sys.executable, "-m", "migrate"], env=env, check=True, capture_output=True)
+        runs = [_run_once(env) for _ in range(args.runs)]
+
+    for key in ("import_ms", "startup_ms", "first_request_ms"):
+        print(f"{key:18} median {statistics.median(r[key] for r in runs):8.1f} ms")
+    total = statistics.median(sum(r.values()) for r in runs)
+    print(f"{'total':18} median {total:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+    return 0 if total <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
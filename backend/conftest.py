@@ -0,0 +1,63 @@
+"""
+Shared pytest fixtures for Parvis backend tests.
+
+Tests run against an in-memory SQLite database. The application's
+SessionLocal and ReadSessionLocal are rebound to it, so every code path
+that opens a session (request dependencies included) talks to the test
+database.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+
+from database import Base, SessionLocal, ReadSessionLocal
+from observability import assert_max_queries, install_query_listeners
+
+
+test_engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+install_query_listeners(test_engine)
+SessionLocal.configure(bind=test_engine)
+ReadSessionLocal.configure(bind=test_engine)
+
+
+@pytest.fixture
+def engine():
+    """Fresh schema for every test."""
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    yield test_engine
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(engine):
+    from main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def query_budget(engine):
+    """
+    Assert a maximum number of SQL statements for a block.
+
+    Usage:
+        with query_budget(3):
+            client.get("/players")
+    """
+    def budget(max_queries: int):
+        return assert_max_queries(engine, max_queries)
+    return budget
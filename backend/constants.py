@@ -12,3 +12,10 @@ DEFAULT_GAME_TYPE = "standard"
 # Validation
 MIN_BET = 0
 """Minimum allowed bet value."""
+
+# Maintenance
+DEFAULT_PURGE_BATCH_SIZE = 500
+"""Games deleted per statement by the bulk purge."""
+
+PURGE_SAMPLE_SIZE = 20
+"""Game IDs listed in a purge report."""
@@ -1,14 +1,68 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Table
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import create_engine, event, false, text, BigInteger, Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Table, Index, JSON, LargeBinary
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker, relationship
+from starlette.requests import Request
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Iterable, Iterator, Optional
 import os
+import sys
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://parvis:parvis@db:5432/parvis")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")  # Optional read-only replica
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+"""How long after a write a client's reads stay on the primary."""
 
-engine = create_engine(DATABASE_URL)
+LAST_WRITE_COOKIE = "parvis_last_write"
+READ_ONLY_SCOPE_KEY = "parvis.read_only"
+"""Set in the ASGI scope by non-GET routes that did not write (e.g. read-only batches)."""
+
+# SQLite mode (DATABASE_URL=sqlite:////data/parvis.db), for single-box deployments
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+
+def engine_options(url: str) -> dict:
+    """Extra create_engine arguments for the given database URL."""
+    if url.startswith("sqlite"):
+        # Sessions are used from FastAPI's threadpool and the cell-buffer thread
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {}
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+read_engine = (
+    create_engine(DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL))
+    if DATABASE_REPLICA_URL else engine
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+@event.listens_for(Engine, "connect")
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite settings.
+    
+    Foreign keys (and ON DELETE CASCADE) are off unless enabled. WAL lets
+    readers run alongside the single writer, and synchronous=NORMAL is safe
+    under WAL (a power cut can lose the last commits, never corrupt). The
+    busy timeout makes writers queue instead of failing with "database is
+    locked". In-memory databases ignore the journal and mmap settings.
+    """
+    sqlite3 = sys.modules.get("sqlite3")  # Only loaded once a SQLite engine is in use
+    if sqlite3 is not None and isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
 # Association table for parent-child relationships
 player_parents = Table(
     'player_parents',
@@ -28,6 +82,7 @@ class Player(Base):
     birthdate = Column(Date)
     registration_date = Column(Date, default=datetime.utcnow)
     last_game_date = Column(DateTime, nullable=True)  # Track most recent game
+    updated_seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # Set by the sync triggers
     
     # Relationships
     game_participations = relationship("GamePlayer", back_populates="player")
@@ -54,39 +109,517 @@ class Game(Base):
     current_round = Column(Integer, default=1)
     is_active = Column(Boolean, default=True)
     is_valid = Column(Boolean, default=False)  # Only true when finished successfully
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every update
+    is_archived = Column(Boolean, nullable=False, default=False, server_default=false())  # Rounds live in rounds_archive
+    is_packed = Column(Boolean, nullable=False, default=False, server_default=false())  # Rounds live in packed_rounds
+    rounds_detached = Column(Boolean, nullable=False, default=False, server_default=false())  # Archive partition detached
+    updated_seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # Set by the sync triggers
     
-    players = relationship("GamePlayer", back_populates="game")
-    rounds = relationship("Round", back_populates="game")
+    # Children are removed by ON DELETE CASCADE in the database
+    players = relationship("GamePlayer", back_populates="game", passive_deletes=True)
+    rounds = relationship("Round", back_populates="game", passive_deletes=True)
 
 class GamePlayer(Base):
     __tablename__ = "game_players"
     
-    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
     player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    updated_seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # Set by the sync triggers
     
     game = relationship("Game", back_populates="players")
     player = relationship("Player", back_populates="game_participations")
 
 class Round(Base):
     __tablename__ = "rounds"
+    __table_args__ = (
+        # One cell per (game, round, player); the conflict target for upserts
+        Index("uq_rounds_cell", "game_id", "round_number", "player_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    game_id = Column(Integer, ForeignKey("games.id"), nullable=False)
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False, index=True)
     round_number = Column(Integer, nullable=False)
     player_id = Column(Integer, ForeignKey("players.id"), nullable=False)
     bet = Column(Integer, nullable=False)
     success = Column(Boolean, nullable=False)
     score = Column(Integer)  # Calculated: (10 + bet) if success else 0
+    updated_seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # Set by the sync triggers
     
     game = relationship("Game", back_populates="rounds")
     player = relationship("Player", back_populates="rounds")
 
+class ArchivedRound(Base):
+    """
+    Rounds of old finished games, moved out of the hot `rounds` table.
+    
+    On Postgres the table is range-partitioned by game_date (one partition
+    per year, created by the archive command), so time-filtered stats only
+    touch the relevant years. On SQLite it is a plain table.
+    """
+    __tablename__ = "rounds_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (game_date)"}
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Original rounds.id
+    game_date = Column(DateTime, primary_key=True)  # Partition key (copied from games.date)
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False, index=True)
+    round_number = Column(Integer, nullable=False)
+    player_id = Column(Integer, ForeignKey("players.id"), nullable=False, index=True)
+    bet = Column(Integer, nullable=False)
+    success = Column(Boolean, nullable=False)
+    score = Column(Integer)
+
+class PackedRounds(Base):
+    """
+    All rounds of one player in a finished game, packed into a single row.
+    
+    `bets` holds one little-endian int16 per round (-1 where the player has
+    no round), `success` one bit per round and `round_ids` the original
+    rounds.id values as int32, so unpacking restores the rows exactly. The
+    aggregates are precomputed for player statistics. See
+    services/pack_service.py.
+    """
+    __tablename__ = "packed_rounds"
+    
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True, index=True)
+    bets = Column(LargeBinary, nullable=False)
+    success = Column(LargeBinary, nullable=False)
+    round_ids = Column(LargeBinary, nullable=False)
+    rounds_played = Column(Integer, nullable=False)
+    successful_bets = Column(Integer, nullable=False)
+    bet_sum = Column(Integer, nullable=False)
+    total_score = Column(Integer, nullable=False)
+
+class SyncState(Base):
+    """
+    State of the global change sequence used by `GET /sync` (a single row).
+    
+    On SQLite, triggers on the synced tables bump `seq` and stamp the
+    changed row's updated_seq with it (see `install_sync_triggers`); there
+    is only one writer at a time, so changes commit in sequence order.
+    
+    On Postgres a shared counter row would serialize every write. There a
+    change is stamped with its transaction ID plus `seq`, which stays fixed
+    as the offset above all stamps from before, and `change_head` only
+    reports numbers below the oldest transaction still running. A cursor
+    therefore never skips a change that commits later with a lower number.
+    """
+    __tablename__ = "sync_state"
+    
+    id = Column(Integer, primary_key=True)
+    seq = Column(BigInteger, nullable=False, default=0)
+
+class SyncTombstone(Base):
+    """A deleted game or player, so syncing clients can drop it (and its rounds)."""
+    __tablename__ = "sync_tombstones"
+    
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)  # "game" or "player"
+    entity_id = Column(Integer, nullable=False)
+    updated_seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # Set by the sync triggers
+
+class AppliedSyncOp(Base):
+    """An offline edit applied by `POST /sync`; replays of the same op_id are skipped."""
+    __tablename__ = "sync_applied_ops"
+    
+    op_id = Column(String, primary_key=True)  # Generated by the client
+    applied_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class GameEvent(Base):
+    """
+    Append-only log of changes to a game's state (see services/event_log.py).
+    
+    Events are written in the same transaction as the change they describe.
+    `seq` is taken from the global change sequence by a trigger, like
+    updated_seq; events written by one transaction may share it. Readers
+    stop at `change_head`, so a replay checkpoint never skips an event
+    that committed late. Events outlive their game; its
+    deletion is an event too.
+    """
+    __tablename__ = "game_events"
+    __table_args__ = (
+        Index("ix_game_events_game_seq", "game_id", "seq"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    seq = Column(BigInteger, nullable=False, server_default="0", index=True)  # Set by a trigger
+    game_id = Column(Integer, nullable=False)  # No foreign key: events stay after the game is deleted
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class GameSnapshot(Base):
+    """A game's state folded from its events up to and including `seq`."""
+    __tablename__ = "game_snapshots"
+    
+    game_id = Column(Integer, primary_key=True)
+    seq = Column(BigInteger, primary_key=True)
+    state = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class EventCheckpoint(Base):
+    """How far a derived store has consumed the event log (see `EventLog.run_projection`)."""
+    __tablename__ = "event_checkpoints"
+    
+    name = Column(String, primary_key=True)
+    seq = Column(BigInteger, nullable=False, default=0)
+
+class Job(Base):
+    """
+    Durable queue of background work (see services/job_queue.py).
+    
+    At most one pending job per dedup_key, so enqueueing the same work
+    twice before it runs is a no-op. A running job whose lease expired
+    (its worker died) is claimed again.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "priority", "id"),
+        Index(
+            "uq_jobs_pending_dedup", "dedup_key", unique=True,
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'")
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    args = Column(JSON, nullable=False)
+    dedup_key = Column(String, nullable=True)
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lease_expires_at = Column(DateTime, nullable=True)
+    progress = Column(JSON, nullable=True)  # {"done", "total", "message"}
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+SYNC_TABLES = ("players", "games", "game_players", "rounds", "sync_tombstones")
+"""Tables whose rows carry updated_seq, stamped by triggers on every insert and update."""
+
+_PG_CHANGE_SEQ = """
+    CREATE OR REPLACE FUNCTION parvis_change_seq() RETURNS bigint AS $$
+        SELECT pg_current_xact_id()::text::bigint + seq FROM sync_state WHERE id = 1
+    $$ LANGUAGE sql
+"""
+"""Sequence number of the current transaction's changes; reads sync_state without locking it."""
+
+_PG_SYNC_FUNCTIONS = (
+    _PG_CHANGE_SEQ,
+    """
+    CREATE OR REPLACE FUNCTION parvis_sync_stamp() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_seq := parvis_change_seq();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION parvis_sync_touch_player() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE players SET updated_seq = updated_seq WHERE id = OLD.player_id;
+        ELSE
+            UPDATE players SET updated_seq = updated_seq WHERE id = NEW.player_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+)
+
+def _sync_trigger_ddl(table: str, dialect: str) -> list:
+    """Statements creating (or replacing) the sync triggers of one table."""
+    if table == "game_events":
+        # Numbered once, on insert; the log is append-only
+        if dialect == "postgresql":
+            return [
+                _PG_CHANGE_SEQ,
+                """
+                CREATE OR REPLACE FUNCTION parvis_event_seq() RETURNS trigger AS $$
+                BEGIN
+                    NEW.seq := parvis_change_seq();
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                "DROP TRIGGER IF EXISTS game_events_seq ON game_events",
+                "CREATE TRIGGER game_events_seq BEFORE INSERT ON game_events "
+                "FOR EACH ROW EXECUTE FUNCTION parvis_event_seq()",
+            ]
+        return [
+            "CREATE TRIGGER IF NOT EXISTS game_events_seq AFTER INSERT ON game_events BEGIN "
+            "UPDATE sync_state SET seq = seq + 1; "
+            "UPDATE game_events SET seq = (SELECT seq FROM sync_state) WHERE rowid = NEW.rowid; END"
+        ]
+    if dialect == "postgresql":
+        if table == "player_parents":
+            return list(_PG_SYNC_FUNCTIONS) + [
+                "DROP TRIGGER IF EXISTS player_parents_sync_touch ON player_parents",
+                "CREATE TRIGGER player_parents_sync_touch AFTER INSERT OR DELETE ON player_parents "
+                "FOR EACH ROW EXECUTE FUNCTION parvis_sync_touch_player()",
+            ]
+        return list(_PG_SYNC_FUNCTIONS) + [
+            f"DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}",
+            f"CREATE TRIGGER {table}_sync_stamp BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION parvis_sync_stamp()",
+        ]
+    
+    # SQLite has no sequences or BEFORE-trigger assignments: bump the counter
+    # and stamp the row after the fact. recursive_triggers is off, so the
+    # stamping UPDATE does not fire the update trigger again.
+    if table == "player_parents":
+        # Parent links are part of the player row clients see
+        return [
+            f"CREATE TRIGGER IF NOT EXISTS player_parents_sync_{event} AFTER {event.upper()} "
+            f"ON player_parents BEGIN "
+            f"UPDATE players SET updated_seq = updated_seq WHERE id = {row}.player_id; END"
+            for event, row in (("insert", "NEW"), ("delete", "OLD"))
+        ]
+    stamp = (
+        "UPDATE sync_state SET seq = seq + 1; "
+        f"UPDATE {table} SET updated_seq = (SELECT seq FROM sync_state) WHERE rowid = NEW.rowid;"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON {table} BEGIN {stamp} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE ON {table} "
+        f"WHEN NEW.updated_seq = OLD.updated_seq BEGIN {stamp} END",
+    ]
+
+SEQUENCED_TABLES = SYNC_TABLES + ("player_parents", "game_events")
+"""Tables with triggers drawing from the global change sequence."""
+
+def install_sync_triggers(conn: Connection, tables: Iterable[str] = SEQUENCED_TABLES) -> None:
+    """
+    Create the triggers that stamp updated_seq (idempotent).
+    
+    New tables get them from create_all; existing databases from the
+    `add_sync_sequence` migration.
+    """
+    for table in tables:
+        for statement in _sync_trigger_ddl(table, conn.dialect.name):
+            conn.execute(text(statement))
+
+def change_head(db: Session) -> int:
+    """
+    Highest change sequence number up to which every change is settled.
+    
+    No change numbered at or below it can still commit, so readers cap
+    their cursors here. On Postgres, changes of one transaction share a
+    number and those of transactions still running are held back; on
+    SQLite this is the counter itself.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return db.scalar(text(
+            "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint - 1 + seq "
+            "FROM sync_state WHERE id = 1"
+        )) or 0
+    return db.scalar(text("SELECT seq FROM sync_state WHERE id = 1")) or 0
+
+def _create_sync_triggers(table, connection, **kw):
+    install_sync_triggers(connection, [table.name])
+
+for _table in SEQUENCED_TABLES:
+    event.listen(Base.metadata.tables[_table], "after_create", _create_sync_triggers)
+
+@event.listens_for(SyncState.__table__, "after_create")
+def _seed_sync_state(table, connection, **kw):
+    connection.execute(table.insert().values(id=1, seq=0))
+
+PLAYER_SEARCH_TEXT = (
+    "lower(alias || ' ' || coalesce(first_name, '') || ' ' || "
+    "coalesce(middle_name, '') || ' ' || coalesce(last_name, ''))"
+)
+"""Postgres: the names `GET /players/search` matches, as indexed by ix_players_search_trgm."""
+
+_SEARCH_COLUMNS = "alias, first_name, middle_name, last_name"
+
+def _player_search_ddl(dialect: str) -> list:
+    if dialect == "postgresql":
+        return [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_players_alias_prefix ON players (lower(alias) text_pattern_ops)",
+            f"CREATE INDEX IF NOT EXISTS ix_players_search_trgm ON players "
+            f"USING gin (({PLAYER_SEARCH_TEXT}) gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_players_recent ON players "
+            "(last_game_date DESC NULLS LAST, id DESC)",
+        ]
+    # External-content FTS5 index over the players table, with prefix indexes
+    # for 2- and 3-character prefixes, kept in sync by triggers
+    old = ", ".join(f"old.{column}" for column in _SEARCH_COLUMNS.split(", "))
+    new = ", ".join(f"new.{column}" for column in _SEARCH_COLUMNS.split(", "))
+    return [
+        # SQLite sorts NULLs last when descending
+        "CREATE INDEX IF NOT EXISTS ix_players_recent ON players (last_game_date DESC, id DESC)",
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS players_search USING fts5(
+            {_SEARCH_COLUMNS}, content='players', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS players_search_insert AFTER INSERT ON players BEGIN
+            INSERT INTO players_search (rowid, {_SEARCH_COLUMNS}) VALUES (new.id, {new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS players_search_delete AFTER DELETE ON players BEGIN
+            INSERT INTO players_search (players_search, rowid, {_SEARCH_COLUMNS})
+            VALUES ('delete', old.id, {old});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS players_search_update
+        AFTER UPDATE OF {_SEARCH_COLUMNS} ON players BEGIN
+            INSERT INTO players_search (players_search, rowid, {_SEARCH_COLUMNS})
+            VALUES ('delete', old.id, {old});
+            INSERT INTO players_search (rowid, {_SEARCH_COLUMNS}) VALUES (new.id, {new});
+        END
+        """,
+    ]
+
+def install_player_search(conn: Connection, rebuild: bool = False) -> None:
+    """
+    Create the indexes behind `GET /players/search` (idempotent).
+    
+    Both get ix_players_recent (most recent last_game_date first); Postgres
+    also gets pg_trgm indexes, SQLite an FTS5 table kept in sync by
+    triggers. New databases get them from create_all; existing ones from
+    the `add_player_search` migration, which also fills the FTS5 table
+    (`rebuild`).
+    """
+    for statement in _player_search_ddl(conn.dialect.name):
+        conn.execute(text(statement))
+    if rebuild and conn.dialect.name == "sqlite":
+        conn.execute(text("INSERT INTO players_search (players_search) VALUES ('rebuild')"))
+
+@event.listens_for(Player.__table__, "after_create")
+def _create_player_search(table, connection, **kw):
+    install_player_search(connection)
+
+@event.listens_for(Player.__table__, "before_drop")
+def _drop_player_search(table, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS players_search"))
+
+shared_session: ContextVar[Optional[Session]] = ContextVar("shared_session", default=None)
+"""Session every route dependency uses while a `POST /batch` runs its sub-requests."""
+
 def get_db():
+    """Session on the primary, for routes that write."""
+    shared = shared_session.get()
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def _wrote_recently(request: Request) -> bool:
+    """True if this client's last write is recent enough that a replica may lag behind it."""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+def get_read_db(request: Request):
+    """
+    Session for read-only routes.
+    
+    Uses the replica when one is configured, except shortly after the same
+    client wrote something, so clients always read their own writes.
+    """
+    shared = shared_session.get()
+    if shared is not None:
+        yield shared
+        return
+    factory = SessionLocal if _wrote_recently(request) else ReadSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def in_write_batch() -> bool:
+    """True while the sub-requests of a batch with writes run (uncommitted until it ends)."""
+    shared = shared_session.get()
+    return shared is not None and shared.info.get("batch_write", False)
+
+@contextmanager
+def batch_session(request: Request, write: bool) -> Iterator[Session]:
+    """
+    One session shared by all sub-requests of a batch (see `shared_session`).
+    
+    Read-only batches get a read session, chosen like `get_read_db`. Write
+    batches run on the primary inside one outer transaction that commits
+    when the block exits and rolls back if it raises; the services' own
+    commits only release savepoints.
+    """
+    if write:
+        conn = SessionLocal.kw["bind"].connect()
+        transaction = conn.begin()
+        if conn.dialect.name == "sqlite":
+            # pysqlite defers BEGIN to the first write; without it, releasing
+            # the first savepoint would commit
+            conn.exec_driver_sql("BEGIN")
+        db = SessionLocal(bind=conn, join_transaction_mode="create_savepoint")
+        db.info["batch_write"] = True
+    else:
+        factory = SessionLocal if _wrote_recently(request) else ReadSessionLocal
+        conn, transaction, db = None, None, factory()
+    
+    token = shared_session.set(db)
+    try:
+        yield db
+        if transaction is not None:
+            transaction.commit()
+    finally:
+        shared_session.reset(token)
+        db.close()
+        if conn is not None:
+            conn.close()  # Rolls back unless committed
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware stamping a last-write cookie on successful write requests."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_cookie(message):
+            if (message["type"] == "http.response.start" and message["status"] < 400
+                    and not scope.get(READ_ONLY_SCOPE_KEY)):
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={time.time():.3f}; Path=/; "
+                    f"Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; SameSite=Lax"
+                )
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+                }
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cookie)
+
 def init_db():
+    """
+    Create missing tables and apply pending migrations (`python -m migrate`).
+    
+    Returns:
+        (previous schema version, new schema version)
+    """
+    from migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
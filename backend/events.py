@@ -0,0 +1,44 @@
+"""
+Maintain the game event log.
+
+`bootstrap` records the current state of games from before the event log
+as one game_imported event each, so every game can be replayed. `snapshot`
+stores the state of games with many events since their last snapshot, so
+replays start close to the end; run it periodically.
+
+Usage (from the backend directory):
+    python -m events bootstrap
+    python -m events snapshot --min-events 200
+"""
+
+import argparse
+
+from database import SessionLocal
+from services import EventLog
+from services.event_log import DEFAULT_SNAPSHOT_EVERY
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    bootstrap = commands.add_parser("bootstrap", help="Log games that have no events yet")
+    bootstrap.add_argument("--batch-size", type=int, default=100,
+                           help="Games logged per transaction (default: 100)")
+    snapshot = commands.add_parser("snapshot", help="Snapshot games with many new events")
+    snapshot.add_argument("--min-events", type=int, default=DEFAULT_SNAPSHOT_EVERY,
+                          help=f"Events since the last snapshot (default: {DEFAULT_SNAPSHOT_EVERY})")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = EventLog(db)
+        if args.command == "bootstrap":
+            print(f"Logged {service.bootstrap(args.batch_size)} games")
+        else:
+            print(f"Took {service.snapshot_games(args.min_events)} snapshots")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
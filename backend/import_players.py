@@ -0,0 +1,66 @@
+"""
+Import players and family links from a file.
+
+The file is JSON (a list of players, or `{"players": [...]}`, with the
+fields of `POST /players/import`) or CSV with a header row naming those
+fields; in CSV, `parents` holds references separated by ";". Players
+whose alias exists are updated. The whole file is one transaction:
+unknown parents or a cycle in the family tree reject all of it.
+
+Usage (from the backend directory):
+    python -m import_players family.csv
+    python -m import_players reunion.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+from typing import List
+
+from fastapi import HTTPException
+
+from database import SessionLocal
+from models import PlayerImportItem
+from services import PlayerImportService
+
+
+def read_players(path: str) -> List[PlayerImportItem]:
+    """Parse a JSON or CSV import file (by extension)."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            players = []
+            for row in csv.DictReader(f):
+                # Empty cells are omitted, so they leave existing players unchanged
+                fields = {name: value.strip() for name, value in row.items() if value and value.strip()}
+                if "parents" in fields:
+                    fields["parents"] = [ref.strip() for ref in fields["parents"].split(";") if ref.strip()]
+                players.append(fields)
+    else:
+        with open(path, encoding="utf-8") as f:
+            players = json.load(f)
+        if isinstance(players, dict):
+            players = players["players"]
+    return [PlayerImportItem.model_validate(player) for player in players]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="JSON or CSV file of players")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = PlayerImportService(db).import_players(read_players(args.path))
+    except HTTPException as exc:
+        print(f"Import rejected: {exc.detail}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(f"Created {result['created']}, updated {result['updated']}, unchanged {result['unchanged']} players; "
+          f"added {result['parents_added']} and removed {result['parents_removed']} parent links")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
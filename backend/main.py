@@ -1,70 +1,186 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta
+from types import SimpleNamespace
 import os
 
 # Local imports
 import models as schemas
-from database import get_db, init_db, Game
-from services import GameService, PlayerService, RoundService
-
-app = FastAPI(title="Parvis API")
-
-# CORS
-origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from constants import DEFAULT_PURGE_BATCH_SIZE
+from database import (
+    get_db, get_read_db, batch_session, engine, read_engine,
+    ReadYourWritesMiddleware, READ_ONLY_SCOPE_KEY
+)
+from services import (
+    EventLog, GameService, JobQueue, JobRunner, JOB_HANDLERS, PlayerImportService, PlayerSearch,
+    PlayerService, RoundService, SyncService, cell_buffer, game_store
+)
+from utils import (
+    CompressionCache,
+    CompressionMiddleware,
+    FastJSONResponse,
+    MsgpackResponse,
+    WRITE_METHODS,
+    batch_body,
+    read_limited_body,
+    run_batch,
+    negotiated_response,
+    InvalidationBus,
+    MemoryInvalidationBus,
+    PostgresInvalidationBus,
+    set_invalidation_bus,
+    parse_fields,
+    parse_include,
+    response_keys,
+    wants_msgpack
+)
+from observability import (
+    QueryStatsMiddleware,
+    MetricsMiddleware,
+    RequestPathMiddleware,
+    install_query_listeners,
+    install_slow_query_log,
+    metrics_registry
 )
 
-@app.on_event("startup")
-def startup():
-    init_db()
+DEBUG = os.getenv("PARVIS_DEBUG", "false").lower() in ("1", "true", "yes")
+PROFILING = os.getenv("PARVIS_PROFILING", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("PARVIS_SLOW_QUERY_MS", "250"))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("PARVIS_SLOW_QUERY_EXPLAIN_RATE", "0"))
+SLOW_QUERY_PLAN_FILE = os.getenv("PARVIS_SLOW_QUERY_PLAN_FILE", "slow_query_plans.log")
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("PARVIS_SLOW_QUERY_EXPLAIN_ANALYZE", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND = os.getenv("PARVIS_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+FAST_JSON = os.getenv("PARVIS_FAST_JSON", "false").lower() in ("1", "true", "yes")
+COMPRESSION = os.getenv("PARVIS_COMPRESSION", "true").lower() in ("1", "true", "yes")
+COMPRESS_MIN_BYTES = int(os.getenv("PARVIS_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSION_CACHE_MB = float(os.getenv("PARVIS_COMPRESSION_CACHE_MB", "8"))
+PACK_FINISHED = os.getenv("PARVIS_PACK_FINISHED", "false").lower() in ("1", "true", "yes")
+HOT_GAMES = os.getenv("PARVIS_HOT_GAMES", "false").lower() in ("1", "true", "yes")
+BATCH_MAX_REQUESTS = int(os.getenv("PARVIS_BATCH_MAX_REQUESTS", "25"))
+BATCH_MAX_BYTES = int(os.getenv("PARVIS_BATCH_MAX_BYTES", str(64 * 1024)))
+SYNC_PAGE_SIZE = int(os.getenv("PARVIS_SYNC_PAGE_SIZE", "2000"))
+SYNC_MAX_OPS = int(os.getenv("PARVIS_SYNC_MAX_OPS", "500"))
+JOB_WORKERS = int(os.getenv("PARVIS_JOB_WORKERS", "1"))
+INVALIDATION = os.getenv("PARVIS_INVALIDATION", "auto").lower()  # auto, postgres, memory, off
+
+# Engine instrumentation (process-wide, independent of any app instance)
+install_query_listeners(engine)
+if read_engine is not engine:
+    install_query_listeners(read_engine)
+
+slow_query_log = None
+if SLOW_QUERY_MS > 0:  # PARVIS_SLOW_QUERY_MS=0 disables it
+    slow_query_log = install_slow_query_log(
+        engine, SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN_RATE, SLOW_QUERY_PLAN_FILE,
+        SLOW_QUERY_EXPLAIN_ANALYZE
+    )
+    if read_engine is not engine:
+        slow_query_log.install(read_engine)
+
+metrics_registry.register_engine("primary", engine)
+if read_engine is not engine:
+    metrics_registry.register_engine("replica", read_engine)
+
+# Compressed bodies shared by all app instances, so identical payloads compress once
+compression_cache = CompressionCache(int(COMPRESSION_CACHE_MB * 1024 * 1024))
+metrics_registry.register_cache("compression", compression_cache.stats)
+metrics_registry.register_cache("active_games", game_store.stats)
+
+# Opt-in per-request profiling; the route class must be set before routes are declared
+if PROFILING:
+    from observability.profiling import PROFILE_TOKEN, ProfilingRoute
+    if not PROFILE_TOKEN:
+        # Profiles switch on tracemalloc and can write files; never for anyone
+        raise RuntimeError("PARVIS_PROFILING requires PARVIS_PROFILE_TOKEN")
+    route_class = ProfilingRoute
+else:
+    route_class = APIRoute
+
+# Routes are built once and shared by every app from create_app (building
+# them is most of the import time); they look up dependency overrides here
+shared_overrides = SimpleNamespace(dependency_overrides={})
+router = APIRouter(route_class=route_class, dependency_overrides_provider=shared_overrides)
 
 # ============================================================================
 # PLAYERS
 # ============================================================================
 
-@app.get("/players", response_model=List[schemas.PlayerWithRelations])
-def get_players(db: Session = Depends(get_db)):
+PLAYER_INCLUDES = ("stats",)
+GAME_INCLUDES = ("participants", "stats")
+
+
+@router.get("/players", response_model=List[schemas.PlayerWithRelations])
+def get_players(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,alias"),
+    include: Optional[str] = Query(None, description="Comma-separated expansions: stats"),
+    db: Session = Depends(get_db)
+):
     """Get all players with their parent relationships."""
+    field_names = parse_fields(fields, schemas.PlayerWithRelations)
+    expansions = parse_include(include, PLAYER_INCLUDES)
     service = PlayerService(db)
-    return service.get_all_players()
+    players = service.get_all_players(field_names, expansions)
+    keys = response_keys(schemas.PlayerWithRelations, field_names, expansions)
+    return negotiated_response(request, response, players, schemas.PlayerWithRelations, FAST_JSON, keys)
+
+
+@router.get("/players/search", response_model=List[schemas.PlayerSearchResult])
+def search_players(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Find players by prefix or approximate alias and names, best matches first."""
+    service = PlayerSearch(db)
+    return service.search(q, limit)
 
 
-@app.get("/players/{player_id}", response_model=schemas.Player)
+@router.get("/players/{player_id}", response_model=schemas.Player)
 def get_player(player_id: int, db: Session = Depends(get_db)):
     """Get a specific player by ID."""
     service = PlayerService(db)
     return service.get_player(player_id)
 
 
-@app.get("/players/{player_id}/family")
+@router.get("/players/{player_id}/family")
 def get_player_family(player_id: int, db: Session = Depends(get_db)):
     """Get player with parent and child relationships."""
     service = PlayerService(db)
     return service.get_player_family(player_id)
 
 
-@app.put("/players/{player_id}", response_model=schemas.Player)
+@router.put("/players/{player_id}", response_model=schemas.Player)
 def update_player(player_id: int, player: schemas.PlayerCreate, db: Session = Depends(get_db)):
     """Update an existing player."""
     service = PlayerService(db)
     return service.update_player(player_id, player)
 
 
-@app.post("/players", response_model=schemas.Player)
+@router.post("/players", response_model=schemas.Player)
 def create_player(player: schemas.PlayerCreate, db: Session = Depends(get_db)):
     """Create a new player."""
     service = PlayerService(db)
     return service.create_player(player)
 
 
-@app.delete("/players/{player_id}")
+@router.post("/players/import", response_model=schemas.PlayerImportResult)
+def import_players(data: schemas.PlayerImport, db: Session = Depends(get_db)):
+    """Create or update many players and their parent links in one transaction."""
+    service = PlayerImportService(db)
+    return service.import_players(data.players)
+
+
+@router.delete("/players/{player_id}")
 def delete_player(player_id: int, db: Session = Depends(get_db)):
     """Delete a player."""
     service = PlayerService(db)
@@ -75,46 +191,76 @@ def delete_player(player_id: int, db: Session = Depends(get_db)):
 # GAMES
 # ============================================================================
 
-@app.get("/games", response_model=List[schemas.Game])
-def get_games(active_only: bool = False, db: Session = Depends(get_db)):
+@router.get("/games", response_model=List[schemas.Game])
+def get_games(
+    request: Request,
+    response: Response,
+    active_only: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,date"),
+    include: Optional[str] = Query(None, description="Comma-separated expansions: participants, stats"),
+    db: Session = Depends(get_read_db)
+):
     """Get all games, optionally filtering to active games only."""
-    query = db.query(Game)
-    if active_only:
-        query = query.filter(Game.is_active == True)
-    return query.order_by(Game.date.desc()).all()
+    field_names = parse_fields(fields, schemas.Game)
+    expansions = parse_include(include, GAME_INCLUDES)
+    service = GameService(db)
+    games = service.get_games(active_only, field_names, expansions)
+    keys = response_keys(schemas.Game, field_names, expansions)
+    return negotiated_response(request, response, games, schemas.Game, FAST_JSON, keys)
+
+
+@router.post("/games/purge")
+def purge_games(
+    cancelled_older_than_days: Optional[int] = Query(None, ge=0),
+    abandoned_older_than_days: Optional[int] = Query(None, ge=0),
+    dry_run: bool = True,
+    batch_size: int = Query(DEFAULT_PURGE_BATCH_SIZE, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Bulk delete old cancelled and abandoned games (dry run by default)."""
+    now = datetime.utcnow()
+    service = GameService(db)
+    return service.purge_games(
+        cancelled_before=(now - timedelta(days=cancelled_older_than_days)
+                          if cancelled_older_than_days is not None else None),
+        abandoned_before=(now - timedelta(days=abandoned_older_than_days)
+                          if abandoned_older_than_days is not None else None),
+        dry_run=dry_run,
+        batch_size=batch_size
+    )
 
 
-@app.get("/games/{game_id}", response_model=schemas.Game)
+@router.get("/games/{game_id}", response_model=schemas.Game)
 def get_game(game_id: int, db: Session = Depends(get_db)):
     """Get a specific game by ID."""
-    from utils import get_game_or_404
-    return get_game_or_404(game_id, db)
+    service = GameService(db)
+    return service.get_game(game_id)
 
 
-@app.post("/games", response_model=schemas.Game)
+@router.post("/games", response_model=schemas.Game)
 def create_game(game_data: schemas.GameCreate, db: Session = Depends(get_db)):
     """Create a new game with specified players."""
     service = GameService(db)
     return service.create_game(game_data)
 
 
-@app.post("/games/{game_id}/finish")
-def finish_game(game_id: int, db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/finish")
+def finish_game(game_id: int, expected_version: Optional[int] = None, db: Session = Depends(get_db)):
     """Mark a game as finished."""
     service = GameService(db)
-    service.finish_game(game_id)
+    service.finish_game(game_id, expected_version, pack=PACK_FINISHED)
     return {"message": "Game finished successfully"}
 
 
-@app.post("/games/{game_id}/cancel")
-def cancel_game(game_id: int, db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/cancel")
+def cancel_game(game_id: int, expected_version: Optional[int] = None, db: Session = Depends(get_db)):
     """Cancel a game (marks as invalid)."""
     service = GameService(db)
-    service.cancel_game(game_id)
+    service.cancel_game(game_id, expected_version)
     return {"message": "Game cancelled"}
 
 
-@app.delete("/games/{game_id}")
+@router.delete("/games/{game_id}")
 def delete_game(game_id: int, db: Session = Depends(get_db)):
     """Permanently delete a game and all its data."""
     service = GameService(db)
@@ -122,59 +268,70 @@ def delete_game(game_id: int, db: Session = Depends(get_db)):
     return {"message": "Game deleted permanently"}
 
 
-@app.post("/games/{game_id}/reactivate")
-def reactivate_game(game_id: int, db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/reactivate")
+def reactivate_game(game_id: int, expected_version: Optional[int] = None, db: Session = Depends(get_db)):
     """Reactivate a finished/cancelled game for editing."""
     service = GameService(db)
-    game = service.reactivate_game(game_id)
-    return {"message": "Game reactivated for editing", "game_id": game.id}
+    service.reactivate_game(game_id, expected_version)
+    return {"message": "Game reactivated for editing", "game_id": game_id}
 
 
-@app.put("/games/{game_id}/metadata")
+@router.put("/games/{game_id}/metadata")
 def update_game_metadata(
     game_id: int, 
     notes: str = Query(None),
     location: str = Query(None),
+    expected_version: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """Update game notes and location."""
     service = GameService(db)
-    game = service.update_metadata(game_id, notes, location)
+    game = service.update_metadata(game_id, notes, location, expected_version)
     return {"message": "Game metadata updated", "game": game}
 
 
-@app.post("/games/{game_id}/adjust-rounds")
-def adjust_rounds(game_id: int, new_total: int = Query(...), db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/adjust-rounds")
+def adjust_rounds(
+    game_id: int,
+    new_total: int = Query(...),
+    expected_version: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
     """Adjust the total number of rounds in a game."""
     service = GameService(db)
-    return service.adjust_rounds(game_id, new_total)
+    return service.adjust_rounds(game_id, new_total, expected_version)
 
 
-@app.post("/games/{game_id}/increment-round")
-def increment_current_round(game_id: int, db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/increment-round")
+def increment_current_round(game_id: int, expected_version: Optional[int] = None, db: Session = Depends(get_db)):
     """Increment current_round by 1 (called by Next Round button)."""
     service = GameService(db)
-    return service.increment_current_round(game_id)
+    return service.increment_current_round(game_id, expected_version)
 
 # ============================================================================
 # ROUNDS
 # ============================================================================
 
-@app.post("/games/{game_id}/rounds", response_model=List[schemas.Round])
-def add_round(game_id: int, round_data: schemas.RoundCreate, db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/rounds", response_model=List[schemas.Round])
+def add_round(
+    game_id: int,
+    round_data: schemas.RoundCreate,
+    expected_version: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
     """Add a new round with bets for all players."""
     service = RoundService(db)
-    return service.add_round(game_id, round_data)
+    return service.add_round(game_id, round_data, expected_version)
 
 
-@app.put("/games/{game_id}/rounds/{round_id}", response_model=schemas.Round)
+@router.put("/games/{game_id}/rounds/{round_id}", response_model=schemas.Round)
 def update_round(game_id: int, round_id: int, bet: int, success: bool, db: Session = Depends(get_db)):
     """Update an existing round."""
     service = RoundService(db)
     return service.update_round(game_id, round_id, bet, success)
 
 
-@app.post("/games/{game_id}/rounds/upsert")
+@router.post("/games/{game_id}/rounds/upsert")
 def upsert_round(
     game_id: int,
     round_number: int = Query(...),
@@ -188,38 +345,340 @@ def upsert_round(
     return service.upsert_round(game_id, round_number, player_id, bet, success)
 
 
-@app.get("/games/{game_id}/rounds", response_model=List[schemas.Round])
-def get_game_rounds(game_id: int, db: Session = Depends(get_db)):
+@router.post("/games/{game_id}/rounds/buffered")
+def buffer_round(
+    game_id: int,
+    round_number: int = Query(...),
+    player_id: int = Query(...),
+    bet: int = Query(...),
+    success: bool = Query(...),
+    db: Session = Depends(get_db)
+):
+    """Queue a cell edit; written in batches when PARVIS_WRITE_BEHIND is enabled."""
+    service = RoundService(db)
+    return service.buffer_cell_edit(game_id, round_number, player_id, bet, success)
+
+
+@router.get("/games/{game_id}/rounds", response_model=List[schemas.Round])
+def get_game_rounds(
+    request: Request,
+    response: Response,
+    game_id: int,
+    db: Session = Depends(get_read_db)
+):
     """Get all rounds for a game."""
     service = RoundService(db)
-    return service.get_game_rounds(game_id)
+    rounds = service.get_game_rounds(game_id)
+    return negotiated_response(request, response, rounds, schemas.Round, FAST_JSON)
+
+
+@router.get("/games/{game_id}/matrix", response_model=schemas.GameMatrix)
+def get_game_matrix(request: Request, game_id: int, db: Session = Depends(get_read_db)):
+    """Get a game's bets, results and totals as a dense rounds x players grid."""
+    service = RoundService(db)
+    matrix = service.get_game_matrix(game_id)
+    if wants_msgpack(request):
+        return MsgpackResponse(matrix, headers={"Vary": "Accept"})
+    # Same URL, either format: caches must key on Accept for both
+    return FastJSONResponse(matrix, headers={"Vary": "Accept"})
+
+
+@router.get("/games/{game_id}/events", response_model=List[schemas.GameEventOut])
+def get_game_events(
+    game_id: int,
+    after: int = Query(0, ge=0, description="Only events after this seq"),
+    db: Session = Depends(get_read_db)
+):
+    """Get a game's event log in order; still available after the game is deleted."""
+    service = EventLog(db)
+    return [event._mapping for event in service.events(game_id, after_seq=after)]
+
+
+@router.get("/games/{game_id}/replay", response_model=schemas.GameReplay)
+def replay_game(
+    game_id: int,
+    at: Optional[int] = Query(None, ge=0, description="State as of this event seq; latest if omitted"),
+    db: Session = Depends(get_read_db)
+):
+    """Rebuild a game's state from its event log, as of any point in its history."""
+    service = EventLog(db)
+    replay = service.state(game_id, at_seq=at)
+    if replay is None:
+        raise HTTPException(status_code=404, detail="No events for this game at that point")
+    return replay
 
 # ============================================================================
 # STATS
 # ============================================================================
 
-@app.get("/games/{game_id}/stats", response_model=List[schemas.GameStats])
-def get_game_stats(game_id: int, db: Session = Depends(get_db)):
+@router.get("/games/{game_id}/stats", response_model=List[schemas.GameStats])
+def get_game_stats(game_id: int, db: Session = Depends(get_read_db)):
     """Get statistics for all players in a game."""
     service = GameService(db)
     return service.get_game_stats(game_id)
 
 
-@app.get("/players/{player_id}/stats", response_model=schemas.PlayerStats)
-def get_player_stats(player_id: int, db: Session = Depends(get_db)):
-    """Get comprehensive statistics for a player across all games."""
+@router.get("/players/{player_id}/stats", response_model=schemas.PlayerStats)
+def get_player_stats(
+    player_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Get comprehensive statistics for a player, optionally within a date window."""
     service = PlayerService(db)
-    return service.get_player_stats(player_id)
+    return service.get_player_stats(player_id, since, until)
 
 
-@app.get("/players/{player_id}/bet-distribution")
-def get_player_bet_distribution(player_id: int, db: Session = Depends(get_db)):
-    """Get histogram data of player's bets."""
+@router.get("/players/{player_id}/bet-distribution")
+def get_player_bet_distribution(
+    player_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Get histogram data of player's bets, optionally within a date window."""
     service = PlayerService(db)
-    return service.get_bet_distribution(player_id)
+    return service.get_bet_distribution(player_id, since, until)
 
 
-@app.get("/health")
+# ============================================================================
+# SYNC
+# ============================================================================
+
+@router.get("/sync", response_model=schemas.SyncChanges)
+def get_sync_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="seq returned by the previous sync; 0 for everything"),
+    db: Session = Depends(get_read_db)
+):
+    """Get players, games, participants and rounds changed since a sync cursor, plus deletions."""
+    service = SyncService(db)
+    changes = service.changes(since, SYNC_PAGE_SIZE)
+    if wants_msgpack(request):
+        return MsgpackResponse(changes, headers={"Vary": "Accept"})
+    return FastJSONResponse(changes, headers={"Vary": "Accept"})
+
+
+@router.post("/sync", response_model=schemas.SyncPushResult)
+def push_sync_ops(push: schemas.SyncPush, db: Session = Depends(get_db)):
+    """
+    Apply edits queued while offline, in order.
+    
+    Each op is applied at most once per op_id, so a client can resend its
+    whole queue after a dropped connection. Failed ops are reported with
+    their status and don't stop the rest.
+    """
+    if len(push.ops) > SYNC_MAX_OPS:
+        raise HTTPException(status_code=413, detail=f"At most {SYNC_MAX_OPS} ops per push")
+    service = SyncService(db)
+    return {"results": service.push(push.ops, pack_finished=PACK_FINISHED)}
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+@router.get("/jobs", response_model=List[schemas.Job])
+def get_jobs(
+    status: Optional[str] = Query(None, description="pending, running, done or failed"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get background jobs, most recent first."""
+    service = JobQueue(db)
+    return service.list_jobs(status, limit)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.Job)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Get a background job's status, progress and result."""
+    service = JobQueue(db)
+    return service.get(job_id)
+
+
+@router.post("/jobs", response_model=schemas.Job)
+def enqueue_job(job: schemas.JobCreate, db: Session = Depends(get_db)):
+    """Queue a background job; an identical pending job is returned instead of a new one."""
+    if job.kind not in JOB_HANDLERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job kind {job.kind!r}; allowed: {', '.join(JOB_HANDLERS)}"
+        )
+    service = JobQueue(db)
+    job_id = service.enqueue(job.kind, job.args, job.priority)
+    db.commit()
+    return service.get(job_id)
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+class _BatchRolledBack(Exception):
+    """Raised inside the batch session to roll back a failed write batch."""
+
+
+@router.post(
+    "/batch",
+    response_model=schemas.BatchResponse,
+    openapi_extra={"requestBody": {"content": {"application/json": {
+        "schema": schemas.BatchRequest.model_json_schema()
+    }}}}
+)
+async def batch(request: Request):
+    """
+    Run several sub-requests against the API in one call.
+    
+    Sub-requests run in order, in-process, on one database session. A batch
+    of only GETs runs on a read session and every entry gets its own status.
+    A batch with writes runs in one transaction: after the first failing
+    entry the rest are skipped (424) and everything is rolled back. Its
+    entries see every buffered cell edit acknowledged before the batch, and
+    cannot buffer edits themselves (/rounds/buffered answers 400), since the
+    buffer is written outside the batch's transaction.
+    """
+    body = await read_limited_body(request, BATCH_MAX_BYTES)
+    try:
+        batch_request = schemas.BatchRequest.model_validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+    
+    items = batch_request.requests
+    if len(items) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    if len({item.id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Request ids must be unique")
+    for item in items:
+        if not item.path.startswith("/") or item.path.split("?")[0].rstrip("/") == "/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid path for request {item.id!r}")
+    
+    write = any(item.method in WRITE_METHODS for item in items)
+    if not write:
+        request.scope[READ_ONLY_SCOPE_KEY] = True  # No read-your-writes cookie
+    
+    if write:
+        # Written before the batch's transaction, so a rollback cannot take them along
+        await run_in_threadpool(cell_buffer.flush_all)
+    
+    client = request.scope.get("client")
+    committed = True
+    try:
+        with batch_session(request, write):
+            entries, failed = await run_batch(request.app, items, stop_on_error=write, client=client)
+            if write and failed:
+                raise _BatchRolledBack()
+    except _BatchRolledBack:
+        committed = False
+        # Writes applied to the active-game store were rolled back in the database
+        game_store.clear()
+    return FastJSONResponse(batch_body(entries, committed))
+
+
+@router.get("/health")
 def health():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+# ============================================================================
+# APP
+# ============================================================================
+
+def invalidation_bus() -> Optional[InvalidationBus]:
+    """The bus that keeps the caches of several workers consistent, per PARVIS_INVALIDATION."""
+    if not HOT_GAMES:
+        # The game store is its only subscriber; without it a bus would cost a
+        # LISTEN connection per worker and a notify per write for nothing
+        return None
+    backend = INVALIDATION
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresInvalidationBus(engine)
+    if backend == "memory":
+        return MemoryInvalidationBus()
+    if backend != "off":
+        raise ValueError(f"Unknown PARVIS_INVALIDATION backend {INVALIDATION!r}")
+    return None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One query; schema changes are applied by `python -m migrate`
+    from migrations import check_schema
+    check_schema(engine)
+    bus = invalidation_bus()
+    if bus is not None:
+        # Drop cached state changed by other workers
+        bus.subscribe(game_store.invalidate)
+        set_invalidation_bus(bus)
+        bus.start()
+    if WRITE_BEHIND:
+        cell_buffer.start()
+    # Background jobs; PARVIS_JOB_WORKERS=0 leaves them to `python -m worker`
+    job_runner = JobRunner(JOB_HANDLERS, concurrency=JOB_WORKERS)
+    if JOB_WORKERS > 0:
+        job_runner.start()
+    if HOT_GAMES:
+        # Serve active games from memory; preload them and cross-check with the database
+        game_store.enabled = True
+        game_store.load_active()
+        game_store.verify()
+    yield
+    job_runner.stop()
+    # Write any buffered cell edits before the process exits
+    cell_buffer.stop()
+    if bus is not None:
+        bus.stop()
+        set_invalidation_bus(None)
+
+
+def create_app() -> FastAPI:
+    """Build the Parvis API application."""
+    app = FastAPI(title="Parvis API", debug=DEBUG, lifespan=lifespan)
+    
+    # CORS
+    origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-DB-Queries", "X-DB-Time"] if DEBUG else [],
+    )
+    
+    # Reads after a write stay on the primary (no-op without a replica)
+    app.add_middleware(ReadYourWritesMiddleware)
+    
+    # Per-request query counting (X-DB-Queries / X-DB-Time headers)
+    if DEBUG:
+        app.add_middleware(QueryStatsMiddleware)
+    
+    # Request path for the slow-query log
+    if slow_query_log is not None:
+        app.add_middleware(RequestPathMiddleware)
+    
+    # gzip/brotli for large responses (metrics record the compressed size)
+    if COMPRESSION:
+        app.add_middleware(
+            CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES, cache=compression_cache
+        )
+    
+    # Route metrics for /metrics (outermost, so it times the whole stack)
+    app.add_middleware(MetricsMiddleware)
+    
+    app.router.routes.extend(router.routes)
+    app.dependency_overrides = shared_overrides.dependency_overrides
+    return app
+
+
+app = create_app()
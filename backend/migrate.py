@@ -0,0 +1,42 @@
+"""
+Create or upgrade the Parvis database schema.
+
+Run once per deploy, before starting the app; the app itself only checks
+the stored schema version.
+
+Usage (from the backend directory):
+    python -m migrate
+    python -m migrate --check    # exit 1 if migrations are pending
+"""
+
+import argparse
+import sys
+
+from database import engine, init_db
+from migrations import SchemaVersionError, check_schema
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--check", action="store_true",
+                        help="Only report whether the schema is current")
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            print(f"Schema is current (version {check_schema(engine)})")
+        except SchemaVersionError as exc:
+            print(exc)
+            return 1
+        return 0
+
+    previous, current = init_db()
+    if previous == current:
+        print(f"Schema already at version {current}")
+    else:
+        print(f"Migrated schema from version {previous or 0} to {current}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Lightweight schema migrations for existing databases.
+
+`Base.metadata.create_all` creates missing tables but never alters existing
+ones. Each step here brings an older database up to date and is safe to
+run repeatedly.
+
+The number of applied steps is stored in the one-row `schema_version`
+table. Migrations run only through `python -m migrate`; the app checks the
+stored version with a single query at startup and refuses to start on an
+outdated schema. New steps are appended to MIGRATIONS, never reordered.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaVersionError(RuntimeError):
+    """The database schema is older than this build expects."""
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """Add a column unless it already exists."""
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def add_game_version(conn: Connection) -> None:
+    """games.version for optimistic concurrency control."""
+    _add_column(conn, "games", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def cascade_game_foreign_keys(conn: Connection) -> None:
+    """
+    Recreate the rounds/game_players -> games foreign keys with ON DELETE CASCADE.
+
+    Only Postgres can alter constraints in place; SQLite databases get the
+    cascading keys from create_all.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    inspector = inspect(conn)
+    for table in ("rounds", "game_players"):
+        for fk in inspector.get_foreign_keys(table):
+            if fk["referred_table"] != "games":
+                continue
+            if (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+                continue
+            name = fk["name"]
+            columns = ", ".join(fk["constrained_columns"])
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({columns}) "
+                f"REFERENCES games (id) ON DELETE CASCADE"
+            ))
+
+
+def index_rounds_game_id(conn: Connection) -> None:
+    """Index rounds.game_id; cascaded and per-game deletes scan by it."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_rounds_game_id ON rounds (game_id)"))
+
+
+def add_game_archived_flag(conn: Connection) -> None:
+    """games.is_archived marks games whose rounds moved to rounds_archive."""
+    _add_column(conn, "games", "is_archived", "BOOLEAN NOT NULL DEFAULT false")
+
+
+def unique_round_cells(conn: Connection) -> None:
+    """
+    Unique (game_id, round_number, player_id) on rounds, the upsert conflict target.
+
+    Older databases could hold duplicate cells; the newest row of each wins,
+    and the number of rows removed is logged.
+    """
+    indexes = {ix["name"] for ix in inspect(conn).get_indexes("rounds")}
+    if "uq_rounds_cell" in indexes:
+        return
+    removed = conn.execute(text(
+        "DELETE FROM rounds WHERE id NOT IN ("
+        "SELECT MAX(id) FROM rounds GROUP BY game_id, round_number, player_id)"
+    )).rowcount
+    if removed:
+        logger.warning("Removed %s duplicate round cells, keeping the newest of each", removed)
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_rounds_cell ON rounds (game_id, round_number, player_id)"
+    ))
+
+
+def add_game_packed_flag(conn: Connection) -> None:
+    """games.is_packed marks finished games whose rounds moved to packed_rounds."""
+    _add_column(conn, "games", "is_packed", "BOOLEAN NOT NULL DEFAULT false")
+
+
+def add_sync_sequence(conn: Connection) -> None:
+    """
+    updated_seq on the synced tables, stamped by triggers, for `GET /sync`.
+
+    create_all has made sync_state and sync_tombstones. Existing rows get
+    sequence number 1, so a client's first sync (since=0) still sees them.
+    """
+    from database import SYNC_TABLES, install_sync_triggers
+
+    for table in SYNC_TABLES:
+        _add_column(conn, table, "updated_seq", "BIGINT NOT NULL DEFAULT 0")
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_updated_seq ON {table} (updated_seq)"))
+        conn.execute(text(f"UPDATE {table} SET updated_seq = 1 WHERE updated_seq = 0"))
+    conn.execute(text("UPDATE sync_state SET seq = 1 WHERE seq = 0"))
+    install_sync_triggers(conn)
+
+
+def add_game_events(conn: Connection) -> None:
+    """
+    Sequence trigger of the game_events log (its tables come from create_all).
+
+    Games from before the log have no events; `python -m events bootstrap`
+    records their current state as a first event.
+    """
+    from database import install_sync_triggers
+
+    install_sync_triggers(conn, ["game_events"])
+
+
+def add_job_queue(conn: Connection) -> None:
+    """Table of the background job queue, for databases created before it."""
+    from database import Job
+
+    Job.__table__.create(conn, checkfirst=True)
+
+
+def add_player_search(conn: Connection) -> None:
+    """Indexes for player search: by recency, plus pg_trgm on Postgres or a filled FTS5 table on SQLite."""
+    from database import install_player_search
+
+    install_player_search(conn, rebuild=True)
+
+
+def add_rounds_detached_flag(conn: Connection) -> None:
+    """games.rounds_detached marks archived games whose partition was detached."""
+    _add_column(conn, "games", "rounds_detached", "BOOLEAN NOT NULL DEFAULT false")
+
+
+def stamp_changes_by_transaction(conn: Connection) -> None:
+    """
+    Postgres: stamp changes with their transaction ID instead of bumping the sync_state row.
+
+    The counter's current value stays behind as the offset added to every
+    new stamp, so new stamps sort after all existing ones and clients keep
+    their cursors. SQLite keeps its counter.
+    """
+    from database import install_sync_triggers
+
+    if conn.dialect.name == "postgresql":
+        install_sync_triggers(conn)
+
+
+MIGRATIONS = [
+    add_game_version,
+    cascade_game_foreign_keys,
+    index_rounds_game_id,
+    add_game_archived_flag,
+    unique_round_cells,
+    add_game_packed_flag,
+    add_sync_sequence,
+    add_game_events,
+    add_job_queue,
+    add_player_search,
+    add_rounds_detached_flag,
+    stamp_changes_by_transaction,
+]
+
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: Connection) -> Optional[int]:
+    """Stored schema version, or None for databases that never recorded one."""
+    if not inspect(conn).has_table("schema_version"):
+        return None
+    return conn.execute(text("SELECT version FROM schema_version")).scalar()
+
+
+def run_migrations(engine: Engine) -> Tuple[Optional[int], int]:
+    """
+    Apply pending migration steps in one transaction and record the version.
+
+    Databases from before the version table rerun every step, which is safe
+    because steps are idempotent.
+
+    Args:
+        engine: Engine of the database to upgrade
+
+    Returns:
+        (previous version, new version)
+
+    Raises:
+        SchemaVersionError: If the database is newer than this build
+    """
+    with engine.begin() as conn:
+        previous = get_schema_version(conn)
+        if previous is not None and previous > SCHEMA_VERSION:
+            raise SchemaVersionError(
+                f"Database schema is at version {previous}, newer than this build ({SCHEMA_VERSION})"
+            )
+        for step in MIGRATIONS[previous or 0:]:
+            step(conn)
+
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+        if previous is None:
+            conn.execute(text("DELETE FROM schema_version"))
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": SCHEMA_VERSION})
+        else:
+            conn.execute(text("UPDATE schema_version SET version = :v"), {"v": SCHEMA_VERSION})
+    return previous, SCHEMA_VERSION
+
+
+def check_schema(engine: Engine) -> int:
+    """
+    Verify the database is migrated, with a single query.
+
+    Args:
+        engine: Engine of the database to check
+
+    Returns:
+        The stored schema version
+
+    Raises:
+        SchemaVersionError: If the schema is missing or older than this build
+    """
+    with engine.connect() as conn:
+        try:
+            version = conn.execute(text("SELECT version FROM schema_version")).scalar()
+        except (OperationalError, ProgrammingError):
+            version = None  # No version table yet
+    if version is None or version < SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, this build expects {SCHEMA_VERSION}; "
+            f"run `python -m migrate`"
+        )
+    if version > SCHEMA_VERSION:
+        logger.warning("Database schema version %s is newer than this build (%s)", version, SCHEMA_VERSION)
+    return version
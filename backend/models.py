@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from typing import Any, Dict, Literal, Optional, List
 from datetime import date, datetime
 
 class PlayerBase(BaseModel):
@@ -33,12 +33,44 @@ class PlayerWithRelations(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class PlayerSearchResult(BaseModel):
+    """A `GET /players/search` match; `match` is the tier that found it (alias, name or fuzzy)."""
+    id: int
+    alias: str
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    last_name: Optional[str] = None
+    last_game_date: Optional[datetime] = None
+    match: Literal["alias", "name", "fuzzy"]
+
+class PlayerImportItem(BaseModel):
+    """A player for `POST /players/import`: created, or updated if the alias exists (omitted fields unchanged)."""
+    key: Optional[str] = None  # Lets other players in the same import reference this one
+    alias: str
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    last_name: Optional[str] = None
+    birthdate: Optional[date] = None
+    parents: Optional[List[str]] = None  # Keys, else aliases (imported or registered); [] removes all
+
+class PlayerImport(BaseModel):
+    players: List[PlayerImportItem]
+
+class PlayerImportResult(BaseModel):
+    created: int
+    updated: int  # Existing players whose fields or parents changed
+    unchanged: int
+    parents_added: int
+    parents_removed: int
+    ids: Dict[str, int]  # Alias to ID of every imported player
+
 class GameCreate(BaseModel):
     player_ids: List[int]
     total_rounds: int
     game_type: Optional[str] = "standard"
     notes: Optional[str] = None
     location: Optional[str] = None
+    seed_first_round: bool = False  # Insert round 1 with bet 0 for every player
 
 class Game(BaseModel):
     id: int
@@ -50,6 +82,9 @@ class Game(BaseModel):
     current_round: int
     is_active: bool
     is_valid: bool
+    version: int
+    is_archived: bool = False
+    rounds_detached: bool = False
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -67,6 +102,16 @@ class Round(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class GameMatrix(BaseModel):
+    """Dense rounds x players view of a game, for the score grid."""
+    game_id: int
+    total_rounds: int
+    player_ids: List[int]  # Column order: sorted by player ID, not by participation
+    bets: List[List[Optional[int]]]  # bets[round - 1][column]; null where no bet yet
+    success: str  # Base64 bitmap; bit (round - 1) * len(player_ids) + column, LSB first
+    totals: List[int]  # Total score per column
+    success_base_score: int  # A successful bet scores this plus the bet; a failed one 0
+
 class GameStats(BaseModel):
     game_id: int
     player_id: int
@@ -87,3 +132,93 @@ class PlayerStats(BaseModel):
     failed_bets: int
     average_bet: float
     win_rate: float
+
+class BatchItem(BaseModel):
+    """One sub-request of a batch."""
+    id: str  # Echoed back to match responses
+    method: Literal["GET", "POST", "PUT", "DELETE"] = "GET"
+    path: str  # e.g. "/players/3/stats", optionally with a query string
+    params: Dict[str, Any] = {}  # Extra query parameters
+    body: Optional[Any] = None  # JSON body for writes
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+class BatchResponseItem(BaseModel):
+    id: str
+    status: int
+    body: Any
+
+class BatchResponse(BaseModel):
+    committed: bool  # False if a write batch was rolled back
+    responses: List[BatchResponseItem]
+
+class SyncTable(BaseModel):
+    """Changed rows of one table, as arrays in `columns` order."""
+    columns: List[str]
+    rows: List[List[Any]]
+
+class SyncChanges(BaseModel):
+    seq: int  # Cursor for the next `GET /sync?since=`
+    more: bool  # More changes follow; sync again right away
+    players: SyncTable  # Including parent_ids
+    games: SyncTable
+    game_players: SyncTable
+    rounds: SyncTable
+    deleted: Dict[str, List[int]]  # {"games": [...], "players": [...]}; drop their rounds too
+
+class SyncOp(BaseModel):
+    """An edit made offline, replayed by `POST /sync`."""
+    op_id: str  # Unique per edit (e.g. a UUID); replays are skipped
+    kind: Literal["cell", "next_round", "finish"]
+    game_id: int
+    round_number: Optional[int] = None  # cell
+    player_id: Optional[int] = None  # cell
+    bet: Optional[int] = None  # cell
+    success: Optional[bool] = None  # cell
+    expected_version: Optional[int] = None  # next_round, finish
+
+class SyncPush(BaseModel):
+    ops: List[SyncOp]
+
+class SyncOpResult(BaseModel):
+    op_id: str
+    status: int  # 200, or the HTTP status the edit failed with
+    duplicate: bool = False  # Already applied earlier
+    detail: Optional[Any] = None
+
+class SyncPushResult(BaseModel):
+    results: List[SyncOpResult]
+
+class GameEventOut(BaseModel):
+    """One entry of a game's event log; see services/event_log.py for the kinds."""
+    seq: int
+    kind: str
+    payload: Dict[str, Any]
+    created_at: datetime
+
+class GameReplay(BaseModel):
+    seq: int  # Last event applied
+    state: Dict[str, Any]  # game, player_ids, cells {"round:player": [bet, success, score]}, deleted
+
+class JobCreate(BaseModel):
+    kind: str  # A handler in services/jobs.py, e.g. "archive_games"
+    args: Dict[str, Any] = {}
+    priority: int = 0  # Higher runs first
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    args: Dict[str, Any]
+    priority: int
+    status: str  # pending, running, done, failed
+    attempts: int
+    max_attempts: int
+    progress: Optional[Dict[str, Any]] = None  # {"done", "total", "message"}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,34 @@
+"""
+Observability package for Parvis backend.
+
+This package contains request-level instrumentation:
+- SQL query counting and DB time per request
+- Prometheus-format route metrics for `/metrics`
+- Slow-query logging with sampled EXPLAIN capture
+"""
+
+from .query_stats import (
+    QueryStats,
+    QueryStatsMiddleware,
+    install_query_listeners,
+    track_queries,
+    count_queries,
+    assert_max_queries,
+)
+from .metrics import MetricsMiddleware, MetricsRegistry, metrics_registry
+from .slow_queries import SlowQueryLog, RequestPathMiddleware, install_slow_query_log
+
+__all__ = [
+    'QueryStats',
+    'QueryStatsMiddleware',
+    'install_query_listeners',
+    'track_queries',
+    'count_queries',
+    'assert_max_queries',
+    'MetricsMiddleware',
+    'MetricsRegistry',
+    'metrics_registry',
+    'SlowQueryLog',
+    'RequestPathMiddleware',
+    'install_slow_query_log',
+]
@@ -0,0 +1,218 @@
+"""
+Prometheus-format request metrics.
+
+Records per-route request counts, latency and response size histograms and
+in-flight requests, and renders them (plus DB pool gauges and cache hit
+ratios) in the Prometheus text exposition format for `/metrics`.
+
+Collection happens in the ASGI middleware, which always runs on the event
+loop thread, so the hot path is plain dict/list arithmetic without locks.
+Each worker process keeps its own registry.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Request latency histogram bucket bounds, in seconds."""
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+"""Response size histogram bucket bounds, in bytes."""
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket counts are stored non-cumulatively."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteMetrics:
+    """Metrics for one (method, route template) pair."""
+
+    __slots__ = ("statuses", "latency", "size")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+class MetricsRegistry:
+    """In-process metrics store rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+        self._engines: List[Tuple[str, Engine]] = []
+        self._caches: List[Tuple[str, Callable[[], Tuple[int, int]]]] = []
+
+    def observe(self, method: str, route: str, status: int, duration: float, size: int) -> None:
+        """Record one finished request."""
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.latency.observe(duration)
+        metrics.size.observe(size)
+
+    def register_engine(self, name: str, engine: Engine) -> None:
+        """Expose connection pool gauges for an engine under `pool=name`."""
+        self._engines.append((name, engine))
+
+    def register_cache(self, name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+        """
+        Expose hit/miss counters for a cache.
+
+        Args:
+            name: Value of the `cache` label
+            stats: Callable returning (hits, misses), read at scrape time
+        """
+        self._caches.append((name, stats))
+
+    def reset(self) -> None:
+        """Drop all recorded request metrics (registrations are kept)."""
+        self.routes = {}
+        self.in_flight = 0
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        lines.append("# HELP parvis_http_requests_total Total HTTP requests by route and status.")
+        lines.append("# TYPE parvis_http_requests_total counter")
+        for (method, route), metrics in sorted(self.routes.items()):
+            for status, count in sorted(metrics.statuses.items()):
+                labels = _labels(method=method, route=route, status=str(status))
+                lines.append(f"parvis_http_requests_total{labels} {count}")
+
+        lines.append("# HELP parvis_http_request_duration_seconds HTTP request latency.")
+        lines.append("# TYPE parvis_http_request_duration_seconds histogram")
+        for (method, route), metrics in sorted(self.routes.items()):
+            _render_histogram(lines, "parvis_http_request_duration_seconds",
+                              metrics.latency, method=method, route=route)
+
+        lines.append("# HELP parvis_http_response_size_bytes HTTP response body size.")
+        lines.append("# TYPE parvis_http_response_size_bytes histogram")
+        for (method, route), metrics in sorted(self.routes.items()):
+            _render_histogram(lines, "parvis_http_response_size_bytes",
+                              metrics.size, method=method, route=route)
+
+        lines.append("# HELP parvis_http_requests_in_flight HTTP requests currently being served.")
+        lines.append("# TYPE parvis_http_requests_in_flight gauge")
+        lines.append(f"parvis_http_requests_in_flight {self.in_flight}")
+
+        if self._engines:
+            lines.append("# HELP parvis_db_pool_connections Database pool connections by state.")
+            lines.append("# TYPE parvis_db_pool_connections gauge")
+            for name, engine in self._engines:
+                for state, value in _pool_stats(engine).items():
+                    lines.append(f"parvis_db_pool_connections{_labels(pool=name, state=state)} {value}")
+
+        if self._caches:
+            lines.append("# HELP parvis_cache_requests_total Cache lookups by result.")
+            lines.append("# TYPE parvis_cache_requests_total counter")
+            ratios = []
+            for name, stats in self._caches:
+                hits, misses = stats()
+                lines.append(f"parvis_cache_requests_total{_labels(cache=name, result='hit')} {hits}")
+                lines.append(f"parvis_cache_requests_total{_labels(cache=name, result='miss')} {misses}")
+                total = hits + misses
+                ratios.append((name, hits / total if total else 0.0))
+            lines.append("# HELP parvis_cache_hit_ratio Cache hits divided by lookups.")
+            lines.append("# TYPE parvis_cache_hit_ratio gauge")
+            for name, ratio in ratios:
+                lines.append(f"parvis_cache_hit_ratio{_labels(cache=name)} {ratio:.6g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, histogram: Histogram, **labels: str) -> None:
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=str(bound))} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+def _pool_stats(engine: Engine) -> Dict[str, int]:
+    """Read QueuePool gauges; pools without them (e.g. StaticPool) report nothing."""
+    pool = engine.pool
+    stats = {}
+    for state, attr in (("size", "size"), ("checked_out", "checkedout"),
+                        ("checked_in", "checkedin"), ("overflow", "overflow")):
+        getter = getattr(pool, attr, None)
+        if getter is not None:
+            stats[state] = getter()
+    return stats
+
+
+metrics_registry = MetricsRegistry()
+"""Process-wide registry used by the middleware and `/metrics`."""
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics."""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry if registry is not None else metrics_registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            registry.in_flight -= 1
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+                status,
+                duration,
+                size,
+            )
@@ -0,0 +1,262 @@
+"""
+Opt-in per-request profiling.
+
+When `PARVIS_PROFILING` is set, routes are created with `ProfilingRoute`.
+A request carrying `X-Profile: collapsed|alloc` (or `?__profile=...`) then
+runs its endpoint under a sampling profiler, plus tracemalloc for heavy
+routes, and gets the profile back instead of the normal body:
+
+- `collapsed`: folded stacks (`a;b;c <samples>`), which speedscope and
+  flamegraph.pl import directly
+- `alloc`: top allocation sites (tracemalloc snapshot diff)
+
+If `PARVIS_PROFILE_DIR` is set, both profiles are written there instead and
+the normal response is returned with an `X-Profile-File` header. Requests
+must send `PARVIS_PROFILE_TOKEN` in `X-Profile-Token`; without a valid token
+they are served normally, and the app refuses to start with profiling on
+and no token. An unknown format is answered with 400.
+
+tracemalloc traces the whole process, so an allocation diff also holds
+whatever other requests allocated while the profiled one ran; profile on
+an otherwise idle instance for clean numbers.
+
+With profiling disabled the default APIRoute is used, so there is no cost.
+"""
+
+import functools
+import hmac
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+
+PROFILE_TOKEN = os.getenv("PARVIS_PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PARVIS_PROFILE_DIR", "")
+SAMPLE_INTERVAL = float(os.getenv("PARVIS_PROFILE_INTERVAL_MS", "1")) / 1000
+
+MEMORY_PROFILED_ROUTES = {"get_players", "get_game_rounds"}
+"""Routes that always get a tracemalloc snapshot when profiled."""
+
+PROFILE_FORMATS = ("collapsed", "alloc")
+
+TOP_ALLOCATIONS = 25
+
+_active_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_ours = False
+
+
+def _acquire_tracemalloc() -> None:
+    """Make sure tracemalloc runs until the matching `_release_tracemalloc`."""
+    global _tracemalloc_users, _tracemalloc_ours
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_ours = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc() -> None:
+    """Stop tracemalloc when the last concurrent memory profile ends, if we started it."""
+    global _tracemalloc_users, _tracemalloc_ours
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_ours:
+            tracemalloc.stop()
+            _tracemalloc_ours = False
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, root_frame, interval: float):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="parvis-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            # Walk up to (not including) the frame that started profiling
+            while frame is not None and frame is not self.root_frame:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class ProfileSession:
+    """Profiling state and results for one request."""
+
+    def __init__(self, route_name: str, output: str, memory: bool):
+        self.route_name = route_name
+        self.output = output
+        self.memory = memory
+        self.stacks: Counter = Counter()
+        self.allocations: list = []
+        self.elapsed = 0.0
+
+    def start(self, root_frame) -> None:
+        """Start sampling the calling thread."""
+        self._sampler = StackSampler(threading.get_ident(), root_frame, SAMPLE_INTERVAL)
+        if self.memory:
+            _acquire_tracemalloc()
+            self._before = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self._started
+        self._sampler.stop()
+        self.stacks = self._sampler.stacks
+        if self.memory:
+            try:
+                after = tracemalloc.take_snapshot()
+            finally:
+                _release_tracemalloc()
+            self.allocations = after.compare_to(self._before, "lineno")[:TOP_ALLOCATIONS]
+
+    def collapsed(self) -> str:
+        """Folded stacks, one `frame;frame;frame count` line per unique stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def allocation_report(self) -> str:
+        if not self.memory:
+            return "tracemalloc not enabled for this request (send X-Profile-Memory: 1)\n"
+        lines = [f"Top {len(self.allocations)} allocation sites for {self.route_name}:"]
+        lines.extend(str(stat) for stat in self.allocations)
+        return "\n".join(lines) + "\n"
+
+    def respond(self, response: Response) -> Response:
+        """Replace the response with the profile, or save it and annotate."""
+        if PROFILE_DIR:
+            base = os.path.join(
+                PROFILE_DIR,
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{self.route_name}-{uuid.uuid4().hex[:8]}"
+            )
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(base + ".collapsed", "w") as f:
+                f.write(self.collapsed())
+            if self.memory:
+                with open(base + ".alloc.txt", "w") as f:
+                    f.write(self.allocation_report())
+            response.headers["X-Profile-File"] = os.path.basename(base)
+            return response
+
+        body = self.collapsed() if self.output == "collapsed" else self.allocation_report()
+        return PlainTextResponse(body, headers={
+            "X-Profile-Elapsed": f"{self.elapsed * 1000:.3f}",
+            "X-Profile-Samples": str(sum(self.stacks.values())),
+        })
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so it runs under the active ProfileSession, if any."""
+    if getattr(endpoint, "_parvis_profiled", False):
+        return endpoint  # Route copied by include_router; already wrapped
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            session = _active_session.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            session.start(sys._getframe())
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                session.stop()
+        async_wrapper._parvis_profiled = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _active_session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        # Sync endpoints run in a worker thread; sample that thread
+        session.start(sys._getframe())
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            session.stop()
+    wrapper._parvis_profiled = True
+    return wrapper
+
+
+def _requested_output(request: Request) -> Optional[str]:
+    """
+    Return the requested profile format, or None if not requested/allowed.
+
+    Raises:
+        HTTPException: 400 for an unknown format (from an allowed client)
+    """
+    output = request.headers.get("x-profile") or request.query_params.get("__profile")
+    if not output:
+        return None
+    if not PROFILE_TOKEN or not hmac.compare_digest(
+        request.headers.get("x-profile-token", "").encode(), PROFILE_TOKEN.encode()
+    ):
+        return None
+    if output not in PROFILE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile format {output!r}; use one of {', '.join(PROFILE_FORMATS)}"
+        )
+    return output
+
+
+class ProfilingRoute(APIRoute):
+    """APIRoute that can profile its endpoint on request."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route_name = self.name
+
+        async def profiled_handler(request: Request) -> Response:
+            output = _requested_output(request)
+            if output is None:
+                return await handler(request)
+
+            memory = (
+                route_name in MEMORY_PROFILED_ROUTES
+                or output == "alloc"
+                or request.headers.get("x-profile-memory") == "1"
+            )
+            session = ProfileSession(route_name, output, memory)
+            token = _active_session.set(session)
+            try:
+                response = await handler(request)
+            finally:
+                _active_session.reset(token)
+            return session.respond(response)
+
+        return profiled_handler
@@ -0,0 +1,173 @@
+"""
+Per-request SQL query statistics.
+
+Hooks SQLAlchemy's cursor events to count statements and accumulate DB time
+for the request currently being served. Counting is scoped with a context
+variable, so statements issued outside a tracked request cost a single
+lookup and are otherwise ignored.
+
+The same hooks back `count_queries`/`assert_max_queries`, which tests use to
+pin a query budget per endpoint so N+1 regressions fail in CI.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryStats:
+    """Statement count and cumulative DB time (seconds) for one scope."""
+    count: int = 0
+    duration: float = 0.0
+    statements: List[str] = field(default_factory=list)
+    keep_statements: bool = False
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        if self.keep_statements:
+            self.statements.append(statement)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+_START_ATTR = "_parvis_query_start"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        setattr(context, _START_ATTR, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or context is None:
+        return
+    started = getattr(context, _START_ATTR, None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    stats.record(statement, elapsed)
+
+
+def install_query_listeners(engine: Engine) -> None:
+    """
+    Attach the query counting hooks to an engine.
+
+    Safe to call more than once for the same engine.
+
+    Args:
+        engine: SQLAlchemy engine to instrument
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries(keep_statements: bool = False) -> Iterator[QueryStats]:
+    """
+    Count statements executed in the current context.
+
+    Worker threads spawned from this context (e.g. FastAPI's threadpool for
+    sync endpoints) inherit the same QueryStats instance.
+
+    Args:
+        keep_statements: Also keep the SQL text of each statement
+
+    Yields:
+        QueryStats that is updated as statements run
+    """
+    stats = QueryStats(keep_statements=keep_statements)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryStats]:
+    """
+    Count every statement executed on an engine, from any thread.
+
+    Intended for tests, where requests run on a different thread than the
+    test body and context variables do not flow back.
+
+    Args:
+        engine: Engine to observe
+
+    Yields:
+        QueryStats including the SQL text of each statement
+    """
+    stats = QueryStats(keep_statements=True)
+    started = {}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        started[id(cursor)] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        begin = started.pop(id(cursor), None)
+        stats.record(statement, time.perf_counter() - begin if begin else 0.0)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
+
+
+@contextmanager
+def assert_max_queries(engine: Engine, budget: int) -> Iterator[QueryStats]:
+    """
+    Fail if more than `budget` statements run inside the block.
+
+    Args:
+        engine: Engine to observe
+        budget: Maximum number of statements allowed
+
+    Raises:
+        AssertionError: If the budget is exceeded, listing the statements
+    """
+    with count_queries(engine) as stats:
+        yield stats
+    if stats.count > budget:
+        listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(stats.statements))
+        raise AssertionError(
+            f"Query budget exceeded: {stats.count} statements (budget {budget})\n{listing}"
+        )
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that tracks queries per request.
+
+    Adds `X-DB-Queries` (statement count) and `X-DB-Time` (milliseconds)
+    response headers. Only mounted in debug mode.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(stats.count).encode()))
+                    headers.append((b"x-db-time", f"{stats.duration * 1000:.3f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
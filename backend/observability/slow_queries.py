@@ -0,0 +1,208 @@
+"""
+Slow-query log with sampled EXPLAIN capture.
+
+Statements slower than a threshold are logged to `parvis.slow_query` with
+their bound parameters, the service method that issued them and the request
+path. A sampled fraction of slow SELECTs is explained (`EXPLAIN` on
+Postgres, `EXPLAIN QUERY PLAN` on SQLite) and the plans are written to a
+rotating file, to show which PlayerService/GameService queries need
+indexes as data grows.
+
+The EXPLAIN runs on the statement's own connection, so it sees the same
+transaction, but inside a savepoint on Postgres: a failing EXPLAIN must not
+abort the request's transaction. `EXPLAIN (ANALYZE, BUFFERS)` executes the
+slow query a second time, inline in the request, so it is opt-in
+(`analyze=True`).
+"""
+
+import logging
+import os
+import random
+import sys
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger("parvis.slow_query")
+
+PLAN_FILE_MAX_BYTES = 5 * 1024 * 1024
+PLAN_FILE_BACKUPS = 5
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SERVICES_DIR = os.path.join(_BACKEND_DIR, "services")
+_OBSERVABILITY_DIR = os.path.join(_BACKEND_DIR, "observability")
+
+_START_ATTR = "_parvis_slow_query_start"
+
+request_path: ContextVar[Optional[str]] = ContextVar("request_path", default=None)
+
+
+def _query_origin() -> str:
+    """
+    Name the application code that issued the current statement.
+
+    Prefers the innermost service method (e.g. `GameService.get_game_stats`),
+    falling back to the innermost backend function outside this package.
+    """
+    fallback = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_SERVICES_DIR):
+            owner = frame.f_locals.get("self")
+            name = frame.f_code.co_name
+            return f"{type(owner).__name__}.{name}" if owner is not None else name
+        if (fallback is None and filename.startswith(_BACKEND_DIR)
+                and not filename.startswith(_OBSERVABILITY_DIR)):
+            fallback = f"{os.path.basename(filename)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "<unknown>"
+
+
+class SlowQueryLog:
+    """Engine listener pair that logs and optionally explains slow statements."""
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        explain_rate: float = 0.0,
+        plan_file: Optional[str] = None,
+        analyze: bool = False
+    ):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.analyze = analyze
+        self.plan_logger = None
+        if explain_rate > 0 and plan_file:
+            from logging.handlers import RotatingFileHandler
+            self.plan_logger = logging.getLogger(f"parvis.slow_query.plans.{id(self)}")
+            self.plan_logger.propagate = False
+            self.plan_logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(
+                plan_file, maxBytes=PLAN_FILE_MAX_BYTES, backupCount=PLAN_FILE_BACKUPS
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.plan_logger.addHandler(handler)
+        self._engines = []
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        self._engines.append(engine)
+
+    def uninstall(self) -> None:
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._before)
+            event.remove(engine, "after_cursor_execute", self._after)
+        self._engines = []
+        if self.plan_logger is not None:
+            for handler in list(self.plan_logger.handlers):
+                handler.close()
+                self.plan_logger.removeHandler(handler)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            setattr(context, _START_ATTR, time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, _START_ATTR, None) if context is not None else None
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+
+        origin = _query_origin()
+        path = request_path.get() or "-"
+        logger.warning(
+            "Slow query (%.1f ms) in %s [%s]: %s | params=%r",
+            elapsed * 1000, origin, path, " ".join(statement.split()), parameters
+        )
+
+        if (self.plan_logger is not None and not executemany
+                and statement.lstrip()[:6].upper() == "SELECT"
+                and random.random() < self.explain_rate):
+            self._explain(conn, cursor, statement, parameters, elapsed, origin, path)
+
+    def _explain(self, conn, cursor, statement, parameters, elapsed, origin, path) -> None:
+        """Explain a SELECT on the same DBAPI connection, without disturbing its transaction."""
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) " if self.analyze else "EXPLAIN "
+        elif conn.dialect.name == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN "
+        else:
+            prefix = "EXPLAIN "
+
+        explain_cursor = cursor.connection.cursor()
+        try:
+            if postgres:
+                explain_cursor.execute("SAVEPOINT parvis_explain")
+            try:
+                explain_cursor.execute(prefix + statement, parameters)
+                plan = "\n".join(
+                    "  " + " ".join(str(col) for col in row) for row in explain_cursor.fetchall()
+                )
+            except Exception:
+                if postgres:
+                    explain_cursor.execute("ROLLBACK TO SAVEPOINT parvis_explain")
+                raise
+            finally:
+                if postgres:
+                    explain_cursor.execute("RELEASE SAVEPOINT parvis_explain")
+        except Exception as exc:
+            logger.warning("EXPLAIN failed for slow query from %s: %s", origin, exc)
+            return
+        finally:
+            explain_cursor.close()
+
+        self.plan_logger.info(
+            "%.1f ms in %s [%s]\n  %s\n  params=%r\n%s\n",
+            elapsed * 1000, origin, path, " ".join(statement.split()), parameters, plan
+        )
+
+
+def install_slow_query_log(
+    engine: Engine,
+    threshold_ms: float,
+    explain_rate: float = 0.0,
+    plan_file: Optional[str] = None,
+    analyze: bool = False
+) -> SlowQueryLog:
+    """
+    Log statements on `engine` slower than `threshold_ms`.
+
+    Args:
+        engine: Engine to instrument
+        threshold_ms: Minimum duration to log, in milliseconds
+        explain_rate: Fraction (0-1) of slow SELECTs to EXPLAIN
+        plan_file: Rotating file receiving the EXPLAIN output
+        analyze: Postgres: EXPLAIN (ANALYZE, BUFFERS), running the query again
+
+    Returns:
+        The installed SlowQueryLog (call `uninstall()` to remove it)
+    """
+    slow_log = SlowQueryLog(threshold_ms, explain_rate, plan_file, analyze)
+    slow_log.install(engine)
+    return slow_log
+
+
+class RequestPathMiddleware:
+    """ASGI middleware exposing the request path to the slow-query log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_path.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_path.reset(token)
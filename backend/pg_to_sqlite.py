@@ -0,0 +1,192 @@
+"""
+Copy a Parvis Postgres database into a SQLite file.
+
+The source is either a plain-SQL dump written by `scripts/backup_db.sh`
+(`pg_dump` COPY blocks) or a live Postgres URL. The target SQLite database
+is created with the current schema and must not contain any players yet.
+Archive partitions (`rounds_archive_2019`, ...) are merged back into
+`rounds_archive`.
+
+Usage (from the backend directory):
+    python -m pg_to_sqlite backups/parvis_backup_2025-01-15_04-00-00.sql \\
+        --target sqlite:////data/parvis.db
+    python -m pg_to_sqlite postgresql://parvis:secret@db:5432/parvis \\
+        --target sqlite:////data/parvis.db
+"""
+
+import argparse
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Table, create_engine, func, select, text
+
+from database import Base, Player, engine_options
+from migrations import run_migrations
+
+BATCH_SIZE = 1000
+
+_COPY_HEADER = re.compile(r"^COPY (?:\w+\.)?(\w+) \(([^)]*)\) FROM stdin;$")
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v", "\\": "\\"}
+
+
+def _table_for(name: str) -> Optional[Table]:
+    """Map a dumped table (or archive partition) name to a model table."""
+    if name.startswith("rounds_archive_"):
+        name = "rounds_archive"
+    return Base.metadata.tables.get(name)
+
+
+def _unescape(field: str) -> str:
+    """Undo COPY text-format backslash escapes."""
+    if "\\" not in field:
+        return field
+    out, i = [], 0
+    while i < len(field):
+        char = field[i]
+        if char == "\\" and i + 1 < len(field):
+            i += 1
+            out.append(_ESCAPES.get(field[i], field[i]))
+        else:
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def _convert(value: str, column_type):
+    """Convert a COPY text field to the Python value for a column."""
+    if value == "\\N":
+        return None
+    if isinstance(column_type, Boolean):
+        return value == "t"
+    if isinstance(column_type, Integer):
+        return int(value)
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, Date):
+        return date.fromisoformat(value)
+    return _unescape(value)
+
+
+def read_dump(lines: Iterable[str]) -> Dict[str, List[dict]]:
+    """
+    Collect rows from the COPY blocks of a plain-SQL pg_dump.
+
+    Args:
+        lines: Lines of the dump file
+
+    Returns:
+        Rows per model table name; tables and columns the models don't
+        know about are skipped
+    """
+    rows: Dict[str, List[dict]] = defaultdict(list)
+    table, columns = None, None
+    for line in lines:
+        line = line.rstrip("\n")
+        if columns is None:
+            match = _COPY_HEADER.match(line)
+            if match:
+                table = _table_for(match.group(1))
+                columns = [c.strip().strip('"') for c in match.group(2).split(",")]
+            continue
+        if line == "\\.":
+            table, columns = None, None
+            continue
+        if table is None:
+            continue
+        row = {}
+        for name, field in zip(columns, line.split("\t")):
+            if name in table.c:
+                row[name] = _convert(field, table.c[name].type)
+        rows[table.name].append(row)
+    return rows
+
+
+def read_database(url: str) -> Dict[str, List[dict]]:
+    """
+    Read every model table from a live database.
+
+    Args:
+        url: Source database URL
+
+    Returns:
+        Rows per model table name
+    """
+    source = create_engine(url)
+    try:
+        with source.connect() as conn:
+            return {
+                table.name: [dict(row._mapping) for row in conn.execute(select(table))]
+                for table in Base.metadata.sorted_tables
+            }
+    finally:
+        source.dispose()
+
+
+def write_sqlite(target_url: str, rows: Dict[str, List[dict]]) -> Dict[str, int]:
+    """
+    Create the schema in a SQLite database and insert the rows in one transaction.
+
+    Args:
+        target_url: SQLite database URL
+        rows: Rows per table name
+
+    Returns:
+        Number of rows written per table
+
+    Raises:
+        ValueError: If the target is not SQLite or already has data
+    """
+    if not target_url.startswith("sqlite"):
+        raise ValueError("Target must be a sqlite:// URL")
+
+    target = create_engine(target_url, **engine_options(target_url))
+    try:
+        Base.metadata.create_all(bind=target)
+        run_migrations(target)
+
+        counts = {}
+        with target.begin() as conn:
+            if conn.execute(select(func.count()).select_from(Player)).scalar():
+                raise ValueError("Target database already contains players")
+            # Parents before children; foreign keys are enforced on every insert.
+            # The sync triggers renumber the rows and events, so the source's
+            # sync counter, snapshots and projection checkpoints are not
+            # copied (clients start over with a full sync, projections
+            # rebuild, `python -m events snapshot` takes new snapshots).
+            for table in Base.metadata.sorted_tables:
+                if table.name in ("sync_state", "game_snapshots", "event_checkpoints"):
+                    continue
+                table_rows = rows.get(table.name, [])
+                if table.name == "game_events":
+                    table_rows = sorted(table_rows, key=lambda row: (row["seq"], row["id"]))  # Renumbered in this order
+                for start in range(0, len(table_rows), BATCH_SIZE):
+                    conn.execute(table.insert(), table_rows[start:start + BATCH_SIZE])
+                counts[table.name] = len(table_rows)
+
+            conn.execute(text("ANALYZE"))
+        return counts
+    finally:
+        target.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="pg_dump .sql file or postgresql:// URL")
+    parser.add_argument("--target", required=True,
+                        help="SQLite URL to create, e.g. sqlite:////data/parvis.db")
+    args = parser.parse_args()
+
+    if "://" in args.source:
+        rows = read_database(args.source)
+    else:
+        with open(args.source, encoding="utf-8") as dump:
+            rows = read_dump(dump)
+
+    for table, count in write_sqlite(args.target, rows).items():
+        print(f"{table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
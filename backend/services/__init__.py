@@ -7,10 +7,33 @@ making it easier to test and reuse across the application.
 
 from .game_service import GameService
 from .player_service import PlayerService
+from .player_search import PlayerSearch
+from .player_import import PlayerImportService
 from .round_service import RoundService
+from .cell_buffer import CellEditBuffer, cell_buffer
+from .game_store import ActiveGameStore, game_store
+from .archive_service import ArchiveService
+from .pack_service import PackService
+from .sync_service import SyncService
+from .event_log import EventLog
+from .job_queue import JobQueue, JobRunner
+from .jobs import JOB_HANDLERS
 
 __all__ = [
     'GameService',
     'PlayerService',
+    'PlayerSearch',
+    'PlayerImportService',
     'RoundService',
+    'ArchiveService',
+    'PackService',
+    'SyncService',
+    'EventLog',
+    'JobQueue',
+    'JobRunner',
+    'JOB_HANDLERS',
+    'CellEditBuffer',
+    'cell_buffer',
+    'ActiveGameStore',
+    'game_store',
 ]
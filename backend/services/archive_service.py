@@ -0,0 +1,186 @@
+"""
+Archive service layer for Parvis.
+
+Moves rounds of old finished games from the hot `rounds` table into
+`rounds_archive`, and back when a game is reactivated. On Postgres the
+archive is partitioned by year of the game date; old partitions can be
+detached to take them out of every stats query. Their games are flagged
+`rounds_detached`: their rounds are gone for the API (410) and they cannot
+be reactivated.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from database import ArchivedRound, Game, Round
+from utils import validate_positive_int
+
+
+ARCHIVE_TABLE = ArchivedRound.__tablename__
+_ROUND_COLUMNS = ("id", "game_id", "round_number", "player_id", "bet", "success", "score")
+
+ROUNDS_DETACHED = "Rounds of this game are in a detached archive partition"
+
+
+def check_rounds_attached(rounds_detached: bool) -> None:
+    """Raise 410 for a game whose rounds were detached with their archive partition."""
+    if rounds_detached:
+        raise HTTPException(status_code=410, detail=ROUNDS_DETACHED)
+
+
+class ArchiveService:
+    """Service for moving round data between hot and archive storage."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    @property
+    def _partitioned(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+    
+    def archive_games(
+        self,
+        before: datetime,
+        batch_size: int = 100,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        """
+        Archive finished games played before a date.
+        
+        Each batch copies the rounds into rounds_archive, deletes them from
+        rounds and flags the games, in one transaction.
+        
+        Args:
+            before: Archive finished games played before this time
+            batch_size: Games moved per transaction
+            progress: Called with (games done, games total) after each batch
+            
+        Returns:
+            Dictionary with the number of games and rounds archived
+        """
+        validate_positive_int(batch_size, "Batch size")
+        game_ids = list(self.db.scalars(
+            select(Game.id).where(
+                Game.is_active == False,
+                Game.is_valid == True,
+                Game.is_archived == False,
+                Game.is_packed == False,
+                Game.date < before
+            ).order_by(Game.id)
+        ))
+        
+        archived_rounds = 0
+        for start in range(0, len(game_ids), batch_size):
+            batch = game_ids[start:start + batch_size]
+            if self._partitioned:
+                self._ensure_partitions(batch)
+            
+            source = select(
+                *(getattr(Round, c) for c in _ROUND_COLUMNS), Game.date
+            ).join(Game, Game.id == Round.game_id).where(Round.game_id.in_(batch))
+            archived_rounds += self.db.execute(
+                insert(ArchivedRound).from_select(list(_ROUND_COLUMNS) + ["game_date"], source)
+            ).rowcount
+            self.db.execute(delete(Round).where(Round.game_id.in_(batch)))
+            self.db.execute(
+                update(Game).where(Game.id.in_(batch)).values(is_archived=True)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            if progress is not None:
+                progress(start + len(batch), len(game_ids))
+        
+        return {"games": len(game_ids), "rounds": archived_rounds}
+    
+    def restore_game(self, game_id: int) -> int:
+        """
+        Move an archived game's rounds back into the hot table.
+        
+        Does not commit, so it can run in the caller's transaction.
+        
+        Args:
+            game_id: ID of the game
+            
+        Returns:
+            Number of rounds restored
+        """
+        restored = self.db.execute(
+            insert(Round).from_select(
+                list(_ROUND_COLUMNS),
+                select(*(getattr(ArchivedRound, c) for c in _ROUND_COLUMNS))
+                .where(ArchivedRound.game_id == game_id)
+            )
+        ).rowcount
+        if restored:
+            self.db.execute(delete(ArchivedRound).where(ArchivedRound.game_id == game_id))
+        self.db.execute(
+            update(Game).where(Game.id == game_id, Game.is_archived == True)
+            .values(is_archived=False)
+            .execution_options(synchronize_session=False)
+        )
+        return restored
+    
+    def detach_partitions(self, before_year: int) -> List[str]:
+        """
+        Detach archive partitions for years before `before_year` (Postgres only).
+        
+        Detached partitions stay in the database as standalone tables
+        (e.g. rounds_archive_2019) that can be dumped and dropped; their
+        rounds no longer count toward any statistics. Their games are
+        flagged `rounds_detached` in the same transaction.
+        
+        Args:
+            before_year: First year to keep attached
+            
+        Returns:
+            Names of the detached partitions
+        """
+        if not self._partitioned:
+            return []
+        detached = []
+        for name in self._partition_names():
+            year = int(name.rsplit("_", 1)[1])
+            if year < before_year:
+                self.db.execute(text(f"ALTER TABLE {ARCHIVE_TABLE} DETACH PARTITION {name}"))
+                self.db.execute(
+                    update(Game).where(
+                        Game.is_archived == True,
+                        Game.date >= datetime(year, 1, 1),
+                        Game.date < datetime(year + 1, 1, 1)
+                    ).values(rounds_detached=True)
+                    .execution_options(synchronize_session=False)
+                )
+                detached.append(name)
+        self.db.commit()
+        return detached
+    
+    def compact(self) -> None:
+        """Reclaim space freed by archiving (VACUUM on SQLite, VACUUM ANALYZE on Postgres)."""
+        statement = "VACUUM ANALYZE" if self._partitioned else "VACUUM"
+        engine = self.db.get_bind()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql(statement)
+    
+    def _partition_names(self) -> List[str]:
+        return sorted(self.db.scalars(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ), {"table": ARCHIVE_TABLE}))
+    
+    def _ensure_partitions(self, game_ids: List[int]) -> None:
+        """Create the yearly partitions needed for these games."""
+        years = self.db.scalars(
+            select(Game.date).where(Game.id.in_(game_ids))
+        )
+        for year in sorted({d.year for d in years}):
+            self.db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE}_{year} "
+                f"PARTITION OF {ARCHIVE_TABLE} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            ))
@@ -0,0 +1,295 @@
+"""
+Write-behind buffer for rapid matrix cell edits.
+
+Players tap cells in quick succession (toggling success, nudging bets), and
+each tap used to be its own upsert and commit. The buffer accepts edits into
+an in-memory per-game map, acknowledges them with a version number, and
+writes only the latest value per (game, round, player) to the database in
+one transaction:
+
+- every `flush_interval` seconds from a background thread,
+- before any read or mutation of the same game (so reads stay consistent),
+- on finish / next round,
+- on shutdown.
+
+A finished or cancelled game is forgotten once its last edits are written,
+so the per-game map only holds games in play.
+
+Edits acknowledged less than one interval before a hard crash (SIGKILL,
+power loss) can be lost; a clean shutdown flushes everything. Edits the
+database rejects (say, for a player removed from the game meanwhile) are
+not retried: they are logged and kept in `dead_letters`, and the rest of
+the batch is written.
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import Game, SessionLocal, in_write_batch
+from utils import add_event, calculate_score, cell_payload, upsert_rounds, validate_bet
+from .pack_service import PackService
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 0.3
+"""Seconds between background flushes."""
+
+DEAD_LETTERS_MAX = 1000
+"""Rejected edits kept in `CellEditBuffer.dead_letters`."""
+
+CellKey = Tuple[int, int]
+"""(round_number, player_id) within a game."""
+
+_REJECTED = (IntegrityError, HTTPException)
+"""Write errors that retrying the same edit cannot fix."""
+
+
+@dataclass
+class _PendingGame:
+    version: int = 0
+    flushed_version: int = 0
+    cells: Dict[CellKey, Tuple[int, bool, int]] = field(default_factory=dict)
+    """Latest (bet, success, version) per cell not yet written."""
+    flush_lock: threading.Lock = field(default_factory=threading.Lock)
+    """Held by a flush from taking the cells until they are committed."""
+    closed: bool = False
+    """The game was finished or cancelled; forgotten once nothing is left to write."""
+
+
+class CellEditBuffer:
+    """Coalesces cell edits per game and writes them in batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._games: Dict[int, _PendingGame] = {}
+        self.dead_letters: Deque[Dict] = deque(maxlen=DEAD_LETTERS_MAX)
+        """Edits the database rejected, oldest first."""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def submit(self, game_id: int, round_number: int, player_id: int, bet: int, success: bool) -> Dict:
+        """
+        Buffer a cell edit.
+
+        Args:
+            game_id: ID of the game
+            round_number: Round number
+            player_id: ID of the player
+            bet: Bet amount
+            success: Whether the bet was successful
+
+        Returns:
+            Dictionary with the edit's version and the last flushed version
+        """
+        validate_bet(bet, round_number)
+        with self._lock:
+            pending = self._games.setdefault(game_id, _PendingGame())
+            pending.closed = False
+            pending.version += 1
+            pending.cells[(round_number, player_id)] = (bet, success, pending.version)
+            return {
+                "game_id": game_id,
+                "version": pending.version,
+                "flushed_version": pending.flushed_version
+            }
+
+    def version(self, game_id: int) -> int:
+        """Version of the latest edit submitted for a game (0 if none)."""
+        pending = self._games.get(game_id)
+        return pending.version if pending is not None else 0
+
+    def has_pending(self, game_id: int) -> bool:
+        pending = self._games.get(game_id)
+        return pending is not None and bool(pending.cells)
+
+    def flush_game(self, game_id: int, db: Optional[Session] = None) -> int:
+        """
+        Write all pending edits for one game in a single transaction.
+
+        Waits for a flush of the same game already in progress, so on return
+        every edit submitted before the call is committed. Does nothing
+        inside a write batch (see `database.in_write_batch`).
+
+        Args:
+            game_id: ID of the game
+            db: Session to write with (a new one is opened if omitted)
+
+        Returns:
+            Number of cells written
+
+        Raises:
+            Exception: A failed write other than a rejected edit; the edits
+                stay pending and are retried by the next flush
+        """
+        pending = self._games.get(game_id)
+        if pending is None or in_write_batch():
+            # A write batch flushed the buffer when it began; edits from other
+            # clients since then must not be rolled back with it, and on SQLite
+            # a second session would wait for the batch's write lock
+            return 0
+
+        # A flush that finds nothing pending must still wait for one that is
+        # writing, or a read could run before those edits are committed
+        try:
+            with pending.flush_lock:
+                with self._lock:
+                    cells, pending.cells = pending.cells, {}
+                if not cells:
+                    return 0
+
+                session = db if db is not None else self.session_factory()
+                written = len(cells)
+                try:
+                    try:
+                        self._write(session, game_id, cells)
+                        session.commit()
+                    except _REJECTED:
+                        # Requeueing would fail every later flush, and the reads
+                        # that flush, the same way: write cell by cell instead
+                        session.rollback()
+                        written = self._write_each(session, game_id, cells)
+                except Exception:
+                    session.rollback()
+                    self._requeue(game_id, cells)
+                    raise
+                finally:
+                    if db is None:
+                        session.close()
+
+                with self._lock:
+                    pending.flushed_version = max(
+                        pending.flushed_version, max(version for _, _, version in cells.values())
+                    )
+            return written
+        finally:
+            if pending.closed:
+                self._forget_if_done(game_id, pending)
+
+    def flush_all(self) -> int:
+        """Flush every game with pending edits; failures are logged and retried later."""
+        written = 0
+        for game_id in list(self._games):
+            try:
+                written += self.flush_game(game_id)
+            except Exception:
+                logger.exception("Failed to flush buffered cell edits for game %s", game_id)
+        return written
+
+    def discard_game(self, game_id: int) -> None:
+        """Drop pending edits and state for a game (e.g. when it is deleted)."""
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def close_game(self, game_id: int) -> None:
+        """
+        Forget a finished or cancelled game once its edits are written.
+
+        The game's state is dropped right away if nothing is pending or
+        being written, otherwise by the flush that writes the rest. A new
+        edit (after reactivating the game) keeps it.
+        """
+        with self._lock:
+            pending = self._games.get(game_id)
+            if pending is None:
+                return
+            pending.closed = True
+        self._forget_if_done(game_id, pending)
+
+    def _forget_if_done(self, game_id: int, pending: _PendingGame) -> None:
+        with self._lock:
+            if (
+                pending.closed and not pending.cells and not pending.flush_lock.locked()
+                and self._games.get(game_id) is pending
+            ):
+                del self._games[game_id]
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cell-buffer-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and flush everything still pending."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush_all()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush_all()
+
+    def _write(self, session: Session, game_id: int, cells: Dict[CellKey, Tuple[int, bool, int]]) -> None:
+        """Upsert the latest value of each cell in one executemany batch, and log them as one event."""
+        rows = [
+            {
+                "game_id": game_id,
+                "round_number": round_number,
+                "player_id": player_id,
+                "bet": bet,
+                "success": success,
+                "score": calculate_score(bet, success)
+            }
+            for (round_number, player_id), (bet, success, _) in cells.items()
+        ]
+        if session.scalar(select(Game.is_packed).where(Game.id == game_id)):
+            # The game was finished and packed after these edits were accepted
+            PackService(session).unpack_game(game_id)
+        session.execute(upsert_rounds(session), rows)
+        add_event(session, game_id, "cells_set", cell_payload(rows))
+    
+    def _write_each(self, session: Session, game_id: int, cells: Dict[CellKey, Tuple[int, bool, int]]) -> int:
+        """Write cells in a transaction each, moving rejected ones to `dead_letters`; returns the number written."""
+        written = 0
+        for key, value in cells.items():
+            try:
+                self._write(session, game_id, {key: value})
+                session.commit()
+                written += 1
+            except _REJECTED as exc:
+                session.rollback()
+                round_number, player_id = key
+                bet, success, version = value
+                logger.warning("Dropped buffered cell edit for game %s, round %s, player %s: %s",
+                               game_id, round_number, player_id, exc)
+                self.dead_letters.append({
+                    "game_id": game_id, "round_number": round_number, "player_id": player_id,
+                    "bet": bet, "success": success, "version": version, "error": str(exc)
+                })
+        return written
+
+    def _requeue(self, game_id: int, cells: Dict[CellKey, Tuple[int, bool, int]]) -> None:
+        """Put back edits from a failed flush unless a newer edit arrived meanwhile."""
+        with self._lock:
+            pending = self._games.setdefault(game_id, _PendingGame())
+            for key, value in cells.items():
+                current = pending.cells.get(key)
+                if current is None or current[2] < value[2]:
+                    pending.cells[key] = value
+
+
+cell_buffer = CellEditBuffer()
+"""Process-wide buffer used by the API and services."""
@@ -0,0 +1,279 @@
+"""
+Append-only game event log with snapshots and replay.
+
+Every change to a game's state appends an event in the same transaction
+(`utils.add_event`, and `update_game_or_404` for every game update):
+
+- game_created / game_imported: {"game": {...}, "player_ids": [...], "cells": [...]}
+- cells_set: {"cells": [[round_number, player_id, bet, success, score], ...]}
+- round_advanced, game_finished, game_cancelled, game_reactivated,
+  rounds_adjusted, game_updated: {"values": {column: new value, ...}}
+- game_deleted: {}
+
+Events are numbered from the global change sequence; the events of one
+transaction may share a number. Readers that keep a position stop at
+`database.change_head`, so an event that commits late is never skipped.
+`apply_event` folds them into a game state; `EventLog.state` starts from
+the newest snapshot at or before the requested point and replays only the
+events after it. Derived stores (rollups, ratings, caches) are rebuilt by
+`run_projection`, which streams events after the store's checkpoint and
+advances it in the same transaction as the store's writes.
+
+Moving rounds between storage tables (archive, packing) does not change
+the game's state and is not logged. Games from before the log get a
+single game_imported event from `python -m events bootstrap`.
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from database import EventCheckpoint, Game, GameEvent, GamePlayer, GameSnapshot, change_head
+from models import Game as GameSchema
+from utils import add_event, all_rounds, cell_payload
+from .pack_service import PackService
+
+
+DEFAULT_SNAPSHOT_EVERY = 200
+"""Events after a game's last snapshot before `snapshot_games` takes a new one."""
+
+_EVENT_COLUMNS = (GameEvent.seq, GameEvent.game_id, GameEvent.kind, GameEvent.payload, GameEvent.created_at)
+
+Projection = Callable[[Session, Row], None]
+"""Applies one event (seq, game_id, kind, payload, created_at) to a derived store."""
+
+
+def empty_state() -> Dict:
+    return {"game": {}, "player_ids": [], "cells": {}, "deleted": False}
+
+
+def apply_event(state: Optional[Dict], kind: str, payload: Dict) -> Dict:
+    """
+    Fold one event into a game state.
+
+    Args:
+        state: State so far (None before the first event)
+        kind: Event kind
+        payload: Event payload
+
+    Returns:
+        The new state: {"game", "player_ids", "cells": {"round:player":
+        [bet, success, score]}, "deleted"}; the given dict is updated in place
+    """
+    if kind in ("game_created", "game_imported"):
+        state = empty_state()
+        state["game"] = dict(payload["game"])
+        state["player_ids"] = list(payload["player_ids"])
+    elif state is None:
+        state = empty_state()
+
+    for round_number, player_id, bet, success, score in payload.get("cells", ()):
+        state["cells"][f"{round_number}:{player_id}"] = [bet, success, score]
+    if "values" in payload:
+        state["game"].update(payload["values"])
+    if kind == "game_deleted":
+        state["deleted"] = True
+    return state
+
+
+class GameStateProjection:
+    """In-memory projection of every game's state; the simplest derived store."""
+    
+    def __init__(self):
+        self.states: Dict[int, Dict] = {}
+    
+    def __call__(self, db: Session, event: Row) -> None:
+        self.states[event.game_id] = apply_event(self.states.get(event.game_id), event.kind, event.payload)
+
+
+class EventLog:
+    """Service for reading, snapshotting and replaying the game event log."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def events(self, game_id: int, after_seq: int = 0, until_seq: Optional[int] = None) -> List[Row]:
+        """
+        A game's events in order.
+        
+        Args:
+            game_id: ID of the game
+            after_seq: Only events after this sequence number
+            until_seq: Only events up to and including this one
+        
+        Returns:
+            Rows of seq, game_id, kind, payload, created_at
+        """
+        query = select(*_EVENT_COLUMNS).where(GameEvent.game_id == game_id, GameEvent.seq > after_seq)
+        if until_seq is not None:
+            query = query.where(GameEvent.seq <= until_seq)
+        return self.db.execute(query.order_by(GameEvent.seq, GameEvent.id)).all()
+    
+    def state(self, game_id: int, at_seq: Optional[int] = None) -> Optional[Dict]:
+        """
+        Rebuild a game's state from its newest usable snapshot plus later events.
+        
+        Args:
+            game_id: ID of the game
+            at_seq: State as of this sequence number (None for the latest)
+        
+        Returns:
+            {"seq": last event applied, "state": ...}, or None if the game
+            has no events up to that point
+        """
+        query = select(GameSnapshot.seq, GameSnapshot.state).where(GameSnapshot.game_id == game_id)
+        if at_seq is not None:
+            query = query.where(GameSnapshot.seq <= at_seq)
+        snapshot = self.db.execute(query.order_by(GameSnapshot.seq.desc()).limit(1)).first()
+        
+        seq, state = (snapshot.seq, snapshot.state) if snapshot else (0, None)
+        for event in self.events(game_id, after_seq=seq, until_seq=at_seq):
+            state = apply_event(state, event.kind, event.payload)
+            seq = event.seq
+        if state is None:
+            return None
+        return {"seq": seq, "state": state}
+    
+    def snapshot(self, game_id: int) -> Optional[int]:
+        """
+        Store a game's latest state as a snapshot, unless it is already the newest. Does not commit.
+        
+        Returns:
+            Sequence number of the new snapshot, or None
+        """
+        latest = self.db.scalar(
+            select(func.max(GameSnapshot.seq)).where(GameSnapshot.game_id == game_id)
+        )
+        current = self.state(game_id, at_seq=change_head(self.db))
+        if current is None or current["seq"] == latest:
+            return None
+        self.db.add(GameSnapshot(game_id=game_id, seq=current["seq"], state=current["state"]))
+        return current["seq"]
+    
+    def snapshot_games(self, min_events: int = DEFAULT_SNAPSHOT_EVERY) -> int:
+        """
+        Snapshot every game with at least `min_events` events since its last snapshot.
+        
+        Commits once per game, so it can run periodically next to live traffic.
+        
+        Returns:
+            Number of snapshots taken
+        """
+        latest = select(
+            GameSnapshot.game_id, func.max(GameSnapshot.seq).label("seq")
+        ).group_by(GameSnapshot.game_id).subquery()
+        due = list(self.db.scalars(
+            select(GameEvent.game_id)
+            .outerjoin(latest, latest.c.game_id == GameEvent.game_id)
+            .where(GameEvent.seq > func.coalesce(latest.c.seq, 0))
+            .group_by(GameEvent.game_id)
+            .having(func.count() >= min_events)
+        ))
+        taken = 0
+        for game_id in due:
+            if self.snapshot(game_id) is not None:
+                self.db.commit()
+                taken += 1
+        return taken
+    
+    def stream(self, after_seq: int = 0, batch_size: int = 1000) -> Iterator[List[Row]]:
+        """
+        Settled events after a sequence number, in order, in batches (keyset pagination).
+        
+        Events sharing a sequence number always come in the same batch, so
+        a checkpoint at a batch's last event covers all of them.
+        
+        Args:
+            after_seq: Checkpoint to continue from
+            batch_size: Events per batch (more when one number has more events)
+        
+        Yields:
+            Lists of rows of seq, game_id, kind, payload, created_at
+        """
+        head = change_head(self.db)
+        settled = select(*_EVENT_COLUMNS).where(GameEvent.seq <= head).order_by(GameEvent.seq, GameEvent.id)
+        while True:
+            batch = self.db.execute(settled.where(GameEvent.seq > after_seq).limit(batch_size)).all()
+            if not batch:
+                return
+            last = batch[-1].seq
+            if len(batch) == batch_size:
+                if batch[0].seq < last:
+                    batch = [event for event in batch if event.seq < last]
+                else:
+                    batch = self.db.execute(settled.where(GameEvent.seq == last)).all()
+            yield batch
+            after_seq = batch[-1].seq
+    
+    def run_projection(self, name: str, apply: Projection, batch_size: int = 1000) -> int:
+        """
+        Feed events after a named checkpoint to a derived store.
+        
+        The checkpoint advances in the same transaction as whatever `apply`
+        writes through the session, one commit per batch, so an interrupted
+        run resumes where it stopped without applying an event twice. To
+        rebuild a store from scratch, clear it and `reset_projection` first.
+        
+        Args:
+            name: Name of the derived store
+            apply: Called with (session, event) for every event in order
+            batch_size: Events per transaction
+        
+        Returns:
+            Number of events applied
+        """
+        checkpoint = self.db.get(EventCheckpoint, name)
+        if checkpoint is None:
+            checkpoint = EventCheckpoint(name=name, seq=0)
+            self.db.add(checkpoint)
+        
+        applied = 0
+        for batch in self.stream(checkpoint.seq, batch_size):
+            for event in batch:
+                apply(self.db, event)
+            checkpoint.seq = batch[-1].seq
+            self.db.commit()
+            applied += len(batch)
+        return applied
+    
+    def reset_projection(self, name: str) -> None:
+        """Start a derived store over from the first event. Does not commit."""
+        checkpoint = self.db.get(EventCheckpoint, name)
+        if checkpoint is not None:
+            checkpoint.seq = 0
+    
+    def bootstrap(self, batch_size: int = 100) -> int:
+        """
+        Record a game_imported event with the current state of every game without events.
+        
+        Args:
+            batch_size: Games per transaction
+        
+        Returns:
+            Number of games imported
+        """
+        logged = select(GameEvent.game_id).distinct()
+        game_ids = list(self.db.scalars(
+            select(Game.id).where(Game.id.not_in(logged)).order_by(Game.id)
+        ))
+        columns = [Game.__table__.c[name] for name in GameSchema.model_fields]
+        for start in range(0, len(game_ids), batch_size):
+            for game_id in game_ids[start:start + batch_size]:
+                game = self.db.execute(select(*columns).where(Game.id == game_id)).one()
+                rounds = all_rounds(game_id=game_id)
+                cells = [row._mapping for row in self.db.execute(
+                    select(rounds).order_by(rounds.c.round_number, rounds.c.player_id)
+                )]
+                if not cells:
+                    cells = [row._asdict() for row in PackService(self.db).game_rounds(game_id)]
+                add_event(self.db, game_id, "game_imported", {
+                    "game": GameSchema.model_validate(game._mapping).model_dump(mode="json"),
+                    "player_ids": list(self.db.scalars(
+                        select(GamePlayer.player_id).where(GamePlayer.game_id == game_id)
+                    )),
+                    **cell_payload(cells)
+                })
+            self.db.commit()
+        return len(game_ids)
@@ -8,18 +8,32 @@ Encapsulates game-related business logic, making it easier to:
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, select, insert, update, delete, and_, or_
 from datetime import datetime
-from typing import List, Optional
+from types import SimpleNamespace
+from typing import List, Dict, Optional, Sequence
+from fastapi import HTTPException
 
-from database import Game, GamePlayer, Player, Round
-from models import GameCreate, GameStats
+from database import Game, GameEvent, GamePlayer, Player, Round
+from models import GameCreate, GameStats, Game as GameSchema
 from utils import (
     get_game_or_404,
+    update_game_or_404,
     calculate_score,
-    validate_positive_int
+    validate_positive_int,
+    all_rounds,
+    packed_past_total_rounds,
+    round_totals,
+    add_tombstones,
+    add_event,
+    cell_payload
 )
-from constants import DEFAULT_GAME_TYPE
+from constants import DEFAULT_GAME_TYPE, DEFAULT_PURGE_BATCH_SIZE, PURGE_SAMPLE_SIZE
+from .cell_buffer import cell_buffer
+from .game_store import game_store
+from .archive_service import ROUNDS_DETACHED, ArchiveService, check_rounds_attached
+from .job_queue import JobQueue
+from .pack_service import PackService
 
 
 class GameService:
@@ -28,118 +42,387 @@ class GameService:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_game(self, game_data: GameCreate) -> Game:
+    def get_games(
+        self,
+        active_only: bool = False,
+        fields: Optional[List[str]] = None,
+        include: Sequence[str] = ()
+    ) -> List:
         """
-        Create a new game with specified players.
+        Get all games, newest first.
+        
+        Selects only the Game schema's columns (or the requested ones), in
+        field order, so rows can be serialized without loading ORM objects.
+        
+        Args:
+            active_only: Only return games in progress
+            fields: Game schema fields to return (None for all)
+            include: Expansions, fetched for all listed games in one more
+                query: "participants" ([{player_id, alias}]) and "stats"
+                ([{player_id, total_score, rounds_played}], as in game stats)
+            
+        Returns:
+            List of game rows, or dictionaries when expansions are included
+        """
+        columns = fields or list(GameSchema.model_fields)
+        stmt = select(*(Game.__table__.c[name] for name in columns))
+        if active_only:
+            stmt = stmt.where(Game.is_active == True)
+        games = self.db.execute(stmt.order_by(Game.date.desc())).all()
+        if not include:
+            return games
+        
+        game_ids = select(Game.id)
+        if active_only:
+            game_ids = game_ids.where(Game.is_active == True)
+        expansions = self._game_expansions(game_ids, include)
+        return [
+            {**row._mapping, **{name: expansions[name].get(row.id, []) for name in include}}
+            for row in games
+        ]
+    
+    def _game_expansions(self, game_ids, include: Sequence[str]) -> Dict[str, Dict[int, List[Dict]]]:
+        """
+        Participants and per-player totals of many games in one query.
+        
+        Args:
+            game_ids: Select of the game IDs to expand
+            include: "participants" and/or "stats"
+            
+        Returns:
+            Dictionary of expansion name to {game_id: entries}
+        """
+        query = select(GamePlayer.game_id, GamePlayer.player_id, Player.alias)\
+            .join(Player, Player.id == GamePlayer.player_id)\
+            .where(GamePlayer.game_id.in_(game_ids))
+        if "stats" in include:
+            totals = round_totals(game_ids=game_ids, within_total_rounds=True)
+            query = query.outerjoin(totals, and_(
+                totals.c.game_id == GamePlayer.game_id,
+                totals.c.player_id == GamePlayer.player_id
+            )).add_columns(totals.c.total_score, totals.c.rounds_played)
+        
+        expansions = {name: {} for name in include}
+        for row in self.db.execute(query):
+            if "participants" in include:
+                expansions["participants"].setdefault(row.game_id, []).append(
+                    {"player_id": row.player_id, "alias": row.alias}
+                )
+            if "stats" in include:
+                expansions["stats"].setdefault(row.game_id, []).append({
+                    "player_id": row.player_id,
+                    "total_score": int(row.total_score or 0),
+                    "rounds_played": row.rounds_played or 0
+                })
+        if "stats" in include:
+            # Packed games whose stored totals include rounds past total_rounds
+            for game_id, total_rounds in self.db.execute(packed_past_total_rounds(game_ids)):
+                packed = self._packed_totals(game_id, total_rounds)
+                for entry in expansions["stats"].get(game_id, []):
+                    player = packed.get(entry["player_id"])
+                    entry["total_score"] = player.total_score if player else 0
+                    entry["rounds_played"] = player.rounds_played if player else 0
+        return expansions
+    
+    def get_game(self, game_id: int):
+        """
+        Get a game by ID, from memory if it is a hot active game.
+        
+        Args:
+            game_id: ID of the game
+            
+        Returns:
+            Game instance, or a dictionary with the Game schema's fields
+            
+        Raises:
+            HTTPException: 404 if game not found
+        """
+        hot = game_store.game(game_id)
+        if hot is not None:
+            return hot
+        return get_game_or_404(game_id, self.db)
+    
+    def create_game(self, game_data: GameCreate) -> GameSchema:
+        """
+        Create a new game with specified players in one transaction.
+        
+        Uses a constant number of statements regardless of player count:
+        one lookup to validate all player IDs, the game INSERT, one
+        multi-row game_players INSERT, one last_game_date UPDATE,
+        optionally one INSERT seeding round 1 with bet 0 for everyone, and
+        the game_created event.
         
         Args:
             game_data: Game creation data including player IDs and settings
             
         Returns:
-            Created Game instance
+            Created game
+            
+        Raises:
+            HTTPException: If any player ID does not exist
         """
+        player_ids = list(dict.fromkeys(game_data.player_ids))  # dedupe, keep order
+        
+        # Validate all players at once
+        if player_ids:
+            found = set(self.db.scalars(select(Player.id).where(Player.id.in_(player_ids))))
+            unknown = [pid for pid in player_ids if pid not in found]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown player IDs: {unknown}")
+        
         # Create game
-        game = Game(
-            total_rounds=game_data.total_rounds,
-            game_type=game_data.game_type or DEFAULT_GAME_TYPE,
-            notes=game_data.notes,
-            location=game_data.location,
-            date=datetime.utcnow()
-        )
-        self.db.add(game)
-        self.db.commit()
-        self.db.refresh(game)
+        game_date = datetime.utcnow()
+        game = self.db.execute(
+            insert(Game).returning(Game),
+            [{
+                "total_rounds": game_data.total_rounds,
+                "game_type": game_data.game_type or DEFAULT_GAME_TYPE,
+                "notes": game_data.notes,
+                "location": game_data.location,
+                "date": game_date,
+                "current_round": 1,
+                "is_active": True,
+                "is_valid": False,
+                "version": 1
+            }]
+        ).scalar_one()
+        created = GameSchema.model_validate(game)
         
         # Add players and update their last_game_date
-        for player_id in game_data.player_ids:
-            self._add_player_to_game(game.id, player_id, game.date)
+        if player_ids:
+            self.db.execute(
+                insert(GamePlayer),
+                [{"game_id": game.id, "player_id": pid} for pid in player_ids]
+            )
+            self.db.execute(
+                update(Player)
+                .where(Player.id.in_(player_ids))
+                .values(last_game_date=game_date)
+                .execution_options(synchronize_session=False)
+            )
+        seeded = []
+        if player_ids and game_data.seed_first_round:
+            seeded = [
+                {
+                    "game_id": game.id,
+                    "round_number": 1,
+                    "player_id": pid,
+                    "bet": 0,
+                    "success": False,
+                    "score": calculate_score(0, False)
+                }
+                for pid in player_ids
+            ]
+            self.db.execute(insert(Round), seeded)
         
+        add_event(self.db, game.id, "game_created", {
+            "game": created.model_dump(mode="json"),
+            "player_ids": player_ids,
+            **cell_payload(seeded)
+        })
         self.db.commit()
-        self.db.refresh(game)
-        return game
+        return created
     
-    def _add_player_to_game(self, game_id: int, player_id: int, game_date: datetime) -> None:
-        """Helper to add a player to a game and update their last_game_date."""
-        game_player = GamePlayer(game_id=game_id, player_id=player_id)
-        self.db.add(game_player)
-        
-        # Update player's last_game_date
-        player = self.db.query(Player).filter(Player.id == player_id).first()
-        if player:
-            player.last_game_date = game_date
-    
-    def finish_game(self, game_id: int) -> Game:
+    def finish_game(
+        self,
+        game_id: int,
+        expected_version: Optional[int] = None,
+        pack: bool = False
+    ) -> Game:
         """
         Mark a game as finished (valid and inactive).
         
         Args:
             game_id: ID of the game to finish
+            expected_version: Only finish if the game is still at this version
+            pack: Also queue a job that moves the rounds into packed_rounds
             
         Returns:
             Updated Game instance
         """
-        game = get_game_or_404(game_id, self.db)
-        game.is_active = False
-        game.is_valid = True
+        cell_buffer.flush_game(game_id, self.db)
+        game = update_game_or_404(
+            game_id, self.db,
+            {"is_active": False, "is_valid": True},
+            expected_version=expected_version,
+            event="game_finished"
+        )
+        if pack:
+            JobQueue(self.db).enqueue("pack_game", {"game_id": game_id})
         self.db.commit()
+        cell_buffer.close_game(game_id)
+        game_store.discard_game(game_id)
         return game
     
-    def cancel_game(self, game_id: int) -> Game:
+    def cancel_game(self, game_id: int, expected_version: Optional[int] = None) -> Game:
         """
         Cancel a game (invalid and inactive).
         
         Args:
             game_id: ID of the game to cancel
+            expected_version: Only cancel if the game is still at this version
             
         Returns:
             Updated Game instance
         """
-        game = get_game_or_404(game_id, self.db)
-        game.is_active = False
-        game.is_valid = False
+        cell_buffer.flush_game(game_id, self.db)
+        game = update_game_or_404(
+            game_id, self.db,
+            {"is_active": False, "is_valid": False},
+            expected_version=expected_version,
+            event="game_cancelled"
+        )
         self.db.commit()
+        cell_buffer.close_game(game_id)
+        game_store.discard_game(game_id)
         return game
     
     def delete_game(self, game_id: int) -> None:
         """
         Permanently delete a game and all its rounds.
         
+        Rounds and game_players are removed by ON DELETE CASCADE; a
+        tombstone tells syncing clients to drop them too. Buffered cell
+        edits of the game are dropped, not written.
+        
         Args:
             game_id: ID of the game to delete
         """
-        game = get_game_or_404(game_id, self.db)
+        self._invalidate_games([game_id])
+        deleted = self.db.execute(delete(Game).where(Game.id == game_id)).rowcount
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Game not found")
+        add_tombstones(self.db, "game", [game_id])
+        add_event(self.db, game_id, "game_deleted", {})
+        self.db.commit()
+        self._invalidate_games([game_id])
+    
+    def purge_games(
+        self,
+        cancelled_before: Optional[datetime] = None,
+        abandoned_before: Optional[datetime] = None,
+        dry_run: bool = True,
+        batch_size: int = DEFAULT_PURGE_BATCH_SIZE
+    ) -> Dict:
+        """
+        Bulk delete cancelled and abandoned games.
         
-        # Delete all rounds first (due to foreign key)
-        self.db.query(Round).filter(Round.game_id == game_id).delete()
+        A game is abandoned when it is still active and nothing changed in it
+        (its latest event, e.g. a cell edit or new round) since the cutoff;
+        games from before the event log count from their creation date.
+        Deletes run set-based in batches of `batch_size` games, one commit
+        per batch; rounds and game_players go with them by cascade.
         
-        # Delete game players
-        self.db.query(GamePlayer).filter(GamePlayer.game_id == game_id).delete()
+        Args:
+            cancelled_before: Purge cancelled games (inactive, invalid) older than this
+            abandoned_before: Purge still-active games unchanged since this
+            dry_run: Only report what would be deleted
+            batch_size: Games deleted per statement
+            
+        Returns:
+            Report with counts of games, rounds and game_players and the
+            first PURGE_SAMPLE_SIZE game IDs
+            
+        Raises:
+            HTTPException: If no filter is given
+        """
+        conditions = []
+        if cancelled_before is not None:
+            conditions.append(and_(
+                Game.is_active == False, Game.is_valid == False, Game.date < cancelled_before
+            ))
+        if abandoned_before is not None:
+            last_change = func.coalesce(
+                select(func.max(GameEvent.created_at)).where(GameEvent.game_id == Game.id).scalar_subquery(),
+                Game.date
+            )
+            conditions.append(and_(Game.is_active == True, last_change < abandoned_before))
+        if not conditions:
+            raise HTTPException(status_code=400, detail="At least one purge filter is required")
+        validate_positive_int(batch_size, "Batch size")
         
-        # Delete game
-        self.db.delete(game)
-        self.db.commit()
+        # Buffered edits are changes too
+        cell_buffer.flush_all()
+        doomed = select(Game.id).where(or_(*conditions))
+        report = {
+            "dry_run": dry_run,
+            "games": self.db.scalar(select(func.count()).select_from(doomed.subquery())),
+            "rounds": self.db.scalar(
+                select(func.count()).select_from(Round).where(Round.game_id.in_(doomed))
+            ),
+            "game_players": self.db.scalar(
+                select(func.count()).select_from(GamePlayer).where(GamePlayer.game_id.in_(doomed))
+            ),
+            "sample_game_ids": list(self.db.scalars(doomed.order_by(Game.id).limit(PURGE_SAMPLE_SIZE)))
+        }
+        if dry_run:
+            return report
+        
+        while True:
+            batch = list(self.db.scalars(doomed.order_by(Game.id).limit(batch_size)))
+            if not batch:
+                break
+            self._invalidate_games(batch)
+            self.db.execute(delete(Game).where(Game.id.in_(batch)))
+            add_tombstones(self.db, "game", batch)
+            for game_id in batch:
+                add_event(self.db, game_id, "game_deleted", {})
+            self.db.commit()
+            self._invalidate_games(batch)
+        return report
+    
+    def _invalidate_games(self, game_ids: List[int]) -> None:
+        """
+        Drop in-process state held for games being deleted.
+        
+        Called before the delete, so buffered edits are not flushed into
+        it, and again after the commit, for edits or hot-store loads that
+        raced it.
+        """
+        for game_id in game_ids:
+            cell_buffer.discard_game(game_id)
+            game_store.discard_game(game_id)
+            game_store.discard_game(game_id)
     
-    def reactivate_game(self, game_id: int) -> Game:
+    def reactivate_game(self, game_id: int, expected_version: Optional[int] = None) -> Game:
         """
         Reactivate a finished/cancelled game for editing.
         
         Args:
             game_id: ID of the game to reactivate
+            expected_version: Only reactivate if the game is still at this version
             
         Returns:
             Updated Game instance
+            
+        Raises:
+            HTTPException: 400 if the game's rounds were detached with their
+                archive partition
         """
-        game = get_game_or_404(game_id, self.db)
-        game.is_active = True
-        game.is_valid = False  # Mark as invalid since we're editing
+        # Mark as invalid since we're editing
+        game = update_game_or_404(
+            game_id, self.db,
+            {"is_active": True, "is_valid": False},
+            expected_version=expected_version,
+            # Its rounds would be restored empty, and the game lost for good
+            where=Game.rounds_detached == False,
+            where_error=ROUNDS_DETACHED,
+            event="game_reactivated"
+        )
+        if game.is_archived:
+            ArchiveService(self.db).restore_game(game_id)
+        if game.is_packed:
+            PackService(self.db).unpack_game(game_id)
         self.db.commit()
+        game_store.discard_game(game_id)
         return game
     
     def update_metadata(
         self,
         game_id: int,
         notes: Optional[str] = None,
-        location: Optional[str] = None
+        location: Optional[str] = None,
+        expected_version: Optional[int] = None
     ) -> Game:
         """
         Update game metadata (notes and location).
@@ -148,22 +431,23 @@ class GameService:
             game_id: ID of the game to update
             notes: New notes (or None to keep current)
             location: New location (or None to keep current)
+            expected_version: Only update if the game is still at this version
             
         Returns:
             Updated Game instance
         """
-        game = get_game_or_404(game_id, self.db)
-        
+        values = {}
         if notes is not None:
-            game.notes = notes if notes else None
+            values["notes"] = notes if notes else None
         if location is not None:
-            game.location = location if location else None
+            values["location"] = location if location else None
         
+        game = update_game_or_404(game_id, self.db, values, expected_version=expected_version)
         self.db.commit()
-        self.db.refresh(game)
+        game_store.discard_game(game_id)
         return game
     
-    def adjust_rounds(self, game_id: int, new_total: int) -> dict:
+    def adjust_rounds(self, game_id: int, new_total: int, expected_version: Optional[int] = None) -> dict:
         """
         Adjust the total number of rounds in a game.
         
@@ -172,64 +456,82 @@ class GameService:
         Args:
             game_id: ID of the game to adjust
             new_total: New total number of rounds
+            expected_version: Only adjust if the game is still at this version
             
         Returns:
-            Dictionary with message, new_total, and current_round
+            Dictionary with message, new_total, current_round and version
         """
-        game = get_game_or_404(game_id, self.db)
         validate_positive_int(new_total, "Total rounds")
+        cell_buffer.flush_game(game_id, self.db)
         
-        # Update total
-        game.total_rounds = new_total
-        
-        # Set current_round to last round with ANY data
-        game.current_round = self._find_last_populated_round(game_id, new_total)
-        
-        self.db.commit()
-        return {
+        # Update total and set current_round to last round with ANY data
+        game = update_game_or_404(
+            game_id, self.db,
+            {
+                "total_rounds": new_total,
+                "current_round": self._last_populated_round(game_id, new_total)
+            },
+            expected_version=expected_version,
+            event="rounds_adjusted"
+        )
+        result = {
             "message": f"Total rounds adjusted to {new_total}",
             "new_total": new_total,
-            "current_round": game.current_round
+            "current_round": game.current_round,
+            "version": game.version
         }
+        self.db.commit()
+        game_store.discard_game(game_id)
+        return result
     
-    def _find_last_populated_round(self, game_id: int, max_rounds: int) -> int:
+    def _last_populated_round(self, game_id: int, max_rounds: int):
         """
-        Find the last round that has ANY data in it.
+        SQL expression for the last round that has ANY data in it.
         
         This is like: last_row = np.where(~np.isnan(matrix).all(axis=1))[0].max()
         
+        Evaluated inside the UPDATE, so adjusting rounds is a single statement.
+        
         Args:
             game_id: ID of the game
             max_rounds: Maximum round to check (total_rounds)
             
         Returns:
-            Last round number with data, or 1 if no data exists
+            Scalar expression: last round number with data, or 1 if no data exists
         """
-        highest_round_with_data = self.db.query(func.max(Round.round_number))\
-            .filter(Round.game_id == game_id, Round.round_number <= max_rounds)\
-            .scalar()
-        
-        return highest_round_with_data if highest_round_with_data else 1
+        return func.coalesce(
+            select(func.max(Round.round_number))
+            .where(Round.game_id == game_id, Round.round_number <= max_rounds)
+            .scalar_subquery(),
+            1
+        )
     
-    def increment_current_round(self, game_id: int) -> dict:
+    def increment_current_round(self, game_id: int, expected_version: Optional[int] = None) -> dict:
         """
-        Increment current_round by 1.
+        Increment current_round by 1, up to total_rounds.
         
-        Called by "Next Round" button.
+        Called by "Next Round" button. Runs as one atomic UPDATE, so devices
+        pressing the button at the same time cannot skip or lose increments.
         
         Args:
             game_id: ID of the game
+            expected_version: Only increment if the game is still at this version
             
         Returns:
-            Dictionary with updated current_round
+            Dictionary with updated current_round and version
         """
-        game = get_game_or_404(game_id, self.db)
-        
-        if game.current_round < game.total_rounds:
-            game.current_round += 1
-        
+        cell_buffer.flush_game(game_id, self.db)
+        can_advance = Game.current_round < Game.total_rounds
+        game = update_game_or_404(
+            game_id, self.db,
+            {"current_round": case((can_advance, Game.current_round + 1), else_=Game.current_round)},
+            expected_version=expected_version,
+            event="round_advanced"
+        )
+        result = {"current_round": game.current_round, "version": game.version}
         self.db.commit()
-        return {"current_round": game.current_round}
+        game_store.update_game(game_id, **result)
+        return result
     
     def get_game_stats(self, game_id: int) -> List[GameStats]:
         """
@@ -240,43 +542,84 @@ class GameService:
             
         Returns:
             List of GameStats for each player
+            
+        Raises:
+            HTTPException: 404 if game not found, 410 if its rounds were
+                detached with their archive partition
         """
+        hot = game_store.game_stats(game_id)
+        if hot is not None:
+            return hot
+        
+        # Write any buffered edits on the primary before reading
+        cell_buffer.flush_game(game_id)
         game = get_game_or_404(game_id, self.db)
+        check_rounds_attached(game.rounds_detached)
         
-        # Get all players in the game
-        game_players = self.db.query(GamePlayer)\
+        # Players in the game, in participation order
+        participants = self.db.query(Player.id, Player.alias)\
+            .join(GamePlayer, GamePlayer.player_id == Player.id)\
             .filter(GamePlayer.game_id == game_id).all()
         
+        # Aggregate rounds per player in one query (ONLY within game.total_rounds)
+        if game.is_packed:
+            totals = self._packed_totals(game_id, game.total_rounds)
+        else:
+            rounds = all_rounds(game_id=game_id)
+            totals = {
+                row.player_id: row for row in self.db.query(
+                    rounds.c.player_id,
+                    func.count(rounds.c.id).label('rounds_played'),
+                    func.sum(rounds.c.score).label('total_score'),
+                    func.sum(case((rounds.c.success == True, 1), else_=0)).label('successful_bets'),
+                    func.avg(rounds.c.bet).label('average_bet')
+                ).filter(
+                    rounds.c.round_number <= game.total_rounds
+                ).group_by(rounds.c.player_id).all()
+            }
+        
         result = []
-        for gp in game_players:
-            # Get player info
-            player = self.db.query(Player)\
-                .filter(Player.id == gp.player_id).first()
-            if not player:
-                continue
-            
-            # Get stats from rounds (ONLY within game.total_rounds)
-            rounds = self.db.query(Round).filter(
-                Round.game_id == game_id,
-                Round.player_id == gp.player_id,
-                Round.round_number <= game.total_rounds
-            ).all()
-            
-            total_score = sum(r.score or 0 for r in rounds)
-            rounds_played = len(rounds)
-            successful_bets = sum(1 for r in rounds if r.success)
-            failed_bets = rounds_played - successful_bets
-            average_bet = sum(r.bet for r in rounds) / rounds_played if rounds_played > 0 else 0.0
+        for player_id, alias in participants:
+            row = totals.get(player_id)
+            rounds_played = row.rounds_played if row else 0
+            successful_bets = (row.successful_bets or 0) if row else 0
             
             result.append(GameStats(
                 game_id=game_id,
-                player_id=player.id,
-                player_alias=player.alias,
-                total_score=total_score,
+                player_id=player_id,
+                player_alias=alias,
+                total_score=(row.total_score or 0) if row else 0,
                 rounds_played=rounds_played,
                 successful_bets=successful_bets,
-                failed_bets=failed_bets,
-                average_bet=average_bet
+                failed_bets=rounds_played - successful_bets,
+                average_bet=float(row.average_bet) if row and row.average_bet is not None else 0.0
             ))
         
         return result
+    
+    def _packed_totals(self, game_id: int, max_rounds: int) -> Dict[int, SimpleNamespace]:
+        """
+        Per-player aggregates of a packed game, like the SQL aggregate in get_game_stats.
+        
+        Args:
+            game_id: ID of the game
+            max_rounds: Only count rounds up to this number (total_rounds)
+            
+        Returns:
+            Dictionary of player ID to rounds_played, total_score,
+            successful_bets and average_bet
+        """
+        totals = {}
+        for row in PackService(self.db).game_rounds(game_id):
+            if row.round_number > max_rounds:
+                continue
+            player = totals.setdefault(row.player_id, SimpleNamespace(
+                rounds_played=0, total_score=0, successful_bets=0, bet_sum=0
+            ))
+            player.rounds_played += 1
+            player.total_score += row.score
+            player.successful_bets += 1 if row.success else 0
+            player.bet_sum += row.bet
+        for player in totals.values():
+            player.average_bet = player.bet_sum / player.rounds_played
+        return totals
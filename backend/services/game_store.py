@@ -0,0 +1,375 @@
+"""
+In-process store for active games.
+
+Only a handful of games are in progress at any time, and they receive all
+the interactive traffic: cell edits, "Next Round", stats refreshes. The
+store keeps each active game's row, players, cells and per-player running
+totals in memory, so `/games/{id}`, `/rounds`, `/matrix` and `/stats` for
+an active game are served without SQL.
+
+- A game is loaded from the primary on first access (finished games are
+  never loaded).
+- Round and game services write to the database first and then apply the
+  same change here (write-through); anything the store cannot apply
+  cheaply (metadata, adjusting rounds, finish, cancel, delete, player
+  renames) evicts the game instead.
+- Edits queued in the write-behind buffer are picked up by comparing the
+  buffer's per-game version on every read.
+- `verify` compares the hot games against the database and drops any that
+  disagree; the app runs it on startup after preloading the active games.
+
+With several API workers, every committed change to a game or player is
+also sent over the invalidation bus (`utils.invalidation`), and the other
+workers' stores drop the affected games (`invalidate`). Enable the store
+with PARVIS_HOT_GAMES.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import Game, GamePlayer, Player, Round, SessionLocal, in_write_batch
+from models import Game as GameSchema, GameStats
+from .cell_buffer import CellKey, cell_buffer
+from .pack_service import ROUND_COLUMNS, RoundRow
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_GAMES = 256
+"""Hot games kept at most; the least recently used one is evicted beyond that."""
+
+EPOCHS_PER_SLOT = 4
+"""Per-game change counters kept for each of `max_games` before all are reset (see `ActiveGameStore._bump`)."""
+
+_GAME_COLUMNS = tuple(GameSchema.model_fields)
+
+
+@dataclass
+class HotGame:
+    game: Dict
+    """The game row, with the Game schema's fields."""
+    players: List[Tuple[int, str]]
+    """(player_id, alias) in participation order."""
+    cells: Dict[CellKey, RoundRow] = field(default_factory=dict)
+    totals: Dict[int, List[int]] = field(default_factory=dict)
+    """[rounds_played, total_score, successful_bets, bet_sum] per player, within total_rounds."""
+    buffer_version: int = 0
+    """Write-behind buffer version for this game when it was loaded."""
+
+    def add_to_totals(self, cell: RoundRow, sign: int) -> None:
+        if cell.round_number > self.game["total_rounds"]:
+            return
+        totals = self.totals.setdefault(cell.player_id, [0, 0, 0, 0])
+        totals[0] += sign
+        totals[1] += sign * (cell.score or 0)
+        totals[2] += sign * (1 if cell.success else 0)
+        totals[3] += sign * cell.bet
+
+
+class ActiveGameStore:
+    """Authoritative in-memory copy of active games, kept in sync by the services."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_games: int = DEFAULT_MAX_GAMES
+    ):
+        self.session_factory = session_factory
+        self.max_games = max_games
+        self.enabled = False
+        self.hits = 0
+        self.misses = 0
+        self._games: "OrderedDict[int, HotGame]" = OrderedDict()
+        self._epochs: Dict[int, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def stats(self) -> Tuple[int, int]:
+        """(hits, misses), for `metrics_registry.register_cache`."""
+        return self.hits, self.misses
+
+    def game(self, game_id: int) -> Optional[Dict]:
+        """The game row of an active game, or None if it is not served from memory."""
+        hot = self._get(game_id)
+        if hot is None:
+            return None
+        with self._lock:
+            return dict(hot.game)
+
+    def rounds(self, game_id: int) -> Optional[List[RoundRow]]:
+        """An active game's rounds ordered by round_number and player_id, or None."""
+        hot = self._get(game_id)
+        if hot is None:
+            return None
+        with self._lock:
+            cells = list(hot.cells.values())
+        cells.sort(key=lambda cell: (cell.round_number, cell.player_id))
+        return cells
+
+    def game_stats(self, game_id: int) -> Optional[List[GameStats]]:
+        """Per-player statistics of an active game from the running totals, or None."""
+        hot = self._get(game_id)
+        if hot is None:
+            return None
+        with self._lock:
+            totals = {player_id: list(values) for player_id, values in hot.totals.items()}
+            players = list(hot.players)
+        result = []
+        for player_id, alias in players:
+            played, score, successes, bet_sum = totals.get(player_id, (0, 0, 0, 0))
+            result.append(GameStats(
+                game_id=game_id,
+                player_id=player_id,
+                player_alias=alias,
+                total_score=score,
+                rounds_played=played,
+                successful_bets=successes,
+                failed_bets=played - successes,
+                average_bet=bet_sum / played if played else 0.0
+            ))
+        return result
+
+    def matrix_source(self, game_id: int) -> Optional[Tuple[int, List[int], List[RoundRow]]]:
+        """(total_rounds, player IDs, cells) of an active game for the matrix view, or None."""
+        hot = self._get(game_id)
+        if hot is None:
+            return None
+        with self._lock:
+            return (
+                hot.game["total_rounds"] or 0,
+                sorted(player_id for player_id, _ in hot.players),
+                list(hot.cells.values())
+            )
+
+    def put_cells(self, game_id: int, rows: Iterable[Mapping]) -> None:
+        """
+        Apply rounds that were just written to the database.
+
+        Args:
+            game_id: ID of the game
+            rows: Round rows (id, round_number, player_id, bet, success, score)
+        """
+        with self._lock:
+            self._bump(game_id)
+            hot = self._games.get(game_id)
+            if hot is None:
+                return
+            for row in rows:
+                cell = RoundRow(
+                    row["id"], game_id, row["round_number"], row["player_id"],
+                    row["bet"], row["success"], row["score"]
+                )
+                key = (cell.round_number, cell.player_id)
+                previous = hot.cells.get(key)
+                if previous is not None:
+                    hot.add_to_totals(previous, -1)
+                hot.cells[key] = cell
+                hot.add_to_totals(cell, 1)
+
+    def update_game(self, game_id: int, **values) -> None:
+        """
+        Apply game fields that were just written to the database.
+
+        Args:
+            game_id: ID of the game
+            **values: Columns of the game row (current_round, version)
+        """
+        with self._lock:
+            self._bump(game_id)
+            hot = self._games.get(game_id)
+            if hot is not None:
+                hot.game.update(values)
+
+    def discard_game(self, game_id: int) -> None:
+        """Drop a game (finished, cancelled, deleted or changed in ways not applied here)."""
+        with self._lock:
+            self._bump(game_id)
+            self._games.pop(game_id, None)
+
+    def discard_player(self, player_id: int) -> None:
+        """Drop every hot game a player takes part in (e.g. after a rename)."""
+        with self._lock:
+            for game_id, hot in list(self._games.items()):
+                if any(pid == player_id for pid, _ in hot.players):
+                    self._bump(game_id)
+                    del self._games[game_id]
+
+    def discard_all(self) -> None:
+        """Drop every hot game, including ones being loaded right now."""
+        with self._lock:
+            self._generation += 1
+            self._games.clear()
+
+    def invalidate(self, kind: str, entity_id: int) -> None:
+        """Apply a change committed by another worker; subscribed to the invalidation bus."""
+        if kind == "game":
+            self.discard_game(entity_id)
+        elif kind == "player":
+            self.discard_player(entity_id)
+        else:
+            self.discard_all()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._games.clear()
+            self._epochs.clear()
+            self._generation += 1
+            self.hits = self.misses = 0
+
+    def load_active(self) -> int:
+        """
+        Preload every active game (up to max_games).
+
+        Returns:
+            Number of games loaded
+        """
+        if not self.enabled:
+            return 0
+        session = self.session_factory()
+        try:
+            game_ids = list(session.scalars(
+                select(Game.id).where(Game.is_active == True)
+                .order_by(Game.date.desc()).limit(self.max_games)
+            ))
+        finally:
+            session.close()
+        return sum(1 for game_id in game_ids if self._load(game_id) is not None)
+
+    def verify(self) -> List[int]:
+        """
+        Compare every hot game with the database and drop the ones that disagree.
+
+        Checks the game's version, activity and current round, and each
+        player's number of rounds and total score, in two queries.
+
+        Returns:
+            IDs of the games dropped
+        """
+        with self._lock:
+            snapshot = {
+                game_id: (
+                    (hot.game["version"], hot.game["current_round"]),
+                    (self._generation, self._epochs.get(game_id, 0)),
+                    self._cell_totals(hot)
+                )
+                for game_id, hot in self._games.items()
+            }
+        if not snapshot:
+            return []
+
+        session = self.session_factory()
+        try:
+            games = {
+                row.id: (row.version, row.current_round)
+                for row in session.execute(
+                    select(Game.id, Game.version, Game.current_round)
+                    .where(Game.id.in_(snapshot), Game.is_active == True)
+                )
+            }
+            cells: Dict[int, Dict[int, Tuple[int, int]]] = {}
+            for row in session.execute(
+                select(
+                    Round.game_id, Round.player_id,
+                    func.count(Round.id), func.coalesce(func.sum(Round.score), 0)
+                ).where(Round.game_id.in_(snapshot))
+                .group_by(Round.game_id, Round.player_id)
+            ):
+                cells.setdefault(row[0], {})[row[1]] = (row[2], int(row[3]))
+        finally:
+            session.close()
+
+        stale = []
+        with self._lock:
+            for game_id, (game_state, epoch, cell_totals) in snapshot.items():
+                if (self._generation, self._epochs.get(game_id, 0)) != epoch:
+                    continue  # Changed while checking; the newer state wins
+                if games.get(game_id) != game_state or cells.get(game_id, {}) != cell_totals:
+                    self._bump(game_id)
+                    self._games.pop(game_id, None)
+                    stale.append(game_id)
+        for game_id in stale:
+            logger.warning("Hot state of game %s disagreed with the database; dropped it", game_id)
+        return stale
+
+    def _get(self, game_id: int) -> Optional[HotGame]:
+        if not self.enabled or in_write_batch():
+            # Reads inside a write batch must see its uncommitted writes
+            return None
+        buffer_version = cell_buffer.version(game_id)
+        with self._lock:
+            hot = self._games.get(game_id)
+            if hot is not None and hot.buffer_version == buffer_version:
+                self._games.move_to_end(game_id)
+                self.hits += 1
+                return hot
+            self.misses += 1
+        return self._load(game_id)
+
+    def _load(self, game_id: int) -> Optional[HotGame]:
+        """Read an active game from the primary and keep it, unless it changed meanwhile."""
+        with self._lock:
+            epoch = (self._generation, self._epochs.get(game_id, 0))
+        buffer_version = cell_buffer.version(game_id)
+        cell_buffer.flush_game(game_id)
+
+        session = self.session_factory()
+        try:
+            row = session.execute(
+                select(*(Game.__table__.c[name] for name in _GAME_COLUMNS))
+                .where(Game.id == game_id, Game.is_active == True)
+            ).first()
+            if row is None:
+                return None
+            players = [
+                (player_id, alias) for player_id, alias in session.query(Player.id, Player.alias)
+                .join(GamePlayer, GamePlayer.player_id == Player.id)
+                .filter(GamePlayer.game_id == game_id)
+            ]
+            cells = session.execute(
+                select(*ROUND_COLUMNS).where(Round.game_id == game_id)
+            ).all()
+        finally:
+            session.close()
+
+        hot = HotGame(game=dict(row._mapping), players=players, buffer_version=buffer_version)
+        for cell in cells:
+            cell = RoundRow(*cell)
+            hot.cells[(cell.round_number, cell.player_id)] = cell
+            hot.add_to_totals(cell, 1)
+
+        with self._lock:
+            if (self._generation, self._epochs.get(game_id, 0)) != epoch:
+                return hot  # A write raced the load: serve it once, don't keep it
+            self._games[game_id] = hot
+            self._games.move_to_end(game_id)
+            while len(self._games) > self.max_games:
+                self._games.popitem(last=False)
+        return hot
+
+    def _bump(self, game_id: int) -> None:
+        """Record a change to a game; loads that started before it are not kept. Hold the lock."""
+        self._epochs[game_id] = self._epochs.get(game_id, 0) + 1
+        if len(self._epochs) > EPOCHS_PER_SLOT * self.max_games:
+            # Counters of games long gone pile up; starting a new generation
+            # still turns away every load begun before this change
+            self._epochs.clear()
+            self._generation += 1
+
+    @staticmethod
+    def _cell_totals(hot: HotGame) -> Dict[int, Tuple[int, int]]:
+        totals: Dict[int, List[int]] = {}
+        for cell in hot.cells.values():
+            player = totals.setdefault(cell.player_id, [0, 0])
+            player[0] += 1
+            player[1] += cell.score or 0
+        return {player_id: tuple(values) for player_id, values in totals.items()}
+
+
+game_store = ActiveGameStore()
+"""Process-wide store used by the API and services."""
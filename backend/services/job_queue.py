@@ -0,0 +1,296 @@
+"""
+Durable background job queue backed by the `jobs` table.
+
+Expensive follow-up work (packing a finished game, archiving, event
+snapshots) is enqueued with `JobQueue.enqueue` in the caller's transaction,
+so a job exists exactly when the change that needs it commits, and the
+request returns without waiting for it. Workers (`JobRunner`, in-process
+with PARVIS_JOB_WORKERS or as `python -m worker`) claim jobs by priority:
+
+- Claiming is one UPDATE of the next runnable row (FOR UPDATE SKIP LOCKED
+  on Postgres), so several workers never run the same job.
+- A claimed job holds a lease, extended whenever it reports progress; if
+  its worker dies, another worker claims it after the lease expires (but
+  not after its last attempt, so a job that kills workers stops there:
+  the next claim marks it failed).
+- Identical jobs (same kind and arguments) are pending at most once;
+  enqueueing a duplicate returns the pending job, raised to the higher
+  priority.
+- A failed job is retried with exponential backoff up to max_attempts.
+
+Handlers are plain functions `handler(db, args, progress) -> result` (see
+services/jobs.py). They run in their own session, committed when they
+return; `progress(done, total, message)` is recorded in a separate
+session and served by `GET /jobs/{id}`.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Mapping, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from database import Job, SessionLocal
+from utils import dialect_insert
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE = timedelta(minutes=5)
+"""How long a worker owns a job without reporting progress."""
+
+RETRY_DELAY = timedelta(seconds=10)
+"""Wait before the first retry; doubles with every further attempt."""
+
+DEFAULT_POLL_INTERVAL = 1.0
+"""Seconds an idle worker waits before looking for jobs again."""
+
+Progress = Callable[..., None]
+"""progress(done, total, message=None), called by handlers."""
+
+JobHandler = Callable[[Session, Dict, Progress], Optional[Dict]]
+
+_CLAIMED_COLUMNS = (Job.id, Job.kind, Job.args, Job.dedup_key, Job.attempts, Job.max_attempts)
+
+
+def dedup_key(kind: str, args: Mapping) -> str:
+    return f"{kind}:{json.dumps(args, sort_keys=True, separators=(',', ':'))}"
+
+
+class JobQueue:
+    """Service for enqueueing, claiming and reporting on background jobs."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        kind: str,
+        args: Optional[Dict] = None,
+        priority: int = 0,
+        max_attempts: int = 3,
+        dedup: bool = True
+    ) -> int:
+        """
+        Add a job, unless an identical one is already pending. Does not commit.
+
+        Args:
+            kind: Handler name (see services/jobs.py)
+            args: JSON-serializable handler arguments
+            priority: Higher runs first
+            max_attempts: Runs before the job is marked failed
+            dedup: Skip if a pending job has the same kind and arguments
+
+        Returns:
+            ID of the new or already pending job
+        """
+        args = args or {}
+        key = dedup_key(kind, args) if dedup else None
+        pending = Job.status == "pending"
+        while True:
+            stmt = dialect_insert(self.db, Job).values(
+                kind=kind, args=args, dedup_key=key, priority=priority,
+                status="pending", attempts=0, max_attempts=max_attempts,
+                run_after=datetime.utcnow(), created_at=datetime.utcnow()
+            )
+            if key is not None:
+                stmt = stmt.on_conflict_do_nothing(index_elements=["dedup_key"], index_where=pending)
+            job_id = self.db.execute(stmt.returning(Job.id)).scalar()
+            if job_id is not None:
+                return job_id
+            job_id = self.db.scalar(select(Job.id).where(Job.dedup_key == key, pending))
+            if job_id is not None:  # Else it was claimed meanwhile; insert again
+                self.db.execute(
+                    update(Job).where(Job.id == job_id, Job.priority < priority).values(priority=priority)
+                )
+                return job_id
+
+    def get(self, job_id: int) -> Job:
+        """
+        Get a job by ID.
+
+        Raises:
+            HTTPException: 404 if the job does not exist
+        """
+        job = self.db.get(Job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """Most recent jobs first, optionally with one status."""
+        query = select(Job).order_by(Job.id.desc()).limit(limit)
+        if status is not None:
+            query = query.where(Job.status == status)
+        return list(self.db.scalars(query))
+
+    def claim(self, lease: timedelta = DEFAULT_LEASE) -> Optional[Row]:
+        """
+        Take the next runnable job and commit.
+
+        Jobs whose lease expired on their last attempt are marked failed first.
+
+        Returns:
+            Row of id, kind, args, dedup_key, attempts (including this one)
+            and max_attempts, or None if nothing is runnable
+        """
+        now = datetime.utcnow()
+        self.db.execute(
+            update(Job).where(Job.status == "running", Job.lease_expires_at < now,
+                              Job.attempts >= Job.max_attempts)
+            .values(status="failed", error="Lease expired on the last attempt",
+                    finished_at=now, lease_expires_at=None)
+        )
+        candidate = (
+            select(Job.id)
+            .where(or_(
+                and_(Job.status == "pending", Job.run_after <= now),
+                and_(Job.status == "running", Job.lease_expires_at < now,
+                     Job.attempts < Job.max_attempts)
+            ))
+            .order_by(Job.priority.desc(), Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        job = self.db.execute(
+            update(Job).where(Job.id == candidate)
+            .values(status="running", attempts=Job.attempts + 1, started_at=now,
+                    lease_expires_at=now + lease)
+            .returning(*_CLAIMED_COLUMNS)
+        ).first()
+        self.db.commit()
+        return job
+
+    def report(self, job: Row, done: int, total: int, message: Optional[str] = None,
+               lease: timedelta = DEFAULT_LEASE) -> None:
+        """Record a claimed job's progress and extend its lease."""
+        self._update_attempt(job, progress={"done": done, "total": total, "message": message},
+                             lease_expires_at=datetime.utcnow() + lease)
+
+    def complete(self, job: Row, result: Optional[Dict]) -> None:
+        """Mark a claimed job done."""
+        self._update_attempt(job, status="done", result=result, error=None,
+                             finished_at=datetime.utcnow(), lease_expires_at=None)
+
+    def fail(self, job: Row, error: str) -> None:
+        """Schedule a retry of a claimed job that raised, or mark it failed after its last attempt."""
+        now = datetime.utcnow()
+        # An identical job enqueued since this one was claimed will do the work
+        superseded = job.dedup_key is not None and self.db.scalar(
+            select(Job.id).where(Job.dedup_key == job.dedup_key, Job.status == "pending")
+        ) is not None
+        if job.attempts < job.max_attempts and not superseded:
+            delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+            self._update_attempt(job, status="pending", error=error,
+                                 run_after=now + delay, lease_expires_at=None)
+        else:
+            self._update_attempt(job, status="failed", error=error,
+                                 finished_at=now, lease_expires_at=None)
+
+    def _update_attempt(self, job: Row, **values) -> None:
+        """Update a job only if this attempt still owns it, and commit."""
+        self.db.execute(
+            update(Job).where(Job.id == job.id, Job.status == "running", Job.attempts == job.attempts)
+            .values(**values)
+        )
+        self.db.commit()
+
+
+class JobRunner:
+    """Pool of worker threads running queued jobs."""
+
+    def __init__(
+        self,
+        handlers: Mapping[str, JobHandler],
+        session_factory: Callable[[], Session] = SessionLocal,
+        concurrency: int = 1,
+        poll_interval: float = DEFAULT_POLL_INTERVAL
+    ):
+        self.handlers = handlers
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = uuid.uuid4().hex[:8]
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def run_once(self) -> bool:
+        """
+        Claim and run one job.
+
+        Returns:
+            False if no job was runnable
+        """
+        bookkeeping = self.session_factory()
+        try:
+            queue = JobQueue(bookkeeping)
+            job = queue.claim()
+            if job is None:
+                return False
+            self._run(queue, job)
+            return True
+        finally:
+            bookkeeping.close()
+
+    def run_pending(self) -> int:
+        """Run jobs until none is runnable; returns how many ran."""
+        ran = 0
+        while self.run_once():
+            ran += 1
+        return ran
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker threads after their current jobs."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Job worker %s failed to claim a job", self.name)
+            self._stop.wait(self.poll_interval)
+
+    def _run(self, queue: JobQueue, job: Row) -> None:
+        session = self.session_factory()
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise ValueError(f"No handler for job kind {job.kind!r}")
+
+            def progress(done: int, total: int, message: Optional[str] = None) -> None:
+                queue.report(job, done, total, message)
+
+            result = handler(session, job.args, progress)
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            logger.exception("Job %s (%s) failed on attempt %s", job.id, job.kind, job.attempts)
+            queue.fail(job, f"{type(exc).__name__}: {exc}")
+            return
+        finally:
+            session.close()
+        queue.complete(job, result)
@@ -0,0 +1,64 @@
+"""
+Handlers for background jobs, by kind (see services/job_queue.py).
+
+Each handler gets its own session, the job's arguments and a progress
+callback, and returns a JSON-serializable result. The session is committed
+when it returns; handlers that work in batches commit as they go. A job may
+run after the state that queued it has changed again, so handlers check
+that their work still applies.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import Game
+from .archive_service import ArchiveService
+from .event_log import DEFAULT_SNAPSHOT_EVERY, EventLog
+from .job_queue import JobHandler, Progress
+from .pack_service import PackService
+
+
+def pack_game(db: Session, args: Dict, progress: Progress) -> Optional[Dict]:
+    """Pack a finished game's rounds, unless it was reactivated, deleted or packed since."""
+    game = db.execute(
+        select(Game.is_active, Game.is_packed).where(Game.id == args["game_id"]).with_for_update()
+    ).first()
+    if game is None or game.is_active or game.is_packed:
+        return {"rounds": 0}
+    return {"rounds": PackService(db).pack_game(args["game_id"])}
+
+
+def pack_games(db: Session, args: Dict, progress: Progress) -> Optional[Dict]:
+    """Pack finished games played before args["before"] (ISO date)."""
+    return PackService(db).pack_games(
+        datetime.fromisoformat(args["before"]), args.get("batch_size", 100), progress
+    )
+
+
+def archive_games(db: Session, args: Dict, progress: Progress) -> Optional[Dict]:
+    """Archive finished games played before args["before"] (ISO date)."""
+    return ArchiveService(db).archive_games(
+        datetime.fromisoformat(args["before"]), args.get("batch_size", 100), progress
+    )
+
+
+def snapshot_games(db: Session, args: Dict, progress: Progress) -> Optional[Dict]:
+    """Snapshot games with many events since their last snapshot."""
+    return {"snapshots": EventLog(db).snapshot_games(args.get("min_events", DEFAULT_SNAPSHOT_EVERY))}
+
+
+def bootstrap_events(db: Session, args: Dict, progress: Progress) -> Optional[Dict]:
+    """Log the current state of games from before the event log."""
+    return {"games": EventLog(db).bootstrap(args.get("batch_size", 100))}
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "pack_game": pack_game,
+    "pack_games": pack_games,
+    "archive_games": archive_games,
+    "snapshot_games": snapshot_games,
+    "bootstrap_events": bootstrap_events,
+}
@@ -0,0 +1,244 @@
+"""
+Packed storage for finished games.
+
+A finished game can store its rounds as one `packed_rounds` row per
+(game, player) instead of one `rounds` row per cell: bets as a little-endian
+int16 array indexed by round number, results as a bitmask, the original
+round ids, and precomputed totals for player statistics. A 20-round game
+with 6 players shrinks from 120 rows (and their index entries) to 6.
+
+Packing is optional: `finish_game` queues a pack job when
+PARVIS_PACK_FINISHED is set, and `python -m archive --pack` packs older
+finished games. Reactivating or editing a packed game unpacks it into
+`rounds` again. Readers go through
+`game_rounds` or the `packed_rounds` selectable, so both formats give the
+same results.
+"""
+
+import sys
+from array import array
+from collections import namedtuple
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from database import ArchivedRound, Game, PackedRounds, Round
+from utils import all_rounds, calculate_score, packed_rounds, validate_positive_int
+
+
+MISSING_BET = -1  # Marks rounds a player has no cell for
+
+RoundRow = namedtuple("RoundRow", ("id", "game_id", "round_number", "player_id", "bet", "success", "score"))
+
+ROUND_COLUMNS = tuple(Round.__table__.c[name] for name in RoundRow._fields)
+"""The rounds columns clients see (everything but the sync bookkeeping), in RoundRow order."""
+
+
+def _to_bytes(values: Iterable[int], typecode: str) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _from_bytes(data: bytes, typecode: str) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def pack_cells(game_id: int, player_id: int, cells: Iterable) -> Dict:
+    """
+    Pack one player's rounds of a game into a packed_rounds row.
+
+    Args:
+        game_id: ID of the game
+        player_id: ID of the player
+        cells: Rounds with id, round_number, bet, success and score
+
+    Returns:
+        Column values for a PackedRounds row
+    """
+    cells = list(cells)
+    length = max(cell.round_number for cell in cells)
+    bets = [MISSING_BET] * length
+    round_ids = [0] * length
+    success = bytearray((length + 7) // 8)
+    for cell in cells:
+        r = cell.round_number - 1
+        bets[r] = cell.bet
+        round_ids[r] = cell.id
+        if cell.success:
+            success[r >> 3] |= 1 << (r & 7)
+
+    return {
+        "game_id": game_id,
+        "player_id": player_id,
+        "bets": _to_bytes(bets, "h"),
+        "success": bytes(success),
+        "round_ids": _to_bytes(round_ids, "i"),
+        "rounds_played": len(cells),
+        "successful_bets": sum(1 for cell in cells if cell.success),
+        "bet_sum": sum(cell.bet for cell in cells),
+        "total_score": sum(cell.score or 0 for cell in cells),
+    }
+
+
+def unpack_bets(packed) -> List[int]:
+    """
+    Bets of a packed_rounds row, without building full rounds.
+
+    Args:
+        packed: Row or object with a bets column
+
+    Returns:
+        Bets in round order, missing rounds skipped
+    """
+    return [bet for bet in _from_bytes(packed.bets, "h") if bet != MISSING_BET]
+
+
+def unpack_cells(packed) -> List[RoundRow]:
+    """
+    Expand a packed_rounds row back into its rounds.
+
+    Args:
+        packed: Row or object with game_id, player_id, bets, success and round_ids
+
+    Returns:
+        Rounds ordered by round_number, with scores recalculated
+    """
+    bets = _from_bytes(packed.bets, "h")
+    round_ids = _from_bytes(packed.round_ids, "i")
+    rows = []
+    for r, bet in enumerate(bets):
+        if bet == MISSING_BET:
+            continue
+        success = bool(packed.success[r >> 3] >> (r & 7) & 1)
+        rows.append(RoundRow(
+            round_ids[r], packed.game_id, r + 1, packed.player_id,
+            bet, success, calculate_score(bet, success)
+        ))
+    return rows
+
+
+class PackService:
+    """Service for packing finished games' rounds and reading them back."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def pack_game(self, game_id: int) -> int:
+        """
+        Move a game's rounds (hot or archived) into packed_rounds.
+        
+        Does not commit, so it can run in the caller's transaction. Games
+        without rounds, or with round numbers below 1, are left as they are.
+        
+        Args:
+            game_id: ID of the game
+        
+        Returns:
+            Number of rounds packed
+        """
+        rounds = all_rounds(game_id=game_id)
+        cells = self.db.execute(
+            select(rounds).order_by(rounds.c.player_id, rounds.c.round_number)
+        ).all()
+        if not cells or min(cell.round_number for cell in cells) < 1:
+            return 0
+        
+        self.db.execute(insert(PackedRounds), [
+            pack_cells(game_id, player_id, player_cells)
+            for player_id, player_cells in groupby(cells, key=lambda c: c.player_id)
+        ])
+        self.db.execute(delete(Round).where(Round.game_id == game_id))
+        self.db.execute(delete(ArchivedRound).where(ArchivedRound.game_id == game_id))
+        self.db.execute(
+            update(Game).where(Game.id == game_id)
+            .values(is_packed=True, is_archived=False)
+            .execution_options(synchronize_session=False)
+        )
+        return len(cells)
+    
+    def unpack_game(self, game_id: int) -> int:
+        """
+        Move a packed game's rounds back into the hot table.
+        
+        Does not commit, so it can run in the caller's transaction.
+        
+        Args:
+            game_id: ID of the game
+        
+        Returns:
+            Number of rounds restored
+        """
+        rows = self.game_rounds(game_id)
+        if rows:
+            self.db.execute(insert(Round), [row._asdict() for row in rows])
+            self.db.execute(delete(PackedRounds).where(PackedRounds.game_id == game_id))
+        self.db.execute(
+            update(Game).where(Game.id == game_id, Game.is_packed == True)
+            .values(is_packed=False)
+            .execution_options(synchronize_session=False)
+        )
+        return len(rows)
+    
+    def pack_games(
+        self,
+        before: datetime,
+        batch_size: int = 100,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        """
+        Pack finished games played before a date, one transaction per batch.
+        
+        Args:
+            before: Pack finished games played before this time
+            batch_size: Games packed per transaction
+            progress: Called with (games done, games total) after each batch
+        
+        Returns:
+            Dictionary with the number of games and rounds packed
+        """
+        validate_positive_int(batch_size, "Batch size")
+        game_ids = list(self.db.scalars(
+            select(Game.id).where(
+                Game.is_active == False,
+                Game.is_valid == True,
+                Game.is_packed == False,
+                Game.date < before
+            ).order_by(Game.id)
+        ))
+        
+        packed_games = rounds_packed = 0
+        for start in range(0, len(game_ids), batch_size):
+            for game_id in game_ids[start:start + batch_size]:
+                count = self.pack_game(game_id)
+                packed_games += 1 if count else 0
+                rounds_packed += count
+            self.db.commit()
+            if progress is not None:
+                progress(min(start + batch_size, len(game_ids)), len(game_ids))
+        
+        return {"games": packed_games, "rounds": rounds_packed}
+    
+    def game_rounds(self, game_id: int) -> List[RoundRow]:
+        """
+        Unpacked rounds of a packed game.
+        
+        Args:
+            game_id: ID of the game
+        
+        Returns:
+            Rounds ordered by round_number and player_id (empty if the
+            game is not packed)
+        """
+        packed = self.db.execute(packed_rounds(game_id=game_id)).all()
+        rows = [row for player in packed for row in unpack_cells(player)]
+        rows.sort(key=lambda row: (row.round_number, row.player_id))
+        return rows
@@ -0,0 +1,211 @@
+"""
+Bulk import of players and their family links (`POST /players/import`,
+`python -m import_players`).
+
+An import is applied in one transaction with a handful of statements,
+however many players it has:
+
+- One query loads every registered player the import names (by alias),
+  and one recursive query the parent links above them.
+- All references are resolved and the resulting family tree is checked
+  for cycles before anything is written; any error rejects the import.
+- New players and parent links are inserted with multi-row inserts;
+  changed fields of existing players are updated in bulk, by primary key.
+- Parents of existing players are diffed: only links that were added or
+  removed are written, so unchanged links keep their sync sequence.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from database import Player, player_parents
+from models import PlayerImportItem
+from utils import invalidate
+from .game_store import game_store
+
+
+_FIELDS = ("first_name", "middle_name", "last_name", "birthdate")
+
+
+def find_cycle(parents: Mapping[Hashable, Iterable[Hashable]], start: Iterable[Hashable]) -> Optional[List]:
+    """
+    Find a cycle in a parent graph, searching from `start`.
+
+    Returns:
+        The nodes of a cycle, first node repeated at the end
+        (child, parent, grandparent, ..., child), or None
+    """
+    done: Set = set()
+    for root in start:
+        if root in done:
+            continue
+        path, on_path = [root], {root}
+        pending = [iter(parents.get(root, ()))]
+        while pending:
+            for parent in pending[-1]:
+                if parent in on_path:
+                    return path[path.index(parent):] + [parent]
+                if parent not in done:
+                    path.append(parent)
+                    on_path.add(parent)
+                    pending.append(iter(parents.get(parent, ())))
+                    break
+            else:
+                node = path.pop()
+                on_path.discard(node)
+                done.add(node)
+                pending.pop()
+    return None
+
+
+class PlayerImportService:
+    """Service for importing many players and parent links at once."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def import_players(self, items: List[PlayerImportItem]) -> Dict:
+        """
+        Create and update players and their parents, and commit.
+
+        Args:
+            items: Players to import; an existing alias updates that player
+
+        Returns:
+            Counts of created, updated and unchanged players and of added and
+            removed parent links, and `ids` mapping each alias to its player ID
+
+        Raises:
+            HTTPException: 400 for duplicate aliases or keys, unknown parent
+                references, or parent links forming a cycle
+        """
+        self._check_unique(items)
+        keys = {item.key: item.alias for item in items if item.key is not None}
+        references = {ref for item in items for ref in item.parents or ()}
+        # A reference is a key, else an alias; only aliases need looking up
+        aliases = {item.alias for item in items} | {ref for ref in references if ref not in keys}
+
+        existing = {
+            row.alias: row for row in self.db.execute(
+                select(Player.id, Player.alias, *(Player.__table__.c[f] for f in _FIELDS))
+                .where(Player.alias.in_(aliases))
+            )
+        }
+        imported = {item.alias for item in items}
+        unknown = sorted(ref for ref in references - keys.keys() if ref not in imported and ref not in existing)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown parent references: {', '.join(unknown)}")
+
+        # Graph nodes: player IDs, or the aliases of players still to be created
+        def node(alias: str):
+            return existing[alias].id if alias in existing else alias
+
+        def resolve(ref: str):
+            return node(keys.get(ref, ref))
+
+        current = self._parent_links([row.id for row in existing.values()])
+        wanted = {
+            node(item.alias): {resolve(ref) for ref in item.parents}
+            for item in items if item.parents is not None
+        }
+        cycle = find_cycle({**current, **wanted}, wanted)
+        if cycle:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Parent links would form a cycle: {' -> '.join(self._aliases(cycle))}"
+            )
+
+        created, changed = self._write_players(items, existing)
+        ids = {alias: node(alias) if alias in existing else created[alias] for alias in imported}
+
+        def player_id(graph_node) -> int:
+            return created[graph_node] if isinstance(graph_node, str) else graph_node
+
+        added, removed = [], []
+        for child, parents in wanted.items():
+            child_id, had = player_id(child), current.get(child, set())
+            added += [{"player_id": child_id, "parent_id": player_id(p)} for p in parents - had]
+            removed += [(child_id, parent_id) for parent_id in had - parents]
+            if parents != had and not isinstance(child, str):
+                changed.add(child_id)
+        if removed:
+            self.db.execute(delete(player_parents).where(
+                tuple_(player_parents.c.player_id, player_parents.c.parent_id).in_(removed)
+            ))
+        if added:
+            self.db.execute(insert(player_parents), added)
+
+        for changed_id in changed:
+            invalidate(self.db, "player", changed_id)
+        self.db.commit()
+        for changed_id in changed:
+            game_store.discard_player(changed_id)
+
+        return {
+            "created": len(created),
+            "updated": len(changed),
+            "unchanged": len(items) - len(created) - len(changed),
+            "parents_added": len(added),
+            "parents_removed": len(removed),
+            "ids": ids
+        }
+
+    def _check_unique(self, items: List[PlayerImportItem]) -> None:
+        for name, values in (("aliases", [item.alias for item in items]),
+                             ("keys", [item.key for item in items if item.key is not None])):
+            seen, duplicates = set(), set()
+            for value in values:
+                (duplicates if value in seen else seen).add(value)
+            if duplicates:
+                raise HTTPException(status_code=400,
+                                    detail=f"Duplicate {name} in import: {', '.join(sorted(duplicates))}")
+
+    def _parent_links(self, player_ids: List[int]) -> Dict[int, Set[int]]:
+        """Parents of the players and of all their ancestors, in one recursive query."""
+        links: Dict[int, Set[int]] = {}
+        if not player_ids:
+            return links
+        ancestry = (
+            select(player_parents.c.player_id, player_parents.c.parent_id)
+            .where(player_parents.c.player_id.in_(player_ids))
+            .cte("ancestry", recursive=True)
+        )
+        ancestry = ancestry.union(
+            select(player_parents.c.player_id, player_parents.c.parent_id)
+            .join(ancestry, player_parents.c.player_id == ancestry.c.parent_id)
+        )
+        for child_id, parent_id in self.db.execute(select(ancestry.c.player_id, ancestry.c.parent_id)):
+            links.setdefault(child_id, set()).add(parent_id)
+        return links
+
+    def _aliases(self, nodes: List) -> List[str]:
+        """Aliases of graph nodes, for messages."""
+        ids = [n for n in nodes if not isinstance(n, str)]
+        aliases = dict(self.db.execute(select(Player.id, Player.alias).where(Player.id.in_(ids))).all())
+        return [aliases.get(n, n) for n in nodes]
+
+    def _write_players(self, items: List[PlayerImportItem], existing: Mapping) -> tuple:
+        """Insert new players and update changed fields of existing ones; returns (alias -> new ID, changed IDs)."""
+        new_rows, updates = [], []
+        for item in items:
+            row = existing.get(item.alias)
+            if row is None:
+                new_rows.append({"alias": item.alias, **{f: getattr(item, f) for f in _FIELDS}})
+                continue
+            values = {f: getattr(item, f) for f in _FIELDS
+                      if f in item.model_fields_set and getattr(item, f) != getattr(row, f)}
+            if values:
+                updates.append({"id": row.id, **values})
+
+        created = {}
+        if new_rows:
+            # Core insert: the ORM would split rows by which fields are None
+            players = Player.__table__
+            result = self.db.execute(insert(players).returning(players.c.id, players.c.alias), new_rows)
+            created = {alias: player_id for player_id, alias in result}
+        if updates:
+            self.db.execute(update(Player), updates)
+        return created, {values["id"] for values in updates}
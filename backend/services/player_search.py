@@ -0,0 +1,199 @@
+"""
+Indexed player search for `GET /players/search`.
+
+Matches are collected in tiers, each an indexed query cut off at the
+limit, so a common surname costs about as much as a rare alias:
+
+1. "alias": the alias starts with the query (an exact alias first),
+2. "name": every query word starts a word of the alias or a name,
+3. "fuzzy": names similar to the query despite typos.
+
+Within a tier, players who played most recently come first (then newer
+players), read in that order from ix_players_recent. A tier runs only
+while the results are short of the limit.
+
+Postgres uses pg_trgm: a text_pattern_ops index for alias prefixes and a
+trigram GIN index over all names (`database.PLAYER_SEARCH_TEXT`) for word
+prefixes and word similarity. SQLite uses the players_search FTS5 table
+with prefix indexes; its fuzzy tier ranks recent players sharing the first
+two letters of a query word by trigram similarity, so it forgives typos
+after those letters only.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, literal, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+
+from database import PLAYER_SEARCH_TEXT, Player
+
+
+FUZZY_THRESHOLD = 0.3
+"""SQLite: least trigram similarity for a fuzzy match (pg_trgm's default for `%`)."""
+
+WORD_SIMILARITY_THRESHOLD = 0.4
+"""Postgres: least pg_trgm word_similarity for a fuzzy match."""
+
+FUZZY_CANDIDATES = 100
+"""SQLite: recent players compared in the fuzzy tier at most."""
+
+SORT_MATCHES_MAX = 1000
+"""SQLite: up to this many FTS matches are sorted; more are found walking ix_players_recent."""
+
+_COLUMNS = (
+    Player.id, Player.alias, Player.first_name, Player.middle_name, Player.last_name,
+    Player.last_game_date
+)
+_RECENT_FIRST = (Player.last_game_date.desc().nulls_last(), Player.id.desc())
+_SEARCH_TEXT = literal_column(PLAYER_SEARCH_TEXT)
+
+
+def search_words(q: str) -> List[str]:
+    """Lowercased words of a query, split like the FTS5 unicode61 tokenizer."""
+    return re.findall(r"[^\W_]+", q.lower())
+
+
+@lru_cache(maxsize=4096)
+def trigrams(word: str) -> FrozenSet[str]:
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=4096)
+def _name_trigrams(name: str) -> Tuple[FrozenSet[str], ...]:
+    return tuple(trigrams(word) for word in search_words(name))
+
+
+def similarity(words: List[str], names: Iterable[Optional[str]]) -> float:
+    """Mean over the query words of the best trigram similarity to a word of the names."""
+    candidates = [found for name in names if name for found in _name_trigrams(name)]
+    if not candidates:
+        return 0.0
+    total = 0.0
+    for word in words:
+        wanted = trigrams(word)
+        total += max(len(wanted & found) / len(wanted | found) for found in candidates)
+    return total / len(words)
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts(query: str):
+    """Rowids of players_search matching an FTS5 query."""
+    return text(
+        "SELECT rowid FROM players_search WHERE players_search MATCH :fts"
+    ).bindparams(fts=query).columns(literal_column("rowid"))
+
+
+def _fts_prefixes(words: List[str], operator: str = " ") -> str:
+    return operator.join(f'"{word}"*' for word in words)
+
+
+class PlayerSearch:
+    """Service for prefix and fuzzy player search."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.postgres = db.get_bind().dialect.name == "postgresql"
+
+    def search(self, q: str, limit: int = 20) -> List[Dict]:
+        """
+        Find players by alias, first, middle and last name.
+
+        Args:
+            q: Search text (prefixes of words, typos allowed)
+            limit: Most players to return
+
+        Returns:
+            Players (id, alias, names, last_game_date) with the tier that
+            matched them in `match`, best first
+        """
+        words = search_words(q)
+        if not words:
+            return []
+
+        q = q.strip().lower()
+        results, seen = [], set()
+        for match, find in (("alias", self._alias_prefix), ("name", self._word_prefix), ("fuzzy", self._fuzzy)):
+            if len(results) >= limit:
+                break
+            # Earlier tiers' players match again here; fetch enough to skip them
+            for row in find(q, words, limit + len(seen)):
+                if row.id not in seen and len(results) < limit:
+                    seen.add(row.id)
+                    results.append({**row._asdict(), "match": match})
+        return results
+
+    def _alias_prefix(self, q: str, words: List[str], limit: int) -> list:
+        exact = func.lower(Player.alias) == q
+        if self.postgres:
+            return self.db.execute(
+                select(*_COLUMNS)
+                .where(func.lower(Player.alias).like(f"{_like_escape(q)}%", escape="\\"))
+                .order_by(exact.desc(), *_RECENT_FIRST)
+                .limit(limit)
+            ).all()
+
+        exact_rows = self.db.execute(
+            select(*_COLUMNS).where(Player.id.in_(_fts(f'alias : "{" ".join(words)}"')), exact)
+        ).all()
+        return exact_rows + self._recent_matches(f"alias : ({_fts_prefixes(words)})", limit)
+
+    def _word_prefix(self, q: str, words: List[str], limit: int) -> list:
+        if not self.postgres:
+            return self._recent_matches(_fts_prefixes(words), limit)
+
+        matches = and_(*(
+            or_(
+                _SEARCH_TEXT.like(f"{_like_escape(word)}%", escape="\\"),
+                _SEARCH_TEXT.like(f"% {_like_escape(word)}%", escape="\\")
+            )
+            for word in words
+        ))
+        return self.db.execute(
+            select(*_COLUMNS).where(matches).order_by(*_RECENT_FIRST).limit(limit)
+        ).all()
+
+    def _fuzzy(self, q: str, words: List[str], limit: int) -> list:
+        if self.postgres:
+            q = " ".join(words)
+            self.db.execute(select(func.set_config(
+                "pg_trgm.word_similarity_threshold", str(WORD_SIMILARITY_THRESHOLD), True
+            )))
+            return self.db.execute(
+                select(*_COLUMNS)
+                .where(literal(q).op("<%")(_SEARCH_TEXT))
+                .order_by(func.word_similarity(q, _SEARCH_TEXT).desc(), *_RECENT_FIRST)
+                .limit(limit)
+            ).all()
+
+        candidates = self._recent_matches(_fts_prefixes([word[:2] for word in words], " OR "),
+                                          FUZZY_CANDIDATES)
+        scored = []
+        for index, row in enumerate(candidates):
+            score = similarity(words, (row.alias, row.first_name, row.middle_name, row.last_name))
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, index, row))
+        scored.sort(key=lambda entry: entry[:2])
+        return [row for _, _, row in scored[:limit]]
+
+    def _recent_matches(self, fts_query: str, limit: int) -> list:
+        """SQLite: players matching an FTS5 query, most recent first."""
+        matches = self.db.scalar(
+            text("SELECT count(*) FROM (SELECT rowid FROM players_search "
+                 "WHERE players_search MATCH :fts LIMIT :cap)"),
+            {"fts": fts_query, "cap": SORT_MATCHES_MAX + 1}
+        )
+        if not matches:
+            return []
+        # Few matches are looked up by rowid and sorted; with many, walking
+        # ix_players_recent reaches the limit sooner. The unary + keeps the
+        # planner from the rowid plan, which it would pick either way.
+        player_id = Player.id if matches <= SORT_MATCHES_MAX else literal_column("+players.id")
+        return self.db.execute(
+            select(*_COLUMNS).where(player_id.in_(_fts(fts_query))).order_by(*_RECENT_FIRST).limit(limit)
+        ).all()
@@ -4,18 +4,26 @@ Player service layer for Parvis.
 Handles player creation, updates, and statistics.
 """
 
+from collections import Counter, defaultdict
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Integer
-from typing import List, Dict
+from sqlalchemy import func, select
+from typing import List, Dict, Optional, Sequence
+from datetime import datetime
 from fastapi import HTTPException
 
-from database import Player, Round
-from models import PlayerCreate, PlayerStats
+from database import Player, Round, player_parents
+from models import PlayerCreate, PlayerStats, PlayerWithRelations
 from utils import (
     get_player_or_404,
     get_player_by_alias,
-    player_to_dict_with_relations
+    all_rounds,
+    packed_rounds,
+    round_totals,
+    add_tombstones,
+    invalidate
 )
+from .game_store import game_store
+from .pack_service import unpack_bets
 
 
 class PlayerService:
@@ -24,15 +32,67 @@ class PlayerService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_all_players(self) -> List[Dict]:
+    def get_all_players(
+        self,
+        fields: Optional[List[str]] = None,
+        include: Sequence[str] = ()
+    ) -> List[Dict]:
         """
         Get all players with their parent relationships.
         
+        Column-only selects (players, then parent links); no ORM objects
+        are loaded. With a sparse fieldset only those columns are selected,
+        and the parent links are skipped unless parent_ids is requested.
+        
+        Args:
+            fields: PlayerWithRelations fields to return (None for all)
+            include: Expansions; "stats" adds games_played, total_rounds,
+                total_score and successful_bets across all games, joined in
+                the players query
+            
         Returns:
-            List of player dictionaries with parent_ids
+            List of player dictionaries, keys in PlayerWithRelations field
+            order followed by the included expansions
         """
-        players = self.db.query(Player).all()
-        return [player_to_dict_with_relations(p) for p in players]
+        fields = fields or list(PlayerWithRelations.model_fields)
+        columns = [name for name in fields if name != "parent_ids"]
+        stmt = select(*(Player.__table__.c[name] for name in columns))
+        if "stats" in include:
+            totals = round_totals()
+            per_player = select(
+                totals.c.player_id,
+                func.count(func.distinct(totals.c.game_id)).label('games_played'),
+                func.sum(totals.c.rounds_played).label('total_rounds'),
+                func.sum(totals.c.total_score).label('total_score'),
+                func.sum(totals.c.successful_bets).label('successful_bets')
+            ).group_by(totals.c.player_id).subquery()
+            stmt = stmt.outerjoin(per_player, per_player.c.player_id == Player.id).add_columns(
+                per_player.c.games_played, per_player.c.total_rounds,
+                per_player.c.total_score, per_player.c.successful_bets
+            )
+        players = self.db.execute(stmt).all()
+        
+        parent_ids = defaultdict(list)
+        if "parent_ids" in fields:
+            for player_id, parent_id in self.db.execute(
+                select(player_parents.c.player_id, player_parents.c.parent_id)
+            ):
+                parent_ids[player_id].append(parent_id)
+        
+        result = []
+        for row in players:
+            player = {name: row._mapping[name] for name in columns}
+            if "parent_ids" in fields:
+                player["parent_ids"] = parent_ids[row.id]
+            if "stats" in include:
+                player["stats"] = {
+                    "games_played": row.games_played or 0,
+                    "total_rounds": int(row.total_rounds or 0),
+                    "total_score": int(row.total_score or 0),
+                    "successful_bets": int(row.successful_bets or 0)
+                }
+            result.append(player)
+        return result
     
     def get_player(self, player_id: int) -> Player:
         """
@@ -71,12 +131,7 @@ class PlayerService:
         self.db.flush()  # Get the ID without committing
         
         # Add parent relationships
-        if player_data.parent_ids:
-            for parent_id in player_data.parent_ids:
-                parent = self.db.query(Player)\
-                    .filter(Player.id == parent_id).first()
-                if parent:
-                    db_player.parents.append(parent)
+        db_player.parents.extend(self._get_parents(player_data.parent_ids))
         
         self.db.commit()
         self.db.refresh(db_player)
@@ -108,19 +163,24 @@ class PlayerService:
         for key, value in player_data.dict(exclude={'parent_ids'}).items():
             setattr(db_player, key, value)
         
-        # Update parent relationships
-        db_player.parents.clear()
-        if player_data.parent_ids:
-            for parent_id in player_data.parent_ids:
-                parent = self.db.query(Player)\
-                    .filter(Player.id == parent_id).first()
-                if parent:
-                    db_player.parents.append(parent)
+        # Update parent relationships (writing only the links that changed)
+        parents = self._get_parents(player_data.parent_ids)
+        for parent in [p for p in db_player.parents if p not in parents]:
+            db_player.parents.remove(parent)
+        db_player.parents.extend([p for p in parents if p not in db_player.parents])
         
+        invalidate(self.db, "player", player_id)
         self.db.commit()
         self.db.refresh(db_player)
+        game_store.discard_player(player_id)
         return db_player
     
+    def _get_parents(self, parent_ids: Optional[List[int]]) -> List[Player]:
+        """Fetch all existing parents in one query (unknown IDs are skipped)."""
+        if not parent_ids:
+            return []
+        return self.db.query(Player).filter(Player.id.in_(parent_ids)).all()
+    
     def delete_player(self, player_id: int) -> None:
         """
         Delete a player.
@@ -130,7 +190,10 @@ class PlayerService:
         """
         player = get_player_or_404(player_id, self.db)
         self.db.delete(player)
+        add_tombstones(self.db, "player", [player_id])
+        invalidate(self.db, "player", player_id)
         self.db.commit()
+        game_store.discard_player(player_id)
     
     def get_player_family(self, player_id: int) -> Dict:
         """
@@ -151,28 +214,37 @@ class PlayerService:
             "child_ids": [c.id for c in player.children]
         }
     
-    def get_player_stats(self, player_id: int) -> PlayerStats:
+    def get_player_stats(
+        self,
+        player_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> PlayerStats:
         """
         Get comprehensive statistics for a player across all games.
         
+        Includes archived and packed games unless the time window excludes them.
+        
         Args:
             player_id: ID of the player
+            since: Only games played at or after this time
+            until: Only games played before this time
             
         Returns:
             PlayerStats with aggregated statistics
         """
         player = get_player_or_404(player_id, self.db)
-        
+        per_game = round_totals(player_id=player_id, since=since, until=until)
         stats = self.db.query(
-            func.count(func.distinct(Round.game_id)).label('games_played'),
-            func.count(Round.id).label('total_rounds'),
-            func.sum(Round.score).label('total_score'),
-            func.sum(func.cast(Round.success, Integer)).label('successful_bets'),
-            func.avg(Round.bet).label('average_bet')
-        ).filter(Round.player_id == player_id).first()
-        
-        total_rounds = stats.total_rounds or 0
-        successful_bets = stats.successful_bets or 0
+            func.count(func.distinct(per_game.c.game_id)).label('games_played'),
+            func.sum(per_game.c.rounds_played).label('total_rounds'),
+            func.sum(per_game.c.total_score).label('total_score'),
+            func.sum(per_game.c.successful_bets).label('successful_bets'),
+            func.sum(per_game.c.bet_sum).label('bet_sum')
+        ).first()
+        
+        total_rounds = int(stats.total_rounds or 0)
+        successful_bets = int(stats.successful_bets or 0)
         failed_bets = total_rounds - successful_bets
         win_rate = (successful_bets / total_rounds * 100) if total_rounds > 0 else 0.0
         
@@ -181,28 +253,39 @@ class PlayerService:
             player_alias=player.alias,
             games_played=stats.games_played or 0,
             total_rounds=total_rounds,
-            total_score=stats.total_score or 0,
+            total_score=int(stats.total_score or 0),
             successful_bets=successful_bets,
             failed_bets=failed_bets,
-            average_bet=float(stats.average_bet) if stats.average_bet else 0.0,
+            average_bet=float(stats.bet_sum) / total_rounds if total_rounds else 0.0,
             win_rate=win_rate
         )
     
-    def get_bet_distribution(self, player_id: int) -> List[Dict]:
+    def get_bet_distribution(
+        self,
+        player_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict]:
         """
         Get histogram data of player's bets.
         
         Args:
             player_id: ID of the player
+            since: Only games played at or after this time
+            until: Only games played before this time
             
         Returns:
             List of dictionaries with bet amounts and counts
         """
+        rounds = all_rounds(player_id=player_id, since=since, until=until)
         bets = self.db.query(
-            Round.bet,
-            func.count(Round.id).label('count')
-        ).filter(Round.player_id == player_id)\
-         .group_by(Round.bet)\
-         .order_by(Round.bet).all()
+            rounds.c.bet,
+            func.count(rounds.c.id).label('count')
+        ).group_by(rounds.c.bet).all()
+        
+        counts = Counter({b.bet: b.count for b in bets})
+        packed = self.db.execute(packed_rounds(player_id=player_id, since=since, until=until))
+        for row in packed:
+            counts.update(unpack_bets(row))
         
-        return [{"bet": b.bet, "count": b.count} for b in bets]
+        return [{"bet": bet, "count": count} for bet, count in sorted(counts.items())]
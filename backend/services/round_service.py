@@ -4,18 +4,33 @@ Round service layer for Parvis.
 Handles round creation, updates, and validation.
 """
 
+import base64
+
+from sqlalchemy import and_, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 from fastapi import HTTPException
 
-from database import Round, Game
+from constants import SUCCESSFUL_BET_BASE_SCORE
+from database import Round, Game, GamePlayer, in_write_batch
 from models import RoundCreate
 from utils import (
     get_game_or_404,
+    update_game_or_404,
     get_round_or_404,
     calculate_score,
-    validate_bet
+    validate_bet,
+    all_rounds,
+    upsert_rounds,
+    add_event,
+    cell_payload
 )
+from .archive_service import check_rounds_attached
+from .cell_buffer import cell_buffer
+from .game_store import game_store
+from .pack_service import ROUND_COLUMNS, PackService
 
 
 class RoundService:
@@ -24,51 +39,74 @@ class RoundService:
     def __init__(self, db: Session):
         self.db = db
     
-    def add_round(self, game_id: int, round_data: RoundCreate) -> List[Round]:
+    def add_round(
+        self,
+        game_id: int,
+        round_data: RoundCreate,
+        expected_version: Optional[int] = None
+    ) -> List[Dict]:
         """
         Add a new round with bets for all players.
         
+        The round number comes from an atomic increment of current_round, and
+        all bets are inserted in one multi-row INSERT ... RETURNING.
+        
         Args:
             game_id: ID of the game
             round_data: Round data with bets for each player
+            expected_version: Only add the round if the game is still at this version
             
         Returns:
-            List of created Round instances
+            List of created round dictionaries
             
         Raises:
-            HTTPException: If game is not active
+            HTTPException: If game is not active; 409 if a player already has
+                a cell in the new round (nothing is written)
         """
-        game = get_game_or_404(game_id, self.db)
-        
-        if not game.is_active:
-            raise HTTPException(status_code=400, detail="Game is not active")
+        cell_buffer.flush_game(game_id, self.db)
         
         # Increment round number
-        game.current_round += 1
-        round_number = game.current_round
+        game = update_game_or_404(
+            game_id, self.db,
+            {"current_round": Game.current_round + 1},
+            expected_version=expected_version,
+            where=Game.is_active == True,
+            where_error="Game is not active",
+            event="round_advanced"
+        )
+        round_number, version = game.current_round, game.version
         
         # Create rounds for each player
         created_rounds = []
-        for bet_data in round_data.bets:
-            score = calculate_score(bet_data["bet"], bet_data["success"])
-            
-            round_entry = Round(
-                game_id=game_id,
-                round_number=round_number,
-                player_id=bet_data["player_id"],
-                bet=bet_data["bet"],
-                success=bet_data["success"],
-                score=score
-            )
-            self.db.add(round_entry)
-            created_rounds.append(round_entry)
+        if round_data.bets:
+            try:
+                rows = self.db.execute(
+                    insert(Round).returning(*ROUND_COLUMNS),
+                    [
+                        {
+                            "game_id": game_id,
+                            "round_number": round_number,
+                            "player_id": bet_data["player_id"],
+                            "bet": bet_data["bet"],
+                            "success": bet_data["success"],
+                            "score": calculate_score(bet_data["bet"], bet_data["success"])
+                        }
+                        for bet_data in round_data.bets
+                    ]
+                ).all()
+            except IntegrityError:
+                # Cells edited into the new round ahead of time are not overwritten
+                self.db.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Round {round_number} already has cells for these players, or a player is unknown"
+                )
+            created_rounds = [dict(row._mapping) for row in rows]
+            add_event(self.db, game_id, "cells_set", cell_payload(created_rounds))
         
         self.db.commit()
-        
-        # Refresh all rounds
-        for r in created_rounds:
-            self.db.refresh(r)
-        
+        game_store.update_game(game_id, current_round=round_number, version=version)
+        game_store.put_cells(game_id, created_rounds)
         return created_rounds
     
     def update_round(self, game_id: int, round_id: int, bet: int, success: bool) -> Round:
@@ -84,14 +122,22 @@ class RoundService:
         Returns:
             Updated Round instance
         """
+        cell_buffer.flush_game(game_id, self.db)
+        game = get_game_or_404(game_id, self.db)
+        if game.is_packed:
+            # Packed rows keep the round ids, so the round is found once unpacked
+            PackService(self.db).unpack_game(game_id)
         round_entry = get_round_or_404(round_id, game_id, self.db)
         
         round_entry.bet = bet
         round_entry.success = success
         round_entry.score = calculate_score(bet, success)
+        cell = {column.key: getattr(round_entry, column.key) for column in ROUND_COLUMNS}
+        add_event(self.db, game_id, "cells_set", cell_payload([cell]))
         
         self.db.commit()
         self.db.refresh(round_entry)
+        game_store.put_cells(game_id, [cell])
         return round_entry
     
     def upsert_round(
@@ -115,51 +161,87 @@ class RoundService:
         Returns:
             Dictionary with round data
         """
+        cell_buffer.flush_game(game_id, self.db)
         game = get_game_or_404(game_id, self.db)
         
         # Validate bet range
         validate_bet(bet, round_number)
+        if game.is_packed:
+            # Editing a packed game moves its rounds back into the hot table
+            PackService(self.db).unpack_game(game_id)
         
-        # Find existing round
-        round_entry = self.db.query(Round).filter(
-            Round.game_id == game_id,
-            Round.round_number == round_number,
-            Round.player_id == player_id
-        ).first()
+        row = self.db.execute(
+            upsert_rounds(self.db).returning(*ROUND_COLUMNS),
+            {
+                "game_id": game_id,
+                "round_number": round_number,
+                "player_id": player_id,
+                "bet": bet,
+                "success": success,
+                "score": calculate_score(bet, success)
+            }
+        ).one()
+        cell = dict(row._mapping)
+        add_event(self.db, game_id, "cells_set", cell_payload([cell]))
+        self.db.commit()
         
-        score = calculate_score(bet, success)
-        
-        if round_entry:
-            # Update existing
-            round_entry.bet = bet
-            round_entry.success = success
-            round_entry.score = score
-        else:
-            # Create new
-            round_entry = Round(
-                game_id=game_id,
-                round_number=round_number,
-                player_id=player_id,
-                bet=bet,
-                success=success,
-                score=score
-            )
-            self.db.add(round_entry)
+        game_store.put_cells(game_id, [cell])
+        return cell
+    
+    def buffer_cell_edit(
+        self,
+        game_id: int,
+        round_number: int,
+        player_id: int,
+        bet: int,
+        success: bool
+    ) -> Dict:
+        """
+        Queue a cell edit in the write-behind buffer.
         
-        self.db.commit()
-        self.db.refresh(round_entry)
+        The edit is acknowledged immediately and written with the next batch.
+        If the background flusher is not running, it is written right away.
         
-        return {
-            "id": round_entry.id,
-            "game_id": round_entry.game_id,
-            "round_number": round_entry.round_number,
-            "player_id": round_entry.player_id,
-            "bet": round_entry.bet,
-            "success": round_entry.success,
-            "score": round_entry.score
-        }
+        Args:
+            game_id: ID of the game
+            round_number: Round number
+            player_id: ID of the player
+            bet: Bet amount
+            success: Whether the bet was successful
+            
+        Returns:
+            Dictionary with the edit's version and the last flushed version
+            
+        Raises:
+            HTTPException: 404 if game not found, 400 if it is not active or
+                the player is not in it, or inside a write batch
+        """
+        if in_write_batch():
+            # The buffer is written outside the batch's transaction
+            raise HTTPException(
+                status_code=400,
+                detail="Buffered edits cannot be part of a write batch; use /rounds/upsert"
+            )
+        # Checked now: once acknowledged, a bad edit could only fail at flush
+        game = self.db.execute(
+            select(Game.is_active, GamePlayer.player_id)
+            .outerjoin(GamePlayer, and_(GamePlayer.game_id == Game.id, GamePlayer.player_id == player_id))
+            .where(Game.id == game_id)
+        ).first()
+        if game is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        if not game.is_active:
+            raise HTTPException(status_code=400, detail="Game is not active")
+        if game.player_id is None:
+            raise HTTPException(status_code=400, detail="Player is not in this game")
+        
+        ack = cell_buffer.submit(game_id, round_number, player_id, bet, success)
+        if not cell_buffer.running:
+            cell_buffer.flush_game(game_id, self.db)
+            ack["flushed_version"] = ack["version"]
+        return ack
     
-    def get_game_rounds(self, game_id: int) -> List[Round]:
+    def get_game_rounds(self, game_id: int) -> List[Row]:
         """
         Get all rounds for a game.
         
@@ -167,9 +249,126 @@ class RoundService:
             game_id: ID of the game
             
         Returns:
-            List of Round instances ordered by round_number and player_id
+            List of round rows ordered by round_number and player_id:
+            from memory for hot active games, from the archive for archived
+            games and unpacked for packed ones
+            
+        Raises:
+            HTTPException: 410 if the rounds were detached with their
+                archive partition
+        """
+        hot = game_store.rounds(game_id)
+        if hot is not None:
+            return hot
+        
+        # Write any buffered edits on the primary before reading
+        cell_buffer.flush_game(game_id)
+        game = self.db.execute(
+            select(Game.is_packed, Game.rounds_detached).where(Game.id == game_id)
+        ).first()
+        if game is not None:
+            check_rounds_attached(game.rounds_detached)
+            if game.is_packed:
+                return PackService(self.db).game_rounds(game_id)
+        rounds = all_rounds(game_id=game_id)
+        return self.db.execute(
+            select(rounds).order_by(rounds.c.round_number, rounds.c.player_id)
+        ).all()
+    
+    def get_game_matrix(self, game_id: int) -> Dict:
         """
-        return self.db.query(Round)\
-            .filter(Round.game_id == game_id)\
-            .order_by(Round.round_number, Round.player_id)\
-            .all()
+        Get a game's rounds as a dense rounds x players grid.
+        
+        Built from one ordered query: the game outer-joined to its players and
+        their rounds up to total_rounds. Columns are sorted by player ID.
+        Missing cells are null; scores are only sent as per-player totals,
+        since a cell's score follows from its bet and success (with
+        success_base_score, so clients need no copy of the scoring rule's
+        constant). Packed games take a second query for their packed rows;
+        hot active games are laid out from memory.
+        
+        Args:
+            game_id: ID of the game
+            
+        Returns:
+            Dictionary matching the GameMatrix schema
+            
+        Raises:
+            HTTPException: 404 if game not found, 410 if its rounds were
+                detached with their archive partition
+        """
+        hot = game_store.matrix_source(game_id)
+        if hot is not None:
+            return _build_matrix(game_id, *hot)
+        
+        # Write any buffered edits on the primary before reading
+        cell_buffer.flush_game(game_id)
+        rounds = all_rounds(game_id=game_id)
+        rows = self.db.execute(
+            select(
+                Game.total_rounds, Game.is_packed, Game.rounds_detached, GamePlayer.player_id,
+                rounds.c.round_number, rounds.c.bet, rounds.c.success, rounds.c.score
+            )
+            .select_from(Game)
+            .outerjoin(GamePlayer, GamePlayer.game_id == Game.id)
+            .outerjoin(rounds, and_(
+                rounds.c.player_id == GamePlayer.player_id,
+                rounds.c.round_number >= 1,
+                rounds.c.round_number <= Game.total_rounds
+            ))
+            .where(Game.id == game_id)
+            .order_by(GamePlayer.player_id, rounds.c.round_number)
+        ).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Game not found")
+        check_rounds_attached(rows[0].rounds_detached)
+        
+        total_rounds = rows[0].total_rounds or 0
+        player_ids = list(dict.fromkeys(row.player_id for row in rows if row.player_id is not None))
+        if rows[0].is_packed:
+            rows = PackService(self.db).game_rounds(game_id)
+        return _build_matrix(game_id, total_rounds, player_ids, rows)
+
+
+def _build_matrix(game_id: int, total_rounds: int, player_ids: List[int], cells) -> Dict:
+    """
+    Lay out cells as a GameMatrix dictionary.
+    
+    Args:
+        game_id: ID of the game
+        total_rounds: Number of matrix rows
+        player_ids: Player of each matrix column
+        cells: Rounds with round_number, player_id, bet, success and score;
+            cells outside the grid (or with round_number None) are skipped
+        
+    Returns:
+        Dictionary matching the GameMatrix schema
+    """
+    column_of = {player_id: column for column, player_id in enumerate(player_ids)}
+    columns = len(player_ids)
+    
+    bets = [[None] * columns for _ in range(total_rounds)]
+    success = bytearray((total_rounds * columns + 7) // 8)
+    totals = [0] * columns
+    for cell in cells:
+        if cell.round_number is None or not 1 <= cell.round_number <= total_rounds:
+            continue  # Game without players, a player without rounds, or outside the grid
+        column = column_of.get(cell.player_id)
+        if column is None:
+            continue
+        r = cell.round_number - 1
+        bets[r][column] = cell.bet
+        if cell.success:
+            bit = r * columns + column
+            success[bit >> 3] |= 1 << (bit & 7)
+        totals[column] += cell.score or 0
+    
+    return {
+        "game_id": game_id,
+        "total_rounds": total_rounds,
+        "player_ids": player_ids,
+        "bets": bets,
+        "success": base64.b64encode(bytes(success)).decode("ascii"),
+        "totals": totals,
+        "success_base_score": SUCCESSFUL_BET_BASE_SCORE
+    }
@@ -0,0 +1,188 @@
+"""
+Delta sync for offline-capable clients.
+
+Every row of players, games, game_players and rounds carries an
+updated_seq from one global sequence, stamped by database triggers on each
+insert and update (see `database.install_sync_triggers`); deleting a game
+or player leaves a tombstone with its own sequence number. A client keeps
+the `seq` cursor of its last sync and asks only for rows changed after it.
+
+Offline edits are queued on the client with a unique op_id and replayed
+through `push`. An op_id is recorded in the same transaction as its edit,
+so replaying a queue after a dropped connection applies each edit once.
+
+Rounds of archived or packed games live outside the rounds table and are
+not part of the sync; their games carry is_archived/is_packed, and
+`/games/{id}/rounds` serves them.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import (
+    AppliedSyncOp, Game, GamePlayer, Player, Round, SyncTombstone, change_head, player_parents
+)
+from models import Game as GameSchema, PlayerWithRelations, SyncOp
+from .game_service import GameService
+from .pack_service import ROUND_COLUMNS
+from .round_service import RoundService
+
+
+_PLAYER_COLUMNS = tuple(
+    Player.__table__.c[name] for name in PlayerWithRelations.model_fields if name != "parent_ids"
+)
+
+_SOURCES = {
+    "players": (_PLAYER_COLUMNS, Player.updated_seq),
+    "games": (tuple(Game.__table__.c[name] for name in GameSchema.model_fields), Game.updated_seq),
+    "game_players": ((GamePlayer.game_id, GamePlayer.player_id), GamePlayer.updated_seq),
+    "rounds": (ROUND_COLUMNS, Round.updated_seq),
+    "deleted": ((SyncTombstone.entity, SyncTombstone.entity_id), SyncTombstone.updated_seq),
+}
+
+
+class SyncService:
+    """Service for delta sync reads and replaying offline edits."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def changes(self, since: int, limit: int) -> Dict:
+        """
+        Rows changed after a sequence number, oldest first.
+        
+        The settled head of the sequence (`database.change_head`) is read
+        first, so rows committed while the changes are collected, or by
+        transactions still running, are left for the next sync instead of
+        being skipped. Rows sharing a sequence number come in the same
+        page. At most about `limit` rows are returned per call; `more`
+        tells the client to continue from the returned `seq`.
+        
+        Args:
+            since: Cursor of the client's last sync (0 for everything)
+            limit: Rows per table to read at most
+        
+        Returns:
+            Dictionary in the SyncChanges shape
+        """
+        head = change_head(self.db)
+        fetched = {
+            name: self.db.execute(
+                select(*columns, seq_column)
+                .where(seq_column > since, seq_column <= head)
+                .order_by(seq_column).limit(limit)
+            ).all()
+            for name, (columns, seq_column) in _SOURCES.items()
+        }
+        
+        # Tables cut off by the limit may have more rows after their last one,
+        # including more with its sequence number: stop before that number,
+        # or take all of its rows when it fills the whole page
+        cursor = head
+        for name, rows in fetched.items():
+            if len(rows) == limit:
+                last = rows[-1][-1]
+                if rows[0][-1] < last:
+                    cursor = min(cursor, last - 1)
+                else:
+                    columns, seq_column = _SOURCES[name]
+                    fetched[name] = self.db.execute(
+                        select(*columns, seq_column).where(seq_column == last)
+                    ).all()
+                    cursor = min(cursor, last)
+        seqs = sorted(row[-1] for rows in fetched.values() for row in rows if row[-1] <= cursor)
+        if len(seqs) > limit:
+            cursor = seqs[limit - 1]
+        rows = {
+            name: [tuple(row[:-1]) for row in table_rows if row[-1] <= cursor]
+            for name, table_rows in fetched.items()
+        }
+        
+        parent_ids = self._parent_ids([row[0] for row in rows["players"]])
+        deleted = defaultdict(list)
+        for entity, entity_id in rows.pop("deleted"):
+            deleted[f"{entity}s"].append(entity_id)
+        
+        result = {"seq": cursor, "more": cursor < head}
+        for name, table_rows in rows.items():
+            columns = [column.key for column in _SOURCES[name][0]]
+            if name == "players":
+                columns.append("parent_ids")
+                table_rows = [row + (parent_ids.get(row[0], []),) for row in table_rows]
+            result[name] = {"columns": columns, "rows": table_rows}
+        result["deleted"] = {"games": deleted["games"], "players": deleted["players"]}
+        return result
+    
+    def _parent_ids(self, player_ids: List[int]) -> Dict[int, List[int]]:
+        """Parent links of the given players, in one query."""
+        parent_ids = defaultdict(list)
+        if player_ids:
+            for player_id, parent_id in self.db.execute(
+                select(player_parents.c.player_id, player_parents.c.parent_id)
+                .where(player_parents.c.player_id.in_(player_ids))
+            ):
+                parent_ids[player_id].append(parent_id)
+        return parent_ids
+    
+    def push(self, ops: Sequence[SyncOp], pack_finished: bool = False) -> List[Dict]:
+        """
+        Apply queued offline edits in order, each at most once.
+        
+        Each edit commits on its own together with its op_id. A failed edit
+        is rolled back and reported; it does not stop the ones after it.
+        
+        Args:
+            ops: Edits in the order they were made
+            pack_finished: Pack the rounds of games finished by an op
+        
+        Returns:
+            One result per op: op_id, status, duplicate and detail
+        """
+        applied = set(self.db.scalars(
+            select(AppliedSyncOp.op_id).where(AppliedSyncOp.op_id.in_([op.op_id for op in ops]))
+        ))
+        results = []
+        for op in ops:
+            if op.op_id in applied:
+                results.append({"op_id": op.op_id, "status": 200, "duplicate": True})
+                continue
+            try:
+                self.db.add(AppliedSyncOp(op_id=op.op_id))
+                self._apply(op, pack_finished)  # Commits the op_id with the edit
+            except HTTPException as exc:
+                self.db.rollback()
+                results.append({"op_id": op.op_id, "status": exc.status_code, "detail": exc.detail})
+                continue
+            except IntegrityError:
+                self.db.rollback()
+                if self.db.scalar(select(AppliedSyncOp.op_id).where(AppliedSyncOp.op_id == op.op_id)):
+                    # The same op_id was committed by a concurrent push
+                    results.append({"op_id": op.op_id, "status": 200, "duplicate": True})
+                else:
+                    # The edit itself broke a constraint, e.g. an unknown player
+                    results.append({"op_id": op.op_id, "status": 409,
+                                    "detail": "Edit conflicts with stored data"})
+                continue
+            applied.add(op.op_id)
+            results.append({"op_id": op.op_id, "status": 200})
+        return results
+    
+    def _apply(self, op: SyncOp, pack_finished: bool) -> None:
+        if op.kind == "cell":
+            if None in (op.round_number, op.player_id, op.bet, op.success):
+                raise HTTPException(
+                    status_code=400,
+                    detail="cell ops need round_number, player_id, bet and success"
+                )
+            RoundService(self.db).upsert_round(
+                op.game_id, op.round_number, op.player_id, op.bet, op.success
+            )
+        elif op.kind == "next_round":
+            GameService(self.db).increment_current_round(op.game_id, op.expected_version)
+        else:
+            GameService(self.db).finish_game(op.game_id, op.expected_version, pack=pack_finished)
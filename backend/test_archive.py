@@ -0,0 +1,104 @@
+"""
+Tests for archiving old finished games.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import ArchivedRound, Game, GamePlayer, Player, Round
+from services import ArchiveService
+
+
+def _finished_game(db, players, played_at):
+    game = Game(total_rounds=2, current_round=2, is_active=False, is_valid=True, date=played_at)
+    db.add(game)
+    db.flush()
+    for i, player in enumerate(players):
+        db.add(GamePlayer(game_id=game.id, player_id=player.id))
+        for rnd in (1, 2):
+            success = (rnd + i) % 2 == 0
+            db.add(Round(game_id=game.id, round_number=rnd, player_id=player.id,
+                         bet=rnd, success=success, score=10 + rnd if success else 0))
+    return game
+
+
+@pytest.fixture
+def history(db):
+    players = [Player(alias="mor"), Player(alias="far")]
+    db.add_all(players)
+    db.flush()
+    old = _finished_game(db, players, datetime(2019, 6, 1))
+    recent = _finished_game(db, players, datetime.utcnow() - timedelta(days=3))
+    db.commit()
+    return old.id, recent.id, players[0].id
+
+
+def test_archive_moves_rounds_and_keeps_reads_identical(client, db, history):
+    old_id, recent_id, player_id = history
+    before = {
+        "rounds": client.get(f"/games/{old_id}/rounds").json(),
+        "game_stats": client.get(f"/games/{old_id}/stats").json(),
+        "player_stats": client.get(f"/players/{player_id}/stats").json(),
+        "distribution": client.get(f"/players/{player_id}/bet-distribution").json(),
+    }
+
+    result = ArchiveService(db).archive_games(before=datetime(2020, 1, 1))
+
+    assert result == {"games": 1, "rounds": 4}
+    assert db.query(Round).filter(Round.game_id == old_id).count() == 0
+    assert db.query(ArchivedRound).filter(ArchivedRound.game_id == old_id).count() == 4
+    assert client.get(f"/games/{old_id}").json()["is_archived"] is True
+
+    assert client.get(f"/games/{old_id}/rounds").json() == before["rounds"]
+    assert client.get(f"/games/{old_id}/stats").json() == before["game_stats"]
+    assert client.get(f"/players/{player_id}/stats").json() == before["player_stats"]
+    assert client.get(f"/players/{player_id}/bet-distribution").json() == before["distribution"]
+
+
+def test_time_window_skips_archived_games(client, db, history):
+    _, _, player_id = history
+    ArchiveService(db).archive_games(before=datetime(2020, 1, 1))
+
+    recent = client.get(f"/players/{player_id}/stats", params={"since": "2020-01-01"}).json()
+    old = client.get(f"/players/{player_id}/stats", params={"until": "2020-01-01"}).json()
+
+    assert recent["games_played"] == 1 and old["games_played"] == 1
+    assert recent["total_rounds"] + old["total_rounds"] == 4
+
+
+def test_reactivate_restores_archived_rounds(client, db, history):
+    old_id, _, _ = history
+    ArchiveService(db).archive_games(before=datetime(2020, 1, 1))
+
+    client.post(f"/games/{old_id}/reactivate")
+
+    db.expire_all()
+    assert db.query(Round).filter(Round.game_id == old_id).count() == 4
+    assert db.query(ArchivedRound).count() == 0
+    assert db.get(Game, old_id).is_archived is False
+
+
+def test_games_in_detached_partitions_are_gone(client, db, history):
+    old_id, recent_id, _ = history
+    ArchiveService(db).archive_games(before=datetime(2020, 1, 1))
+    # What detach_partitions records on Postgres
+    db.get(Game, old_id).rounds_detached = True
+    db.commit()
+
+    for read in ("rounds", "matrix", "stats"):
+        assert client.get(f"/games/{old_id}/{read}").status_code == 410
+    assert client.get(f"/games/{recent_id}/rounds").status_code == 200
+
+    assert client.post(f"/games/{old_id}/reactivate").status_code == 400
+    db.expire_all()
+    assert db.get(Game, old_id).is_archived is True
+    assert db.query(ArchivedRound).count() == 4
+
+
+def test_only_finished_games_are_archived(db, history):
+    old_id, _, _ = history
+    db.get(Game, old_id).is_active = True
+    db.commit()
+
+    assert ArchiveService(db).archive_games(before=datetime.utcnow()) == {"games": 1, "rounds": 4}
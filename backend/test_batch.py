@@ -0,0 +1,101 @@
+"""
+Tests for the POST /batch endpoint.
+"""
+
+import pytest
+
+import main
+from database import LAST_WRITE_COOKIE, Round
+from services import cell_buffer
+
+
+@pytest.fixture
+def players(client):
+    return [client.post("/players", json={"alias": alias}).json()["id"] for alias in ("mor", "far")]
+
+
+def test_read_batch_returns_each_response(client, players):
+    response = client.post("/batch", json={"requests": [
+        {"id": "stats", "path": f"/players/{players[0]}/stats"},
+        {"id": "dist", "path": f"/players/{players[0]}/bet-distribution", "params": {"since": "2020-01-01"}},
+        {"id": "missing", "path": "/players/999"},
+        {"id": "games", "path": "/games?active_only=true"},
+    ]})
+
+    assert response.status_code == 200
+    assert LAST_WRITE_COOKIE not in response.cookies
+    result = response.json()
+    assert result["committed"] is True
+    by_id = {entry["id"]: entry for entry in result["responses"]}
+    assert [entry["id"] for entry in result["responses"]] == ["stats", "dist", "missing", "games"]
+    assert by_id["stats"]["body"] == client.get(f"/players/{players[0]}/stats").json()
+    assert by_id["dist"] == {"id": "dist", "status": 200, "body": []}
+    assert by_id["missing"]["status"] == 404
+    assert by_id["games"]["body"] == []
+
+
+def test_write_batch_commits_together(client, players):
+    response = client.post("/batch", json={"requests": [
+        {"id": "game", "method": "POST", "path": "/games",
+         "body": {"player_ids": players, "total_rounds": 3}},
+        {"id": "player", "method": "POST", "path": "/players", "body": {"alias": "bror"}},
+        {"id": "list", "path": "/players"},
+    ]})
+
+    result = response.json()
+    assert result["committed"] is True
+    assert [entry["status"] for entry in result["responses"]] == [200, 200, 200]
+    assert len(result["responses"][2]["body"]) == 3  # Sees the uncommitted player
+    assert LAST_WRITE_COOKIE in response.cookies
+    assert len(client.get("/games").json()) == 1
+
+
+def test_failed_write_batch_rolls_back(client, players):
+    response = client.post("/batch", json={"requests": [
+        {"id": "new", "method": "POST", "path": "/players", "body": {"alias": "bror"}},
+        {"id": "dup", "method": "POST", "path": "/players", "body": {"alias": "mor"}},
+        {"id": "after", "method": "POST", "path": "/players", "body": {"alias": "syster"}},
+    ]})
+
+    result = response.json()
+    assert result["committed"] is False
+    assert [entry["status"] for entry in result["responses"]] == [200, 400, 424]
+    assert sorted(p["alias"] for p in client.get("/players").json()) == ["far", "mor"]
+
+
+
+def test_write_batch_keeps_buffered_edits_out(client, db, players):
+    game_id = client.post("/games", json={"player_ids": players, "total_rounds": 3}).json()["id"]
+    cell = {"round_number": 1, "bet": 1, "success": True}
+    try:
+        # Acknowledged before the batch: written first, kept when it rolls back
+        cell_buffer.submit(game_id, 1, players[0], 1, True)
+        response = client.post("/batch", json={"requests": [
+            {"id": "upsert", "method": "POST", "path": f"/games/{game_id}/rounds/upsert",
+             "params": {**cell, "player_id": players[1]}},
+            {"id": "buffered", "method": "POST", "path": f"/games/{game_id}/rounds/buffered",
+             "params": {**cell, "player_id": players[1]}},
+        ]})
+    finally:
+        cell_buffer.discard_game(game_id)
+
+    result = response.json()
+    assert result["committed"] is False
+    assert [entry["status"] for entry in result["responses"]] == [200, 400]
+    assert [(r.player_id, r.bet) for r in db.query(Round)] == [(players[0], 1)]
+
+
+def test_batch_limits(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_REQUESTS", 2)
+    too_many = [{"id": str(i), "path": "/health"} for i in range(3)]
+    assert client.post("/batch", json={"requests": too_many}).status_code == 413
+
+    monkeypatch.setattr(main, "BATCH_MAX_BYTES", 100)
+    padded = [{"id": "x" * 200, "path": "/health"}]
+    assert client.post("/batch", json={"requests": padded}).status_code == 413
+
+    nested = [{"id": "a", "path": "/batch"}]
+    assert client.post("/batch", json={"requests": nested}).status_code == 400
+    duplicate = [{"id": "a", "path": "/health"}, {"id": "a", "path": "/health"}]
+    assert client.post("/batch", json={"requests": duplicate}).status_code == 400
+    assert client.post("/batch", json={"requests": [{"id": "a"}]}).status_code == 422
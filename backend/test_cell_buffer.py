@@ -0,0 +1,198 @@
+"""
+Tests for the write-behind cell edit buffer.
+"""
+
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pytest
+from sqlalchemy import event
+
+from database import Game, GamePlayer, Player, Round
+from services import CellEditBuffer, cell_buffer
+
+
+@pytest.fixture
+def game(db):
+    players = [Player(alias=f"p{i}") for i in range(4)]
+    game = Game(total_rounds=10)
+    db.add_all(players + [game])
+    db.flush()
+    db.add_all([GamePlayer(game_id=game.id, player_id=p.id) for p in players])
+    db.commit()
+    return game.id, [p.id for p in players]
+
+
+@pytest.fixture
+def commits(engine):
+    counter = {"count": 0}
+
+    def on_commit(conn):
+        counter["count"] += 1
+
+    event.listen(engine, "commit", on_commit)
+    yield counter
+    event.remove(engine, "commit", on_commit)
+
+
+def _tap_storm(player_ids, taps=200, seed=7):
+    """Random (round, player, bet, success) taps over the first three rounds."""
+    rng = random.Random(seed)
+    storm = []
+    for _ in range(taps):
+        round_number = rng.randint(1, 3)
+        storm.append((round_number, rng.choice(player_ids),
+                      rng.randint(0, round_number), rng.random() < 0.5))
+    return storm
+
+
+def _latest(storm):
+    return {(r, p): (bet, success) for r, p, bet, success in storm}
+
+
+def test_tap_storm_coalesces_into_one_commit(client, game, commits, db):
+    game_id, player_ids = game
+    storm = _tap_storm(player_ids)
+
+    for round_number, player_id, bet, success in storm:
+        client.post(f"/games/{game_id}/rounds/upsert", params={
+            "round_number": round_number, "player_id": player_id, "bet": bet, "success": success
+        })
+    direct_commits = commits["count"]
+
+    commits["count"] = 0
+    buffer = CellEditBuffer(flush_interval=60)
+    versions = [buffer.submit(game_id, *tap)["version"] for tap in storm]
+    assert versions == list(range(1, len(storm) + 1))
+    assert buffer.flush_all() == len(_latest(storm))
+
+    assert direct_commits >= len(storm)
+    assert commits["count"] == 1
+
+    stored = {(r.round_number, r.player_id): (r.bet, r.success) for r in db.query(Round)}
+    assert stored == _latest(storm)
+
+
+def test_reads_and_next_round_flush_pending_edits(client, game):
+    game_id, player_ids = game
+    cell_buffer.flush_interval = 60
+    cell_buffer.start()
+    try:
+        for bet in (0, 1, 0, 1):
+            ack = client.post(f"/games/{game_id}/rounds/buffered", params={
+                "round_number": 1, "player_id": player_ids[0], "bet": bet, "success": True
+            }).json()
+        assert ack["version"] > ack["flushed_version"]
+
+        rounds = client.get(f"/games/{game_id}/rounds").json()
+        assert [(r["bet"], r["score"]) for r in rounds] == [(1, 11)]
+
+        client.post(f"/games/{game_id}/rounds/buffered", params={
+            "round_number": 1, "player_id": player_ids[1], "bet": 1, "success": False
+        })
+        client.post(f"/games/{game_id}/increment-round")
+        assert not cell_buffer.has_pending(game_id)
+    finally:
+        cell_buffer.stop()
+        cell_buffer.discard_game(game_id)
+
+
+def test_stop_flushes_on_shutdown(game, db):
+    game_id, player_ids = game
+    buffer = CellEditBuffer(flush_interval=60)
+    buffer.start()
+    buffer.submit(game_id, 2, player_ids[2], 2, True)
+    buffer.stop()
+
+    row = db.query(Round).one()
+    assert (row.round_number, row.bet, row.score) == (2, 2, 12)
+
+
+def test_buffered_edit_without_flusher_is_written_immediately(client, game, db):
+    game_id, player_ids = game
+    ack = client.post(f"/games/{game_id}/rounds/buffered", params={
+        "round_number": 1, "player_id": player_ids[0], "bet": 1, "success": True
+    }).json()
+
+    assert ack["flushed_version"] == ack["version"]
+    assert db.query(Round).count() == 1
+
+
+def test_flush_waits_for_a_flush_in_progress(game, db):
+    game_id, player_ids = game
+    writing, release = threading.Event(), threading.Event()
+
+    class SlowBuffer(CellEditBuffer):
+        def _write(self, session, game_id, cells):
+            super()._write(session, game_id, cells)
+            writing.set()
+            release.wait(5)
+
+    buffer = SlowBuffer(flush_interval=60)
+    buffer.submit(game_id, 1, player_ids[0], 1, True)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        background = pool.submit(buffer.flush_game, game_id)
+        assert writing.wait(5)
+        # Nothing is pending any more, but the request must not read yet
+        request = pool.submit(buffer.flush_game, game_id)
+        assert not wait([request], timeout=0.1).done
+        release.set()
+        assert (background.result(5), request.result(5)) == (1, 0)
+
+    assert db.query(Round).count() == 1
+
+
+def test_closed_games_are_forgotten_after_their_last_flush(game, db):
+    game_id, player_ids = game
+    buffer = CellEditBuffer(flush_interval=60)
+    buffer.submit(game_id, 1, player_ids[0], 1, True)
+    buffer.close_game(game_id)
+    assert buffer.version(game_id) == 1  # Not written yet
+
+    buffer.flush_game(game_id)
+    assert buffer.version(game_id) == 0
+    assert db.query(Round).count() == 1
+
+
+def test_finishing_closes_the_game(client, game):
+    game_id, player_ids = game
+    client.post(f"/games/{game_id}/rounds/buffered", params={
+        "round_number": 1, "player_id": player_ids[0], "bet": 1, "success": True
+    })
+    assert cell_buffer.version(game_id) > 0
+
+    client.post(f"/games/{game_id}/finish")
+    assert cell_buffer.version(game_id) == 0
+
+
+def test_buffered_edits_are_checked_before_acknowledging(client, game):
+    game_id, player_ids = game
+
+    def edit(game_id, player_id):
+        return client.post(f"/games/{game_id}/rounds/buffered", params={
+            "round_number": 1, "player_id": player_id, "bet": 1, "success": True
+        })
+
+    assert edit(game_id + 1, player_ids[0]).status_code == 404
+    assert edit(game_id, 999).status_code == 400
+    client.post(f"/games/{game_id}/finish")
+    assert edit(game_id, player_ids[0]).status_code == 400
+    assert not cell_buffer.has_pending(game_id)
+
+
+def test_rejected_edits_are_set_aside(client, game, db):
+    game_id, player_ids = game
+    try:
+        cell_buffer.submit(game_id, 1, 999, 1, True)
+        cell_buffer.submit(game_id, 1, player_ids[0], 1, True)
+
+        # The flush done for the read writes the good edit and drops the bad one
+        response = client.get(f"/games/{game_id}/rounds")
+        assert response.status_code == 200
+        assert [r["player_id"] for r in response.json()] == [player_ids[0]]
+        assert not cell_buffer.has_pending(game_id)
+        assert cell_buffer.dead_letters[-1]["player_id"] == 999
+        assert client.get(f"/games/{game_id}/stats").status_code == 200
+    finally:
+        cell_buffer.discard_game(game_id)
@@ -0,0 +1,90 @@
+"""
+Tests for response compression and msgpack negotiation.
+"""
+
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+import main
+from database import Player
+from utils import CompressionCache, CompressionMiddleware
+from utils.compression import choose_encoding
+
+
+def _raw_client(cache: CompressionCache) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse("parvis " * 1000)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, cache=cache)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("*", "br"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_large_responses_are_compressed_once():
+    cache = CompressionCache(1024 * 1024)
+    client = _raw_client(cache)
+
+    for _ in range(3):
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.text == "parvis " * 1000
+
+    assert cache.stats() == (2, 1)
+
+
+def test_small_and_unaccepted_responses_pass_through():
+    client = _raw_client(CompressionCache(1024 * 1024))
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_players_as_msgpack(client, db):
+    db.add_all([Player(alias=f"spiller{i}") for i in range(3)])
+    db.commit()
+
+    as_json = client.get("/players").json()
+    response = client.get("/players", headers={"Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"].startswith("Accept")
+    assert msgpack.unpackb(response.content) == as_json
+
+
+@pytest.mark.parametrize("fast_json", [False, True])
+def test_json_lists_vary_on_accept(client, monkeypatch, fast_json):
+    monkeypatch.setattr(main, "FAST_JSON", fast_json)
+    mor = client.post("/players", json={"alias": "mor"}).json()["id"]
+    game_id = client.post("/games", json={"player_ids": [mor], "total_rounds": 3}).json()["id"]
+
+    for path in ("/players", "/games", f"/games/{game_id}/rounds", "/players?fields=id,alias"):
+        response = client.get(path)
+        assert response.headers["content-type"].startswith("application/json")
+        assert "Accept" in [value.strip() for value in response.headers["vary"].split(",")]
+
+
+def test_compression_cache_on_metrics(client):
+    main.compression_cache.clear()
+    assert 'parvis_cache_requests_total{cache="compression",result="hit"} 0' in client.get("/metrics").text
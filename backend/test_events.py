@@ -0,0 +1,118 @@
+"""
+Tests for the game event log, snapshots and replay.
+"""
+
+import pytest
+
+from database import EventCheckpoint, GameEvent
+from services import EventLog
+from services.event_log import GameStateProjection, apply_event
+
+
+@pytest.fixture
+def game(client):
+    mor = client.post("/players", json={"alias": "mor"}).json()["id"]
+    far = client.post("/players", json={"alias": "far"}).json()["id"]
+    game_id = client.post("/games", json={"player_ids": [mor, far], "total_rounds": 3}).json()["id"]
+    client.post(f"/games/{game_id}/rounds", json={"bets": [
+        {"player_id": mor, "bet": 1, "success": True},
+        {"player_id": far, "bet": 0, "success": False},
+    ]})
+    client.post(f"/games/{game_id}/rounds/upsert", params={
+        "round_number": 1, "player_id": far, "bet": 0, "success": True
+    })
+    return game_id, mor, far
+
+
+def _cells(client, game_id):
+    return {
+        f"{r['round_number']}:{r['player_id']}": [r["bet"], r["success"], r["score"]]
+        for r in client.get(f"/games/{game_id}/rounds").json()
+    }
+
+
+def test_changes_are_logged_in_order(client, game):
+    game_id, _, _ = game
+    client.post(f"/games/{game_id}/finish")
+
+    events = client.get(f"/games/{game_id}/events").json()
+    assert [e["kind"] for e in events] == [
+        "game_created", "round_advanced", "cells_set", "cells_set", "game_finished"
+    ]
+    assert [e["seq"] for e in events] == sorted({e["seq"] for e in events})
+    assert events[-1]["payload"]["values"]["is_active"] is False
+    after = client.get(f"/games/{game_id}/events", params={"after": events[2]["seq"]}).json()
+    assert [e["kind"] for e in after] == ["cells_set", "game_finished"]
+
+
+def test_replay_matches_current_state(client, game):
+    game_id, _, _ = game
+    replay = client.get(f"/games/{game_id}/replay").json()
+    assert replay["state"]["cells"] == _cells(client, game_id)
+    assert replay["state"]["game"]["current_round"] == client.get(f"/games/{game_id}").json()["current_round"]
+
+    first = client.get(f"/games/{game_id}/events").json()[0]["seq"]
+    initial = client.get(f"/games/{game_id}/replay", params={"at": first}).json()["state"]
+    assert initial["cells"] == {} and initial["game"]["current_round"] == 1
+    assert client.get("/games/999/replay").status_code == 404
+
+
+def test_snapshot_then_replay(client, db, game):
+    game_id, mor, _ = game
+    log = EventLog(db)
+    assert log.snapshot_games(min_events=100) == 0
+    assert log.snapshot_games(min_events=1) == 1
+    assert log.snapshot(game_id) is None  # Nothing new since
+
+    client.post(f"/games/{game_id}/rounds/upsert", params={
+        "round_number": 2, "player_id": mor, "bet": 2, "success": True
+    })
+    events = log.events(game_id)
+    replayed = None
+    for event in events:
+        replayed = apply_event(replayed, event.kind, event.payload)
+    assert log.state(game_id) == {"seq": events[-1].seq, "state": replayed}
+    assert replayed["cells"] == _cells(client, game_id)
+
+
+def test_projection_resumes_from_checkpoint(client, db, game):
+    game_id, _, _ = game
+    log = EventLog(db)
+    projection = GameStateProjection()
+    applied = log.run_projection("states", projection, batch_size=2)
+    assert applied == db.query(GameEvent).count()
+    assert db.get(EventCheckpoint, "states").seq == log.events(game_id)[-1].seq
+
+    client.delete(f"/games/{game_id}")
+    assert log.run_projection("states", projection) == 1
+    assert projection.states[game_id]["deleted"] is True
+
+    log.reset_projection("states")
+    rebuilt = GameStateProjection()
+    log.run_projection("states", rebuilt)
+    assert rebuilt.states == projection.states
+
+
+def test_stream_keeps_events_with_one_number_together(db, game):
+    # On Postgres the events of one transaction share a number
+    events = db.query(GameEvent).order_by(GameEvent.seq).all()
+    for event in events[:3]:
+        event.seq = events[2].seq
+    db.commit()
+
+    batches = list(EventLog(db).stream(batch_size=2))
+    assert len(batches[0]) == 3
+    assert sum(len(batch) for batch in batches) == len(events)
+    assert all(a[-1].seq < b[0].seq for a, b in zip(batches, batches[1:]))
+
+
+def test_bootstrap_imports_games_without_events(client, db, game):
+    game_id, _, _ = game
+    db.query(GameEvent).delete()
+    db.commit()
+
+    log = EventLog(db)
+    assert log.bootstrap() == 1
+    assert log.bootstrap() == 0
+    assert [e.kind for e in log.events(game_id)] == ["game_imported"]
+    assert log.state(game_id)["state"]["cells"] == _cells(client, game_id)
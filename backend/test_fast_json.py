@@ -0,0 +1,59 @@
+"""
+Tests for the PARVIS_FAST_JSON list-endpoint fast path.
+"""
+
+import pytest
+from sqlalchemy import select
+
+import main
+from database import Game, Player, Round, player_parents
+from utils import row_dicts
+
+
+@pytest.fixture
+def seeded(db):
+    grandma = Player(alias="bestemor", first_name="Åse")
+    db.add(grandma)
+    db.flush()
+    kid = Player(alias="barnebarn")
+    db.add(kid)
+    db.flush()
+    db.execute(player_parents.insert().values(player_id=kid.id, parent_id=grandma.id))
+    game = Game(total_rounds=3, notes="Påske", location=None)
+    db.add(game)
+    db.flush()
+    db.add_all([
+        Round(game_id=game.id, round_number=1, player_id=grandma.id, bet=1, success=True, score=11),
+        Round(game_id=game.id, round_number=1, player_id=kid.id, bet=0, success=False, score=0),
+    ])
+    db.commit()
+    return game.id
+
+
+@pytest.mark.parametrize("path", ["/games", "/players", "/games/{game_id}/rounds"])
+def test_fast_path_matches_default_output(client, seeded, monkeypatch, path):
+    url = path.format(game_id=seeded)
+
+    monkeypatch.setattr(main, "FAST_JSON", False)
+    default = client.get(url)
+    monkeypatch.setattr(main, "FAST_JSON", True)
+    fast = client.get(url)
+
+    assert fast.status_code == default.status_code == 200
+    assert fast.headers["content-type"] == default.headers["content-type"]
+    assert fast.content == default.content
+
+
+def test_openapi_schema_unchanged(client):
+    schema = client.get("/openapi.json").json()
+    response = schema["paths"]["/games"]["get"]["responses"]["200"]
+    assert response["content"]["application/json"]["schema"]["items"]["$ref"] == "#/components/schemas/Game"
+
+
+def test_rows_are_keyed_by_column_name(db, seeded):
+    # Columns out of schema order, plus one the schema lacks
+    rows = db.execute(select(Round.updated_seq, Round.score, Round.id)).all()
+    assert row_dicts(rows, ["id", "score"])[0].keys() == {"id", "score"}
+    assert [r["score"] for r in row_dicts(rows, ["id", "score"])] == [row.score for row in rows]
+    with pytest.raises(ValueError):
+        row_dicts([(1, 2, 3)], ["id", "score"])
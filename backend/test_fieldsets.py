@@ -0,0 +1,58 @@
+"""
+Tests for sparse fieldsets (`fields=`) and include-expansion (`include=`).
+"""
+
+import pytest
+
+
+@pytest.fixture
+def game(client):
+    mor = client.post("/players", json={"alias": "mor", "first_name": "Kari"}).json()["id"]
+    far = client.post("/players", json={"alias": "far", "parent_ids": [mor]}).json()["id"]
+    game = client.post("/games", json={"player_ids": [mor, far], "total_rounds": 2, "notes": "Jul"}).json()
+    client.post(f"/games/{game['id']}/rounds", json={"bets": [
+        {"player_id": mor, "bet": 1, "success": True},
+        {"player_id": far, "bet": 2, "success": False},
+    ]})
+    return game["id"], mor, far
+
+
+def test_player_fields_narrow_the_response(client, game, query_budget):
+    with query_budget(1):  # No parent lookup
+        players = client.get("/players", params={"fields": "alias"}).json()
+
+    assert sorted(players, key=lambda p: p["id"]) == [
+        {"id": game[1], "alias": "mor"},
+        {"id": game[2], "alias": "far"},
+    ]
+    with_parents = client.get("/players", params={"fields": "alias,parent_ids"}).json()
+    assert {p["alias"]: p["parent_ids"] for p in with_parents} == {"mor": [], "far": [game[1]]}
+
+
+def test_player_stats_include(client, game, query_budget):
+    with query_budget(2):
+        players = client.get("/players", params={"include": "stats", "fields": "id,alias"}).json()
+
+    stats = {p["alias"]: p["stats"] for p in players}
+    expected = client.get(f"/players/{game[1]}/stats").json()
+    assert stats["mor"] == {key: expected[key] for key in ("games_played", "total_rounds", "total_score", "successful_bets")}
+    assert stats["far"]["total_score"] == 0
+
+
+def test_game_fields_and_includes(client, game):
+    game_id, mor, far = game
+    games = client.get("/games", params={"fields": "date,is_active", "include": "participants,stats"}).json()
+
+    assert list(games[0]) == ["id", "date", "is_active", "participants", "stats"]
+    assert sorted(games[0]["participants"], key=lambda p: p["player_id"]) == [
+        {"player_id": mor, "alias": "mor"}, {"player_id": far, "alias": "far"}
+    ]
+    by_player = {s["player_id"]: s["total_score"] for s in games[0]["stats"]}
+    assert by_player == {s["player_id"]: s["total_score"] for s in client.get(f"/games/{game_id}/stats").json()}
+
+
+def test_default_response_unchanged_and_unknown_names_rejected(client, game):
+    assert "notes" in client.get("/games").json()[0]
+    assert "parent_ids" in client.get("/players").json()[0]
+    assert client.get("/players", params={"fields": "alias,password"}).status_code == 400
+    assert client.get("/games", params={"include": "rounds"}).status_code == 400
@@ -0,0 +1,113 @@
+"""
+Concurrency tests for atomic game mutations.
+
+Uses a file-backed SQLite database so each thread gets its own connection.
+"""
+
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Game, Player
+from models import RoundCreate
+from observability import count_queries
+from services import GameService, RoundService
+
+
+@pytest.fixture
+def file_sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'parvis.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    yield engine, sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_concurrent_increments_are_not_lost(file_sessions):
+    engine, Session = file_sessions
+    with Session() as db:
+        game = Game(total_rounds=1000, current_round=1)
+        db.add(game)
+        db.commit()
+        game_id = game.id
+
+    threads, per_thread = 8, 25
+    errors = []
+
+    def press_next_round():
+        try:
+            for _ in range(per_thread):
+                with Session() as db:
+                    GameService(db).increment_current_round(game_id)
+        except Exception as exc:  # surfaced below
+            errors.append(exc)
+
+    with count_queries(engine) as stats:
+        workers = [threading.Thread(target=press_next_round) for _ in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+    assert not errors
+    with Session() as db:
+        game = db.get(Game, game_id)
+        assert game.current_round == 1 + threads * per_thread
+        assert game.version == 1 + threads * per_thread
+    # One UPDATE ... RETURNING plus the event-log INSERT per increment, no SELECT round trip
+    assert stats.count == 2 * threads * per_thread
+
+
+def test_increment_stops_at_total_rounds(db):
+    game = Game(total_rounds=2, current_round=2)
+    db.add(game)
+    db.commit()
+
+    result = GameService(db).increment_current_round(game.id)
+    assert result["current_round"] == 2
+
+
+def test_stale_version_is_rejected(db):
+    game = Game(total_rounds=5)
+    db.add(game)
+    db.commit()
+    service = GameService(db)
+
+    first = service.increment_current_round(game.id, expected_version=1)
+    assert first == {"current_round": 2, "version": 2}
+
+    with pytest.raises(HTTPException) as exc_info:
+        service.finish_game(game.id, expected_version=1)
+    assert exc_info.value.status_code == 409
+
+    with pytest.raises(HTTPException) as exc_info:
+        service.increment_current_round(game.id + 1)
+    assert exc_info.value.status_code == 404
+
+
+def test_add_round_requires_active_game(db):
+    game = Game(total_rounds=5, is_active=False)
+    db.add(game)
+    db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        RoundService(db).add_round(game.id, RoundCreate(bets=[]))
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Game is not active"
+
+
+def test_adjust_rounds_uses_last_populated_round(client, db):
+    game = Game(total_rounds=5)
+    player = Player(alias="solo")
+    db.add_all([game, player])
+    db.commit()
+    client.post(f"/games/{game.id}/rounds/upsert",
+                params={"round_number": 3, "player_id": player.id, "bet": 2, "success": True})
+
+    response = client.post(f"/games/{game.id}/adjust-rounds", params={"new_total": 4}).json()
+    assert (response["new_total"], response["current_round"]) == (4, 3)
+
+    response = client.post(f"/games/{game.id}/adjust-rounds", params={"new_total": 2}).json()
+    assert response["current_round"] == 1
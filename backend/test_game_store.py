@@ -0,0 +1,141 @@
+"""
+Tests for the in-memory store of active games.
+"""
+
+import pytest
+
+from database import Round
+from services import cell_buffer, game_store
+from services.game_store import EPOCHS_PER_SLOT, ActiveGameStore
+
+
+@pytest.fixture
+def hot(engine):
+    game_store.clear()
+    game_store.enabled = True
+    yield game_store
+    game_store.enabled = False
+    game_store.clear()
+
+
+@pytest.fixture
+def game(client):
+    player_ids = [client.post("/players", json={"alias": alias}).json()["id"] for alias in ("mor", "far", "bror")]
+    game = client.post("/games", json={"player_ids": player_ids, "total_rounds": 4}).json()
+    client.post(f"/games/{game['id']}/rounds", json={"bets": [
+        {"player_id": pid, "bet": 1, "success": pid % 2 == 0} for pid in player_ids
+    ]})
+    client.post(f"/games/{game['id']}/rounds/upsert", params={
+        "round_number": 3, "player_id": player_ids[0], "bet": 2, "success": True
+    })
+    client.post(f"/games/{game['id']}/increment-round")
+    return game["id"], player_ids
+
+
+def _reads(client, game_id):
+    return {
+        path: client.get(f"/games/{game_id}{path}").json()
+        for path in ("", "/rounds", "/matrix", "/stats")
+    }
+
+
+def test_hot_reads_match_the_database(client, game, hot):
+    game_id, _ = game
+    hot.enabled = False
+    cold = _reads(client, game_id)
+    hot.enabled = True
+
+    assert _reads(client, game_id) == cold
+    assert _reads(client, game_id) == cold
+    assert hot.stats()[0] > 0
+
+
+def test_hot_reads_run_no_sql(client, game, hot, query_budget):
+    game_id, _ = game
+    _reads(client, game_id)
+
+    with query_budget(0):
+        _reads(client, game_id)
+
+
+def test_writes_go_through_to_memory_and_database(client, db, game, hot, query_budget):
+    game_id, player_ids = game
+    _reads(client, game_id)
+
+    client.post(f"/games/{game_id}/rounds/upsert", params={
+        "round_number": 2, "player_id": player_ids[1], "bet": 2, "success": True
+    })
+    progress = client.post(f"/games/{game_id}/increment-round").json()
+
+    with query_budget(0):
+        reads = _reads(client, game_id)
+    assert reads[""]["current_round"] == progress["current_round"]
+    assert reads[""]["version"] == progress["version"]
+    cell = next(r for r in reads["/rounds"] if (r["round_number"], r["player_id"]) == (2, player_ids[1]))
+    assert (cell["bet"], cell["success"], cell["score"]) == (2, True, 12)
+    assert db.query(Round).filter(Round.game_id == game_id, Round.round_number == 2).count() == 3
+
+    hot.enabled = False
+    assert _reads(client, game_id) == reads
+
+
+def test_buffered_edits_reload_the_game(client, game, hot):
+    game_id, player_ids = game
+    _reads(client, game_id)
+
+    client.post(f"/games/{game_id}/rounds/buffered", params={
+        "round_number": 1, "player_id": player_ids[0], "bet": 0, "success": True
+    })
+
+    stats = {s["player_id"]: s for s in client.get(f"/games/{game_id}/stats").json()}
+    assert stats[player_ids[0]]["total_score"] == 10 + 12
+
+
+def test_finish_and_rename_evict(client, game, hot):
+    game_id, player_ids = game
+    _reads(client, game_id)
+
+    client.put(f"/players/{player_ids[0]}", json={"alias": "mormor"})
+    assert client.get(f"/games/{game_id}/stats").json()[0]["player_alias"] == "mormor"
+
+    client.post(f"/games/{game_id}/finish")
+    assert client.get(f"/games/{game_id}").json()["is_active"] is False
+    assert game_store.game(game_id) is None
+
+
+def test_delete_evicts_and_drops_buffered_edits(client, game, hot):
+    game_id, player_ids = game
+    _reads(client, game_id)
+    assert game_store.game(game_id) is not None
+    cell_buffer.submit(game_id, 2, player_ids[1], 1, True)
+
+    client.delete(f"/games/{game_id}")
+    assert not cell_buffer.has_pending(game_id)
+    assert game_store.game(game_id) is None
+    assert client.get(f"/games/{game_id}").status_code == 404
+
+
+def test_verify_drops_games_changed_behind_the_store(client, db, game, hot):
+    game_id, _ = game
+    hot.load_active()
+    assert hot.verify() == []
+
+    db.query(Round).filter(Round.game_id == game_id, Round.round_number == 2).update({"score": 99})
+    db.commit()
+
+    assert hot.verify() == [game_id]
+    stats = client.get(f"/games/{game_id}/stats").json()
+    assert any(s["total_score"] >= 99 for s in stats)
+
+
+def test_change_counters_stay_bounded(client, game):
+    game_id, _ = game
+    store = ActiveGameStore(max_games=1)
+    store.enabled = True
+    for other_id in range(1000, 1100):
+        store.discard_game(other_id)
+    assert len(store._epochs) <= EPOCHS_PER_SLOT
+
+    assert store.game(game_id) is not None
+    assert store.game(game_id) is not None
+    assert store.stats() == (1, 1)
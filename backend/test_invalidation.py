@@ -0,0 +1,99 @@
+"""
+Tests for cross-process cache invalidation, with two simulated workers.
+"""
+
+import pytest
+
+import main
+from database import Game
+from services.game_store import ActiveGameStore
+from utils import MemoryInvalidationBus, invalidate, set_invalidation_bus
+from utils.invalidation import decode, encode
+
+
+@pytest.fixture
+def workers(engine):
+    """Worker A handles the requests; worker B has its own active-game store."""
+    peers = []
+    bus_a, bus_b = MemoryInvalidationBus(peers), MemoryInvalidationBus(peers)
+    store_b = ActiveGameStore()
+    store_b.enabled = True
+    received = []
+    bus_b.subscribe(store_b.invalidate)
+    bus_b.subscribe(lambda kind, entity_id: received.append((kind, entity_id)))
+    previous = set_invalidation_bus(bus_a)
+    yield bus_a, store_b, received
+    set_invalidation_bus(previous)
+
+
+@pytest.fixture
+def game(client):
+    mor = client.post("/players", json={"alias": "mor"}).json()["id"]
+    far = client.post("/players", json={"alias": "far"}).json()["id"]
+    game_id = client.post("/games", json={"player_ids": [mor, far], "total_rounds": 3}).json()["id"]
+    return game_id, mor, far
+
+
+def test_other_worker_drops_changed_game(client, workers, game):
+    _, store_b, received = workers
+    game_id, mor, _ = game
+    assert store_b.game(game_id)["current_round"] == 1
+
+    client.post(f"/games/{game_id}/rounds/upsert", params={
+        "round_number": 1, "player_id": mor, "bet": 1, "success": True
+    })
+    assert received[-1] == ("game", game_id)
+    assert store_b.rounds(game_id)[0].score == 11  # Reloaded, not stale
+
+    client.post(f"/games/{game_id}/increment-round")
+    assert store_b.game(game_id)["current_round"] == 2
+
+
+def test_player_rename_drops_their_games(client, workers, game):
+    _, store_b, received = workers
+    game_id, mor, _ = game
+    assert store_b.game_stats(game_id)[0].player_alias == "mor"
+
+    client.put(f"/players/{mor}", json={"alias": "mamma"})
+    assert received[-1] == ("player", mor)
+    assert {s.player_alias for s in store_b.game_stats(game_id)} == {"mamma", "far"}
+
+
+def test_only_committed_changes_from_others_are_delivered(db, workers, game):
+    bus_a, _, received = workers
+    own = []
+    bus_a.subscribe(lambda kind, entity_id: own.append((kind, entity_id)))
+    received.clear()
+
+    db.get(Game, game[0])  # In a transaction, as after a write
+    invalidate(db, "game", game[0])
+    db.rollback()
+    db.commit()
+    assert received == []
+
+    invalidate(db, "game", game[0])
+    invalidate(db, "game", game[0])
+    db.commit()
+    assert received == [("game", game[0])]
+    assert own == []
+
+
+def test_reset_drops_everything(workers, game):
+    _, store_b, _ = workers
+    store_b.game(game[0])
+    store_b.invalidate("all", 0)
+    assert store_b.stats() == (0, 1)
+    store_b.game(game[0])
+    assert store_b.stats() == (0, 2)
+
+
+def test_notify_payload_round_trip():
+    assert decode(encode("node", [("game", 3), ("player", 12)])) == ("node", [("game", 3), ("player", 12)])
+
+
+def test_no_bus_without_hot_games(monkeypatch):
+    monkeypatch.setattr(main, "INVALIDATION", "memory")
+    monkeypatch.setattr(main, "HOT_GAMES", False)
+    assert main.invalidation_bus() is None
+    monkeypatch.setattr(main, "HOT_GAMES", True)
+    assert isinstance(main.invalidation_bus(), MemoryInvalidationBus)
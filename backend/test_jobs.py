@@ -0,0 +1,104 @@
+"""
+Tests for the background job queue.
+"""
+
+from datetime import datetime, timedelta
+
+from database import Game, Job
+from services import JOB_HANDLERS, JobQueue, JobRunner
+
+
+def test_enqueue_dedups_pending_jobs(db):
+    queue = JobQueue(db)
+    first = queue.enqueue("snapshot_games", {"min_events": 5})
+    assert queue.enqueue("snapshot_games", {"min_events": 5}, priority=3) == first
+    assert queue.enqueue("snapshot_games", {"min_events": 6}) != first
+    assert queue.enqueue("snapshot_games", {"min_events": 5}, dedup=False) != first
+    db.commit()
+    assert db.get(Job, first).priority == 3
+
+    db.execute(Job.__table__.update().where(Job.id == first).values(status="done"))
+    assert queue.enqueue("snapshot_games", {"min_events": 5}) != first
+
+
+def test_jobs_run_by_priority_and_report_progress(db):
+    queue = JobQueue(db)
+    order = []
+
+    def record(session, args, progress):
+        order.append(args["name"])
+        progress(1, 2, "halfway")
+        return {"name": args["name"]}
+
+    low = queue.enqueue("record", {"name": "low"})
+    high = queue.enqueue("record", {"name": "high"}, priority=5)
+    db.commit()
+
+    assert JobRunner({"record": record}).run_pending() == 2
+    assert order == ["high", "low"]
+    db.expire_all()
+    job = db.get(Job, low)
+    assert (job.status, job.attempts, job.result) == ("done", 1, {"name": "low"})
+    assert job.progress == {"done": 1, "total": 2, "message": "halfway"}
+    assert db.get(Job, high).finished_at is not None
+
+
+def test_failed_jobs_are_retried_then_marked_failed(db):
+    queue = JobQueue(db)
+    job_id = queue.enqueue("flaky", max_attempts=2)
+    db.commit()
+
+    def flaky(session, args, progress):
+        raise RuntimeError("boom")
+
+    runner = JobRunner({"flaky": flaky})
+    assert runner.run_pending() == 1  # Retry is scheduled in the future
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert (job.status, job.attempts, job.error) == ("pending", 1, "RuntimeError: boom")
+
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert runner.run_pending() == 1
+    db.expire_all()
+    assert db.get(Job, job_id).status == "failed"
+
+
+def test_expired_lease_is_claimed_again(db):
+    queue = JobQueue(db)
+    job_id = queue.enqueue("snapshot_games")
+    db.commit()
+    assert queue.claim(lease=timedelta(seconds=-1)).id == job_id  # Its worker "died"
+    assert queue.claim().id == job_id
+    assert queue.claim() is None
+
+
+def test_expired_last_attempt_is_marked_failed(db):
+    queue = JobQueue(db)
+    job_id = queue.enqueue("snapshot_games", max_attempts=1)
+    db.commit()
+    queue.claim(lease=timedelta(seconds=-1))
+
+    assert queue.claim() is None
+    job = db.get(Job, job_id)
+    db.refresh(job)
+    assert (job.status, job.error) == ("failed", "Lease expired on the last attempt")
+
+
+def test_finish_queues_pack_job_and_endpoints_report_it(client, db):
+    mor = client.post("/players", json={"alias": "mor"}).json()["id"]
+    game_id = client.post("/games", json={"player_ids": [mor], "total_rounds": 1}).json()["id"]
+    client.post(f"/games/{game_id}/rounds", json={"bets": [{"player_id": mor, "bet": 1, "success": True}]})
+
+    assert client.post(f"/games/{game_id}/finish").status_code == 200
+
+    created = client.post("/jobs", json={"kind": "pack_game", "args": {"game_id": game_id}}).json()
+    assert created["status"] == "pending"
+    JobRunner(JOB_HANDLERS).run_pending()
+
+    job = client.get(f"/jobs/{created['id']}").json()
+    assert (job["status"], job["result"]) == ("done", {"rounds": 1})
+    assert db.get(Game, game_id).is_packed is True
+    assert [j["id"] for j in client.get("/jobs", params={"status": "done"}).json()] == [created["id"]]
+    assert client.post("/jobs", json={"kind": "nope"}).status_code == 400
+    assert client.get("/jobs/999").status_code == 404
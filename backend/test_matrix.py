@@ -0,0 +1,83 @@
+"""
+Tests for the dense game matrix endpoint.
+"""
+
+import base64
+import json
+
+from database import Game, GamePlayer, Player, Round
+
+
+def _success_bit(matrix, round_number, column):
+    bitmap = base64.b64decode(matrix["success"])
+    bit = (round_number - 1) * len(matrix["player_ids"]) + column
+    return bool(bitmap[bit >> 3] & (1 << (bit & 7)))
+
+
+def _seed(db, total_rounds=3, players=3):
+    people = [Player(alias=f"spiller{i}") for i in range(players)]
+    game = Game(total_rounds=total_rounds)
+    db.add_all(people + [game])
+    db.flush()
+    db.add_all([GamePlayer(game_id=game.id, player_id=p.id) for p in people])
+    return game, people
+
+
+def test_matrix_matches_rounds(client, db):
+    game, (a, b, c) = _seed(db)
+    db.add_all([
+        Round(game_id=game.id, round_number=1, player_id=a.id, bet=1, success=True, score=11),
+        Round(game_id=game.id, round_number=1, player_id=b.id, bet=0, success=False, score=0),
+        Round(game_id=game.id, round_number=2, player_id=c.id, bet=2, success=True, score=12),
+        # Beyond total_rounds: ignored, like in game stats
+        Round(game_id=game.id, round_number=4, player_id=a.id, bet=3, success=True, score=13),
+    ])
+    db.commit()
+
+    matrix = client.get(f"/games/{game.id}/matrix").json()
+
+    assert matrix["total_rounds"] == 3
+    assert matrix["player_ids"] == [a.id, b.id, c.id]
+    assert matrix["bets"] == [[1, 0, None], [None, None, 2], [None, None, None]]
+    assert _success_bit(matrix, 1, 0) and _success_bit(matrix, 2, 2)
+    assert not _success_bit(matrix, 1, 1) and not _success_bit(matrix, 2, 0)
+    assert matrix["totals"] == [11, 0, 12]
+    assert matrix["success_base_score"] == 10
+
+
+def test_matrix_varies_on_accept(client, db):
+    game, _ = _seed(db)
+    db.commit()
+    for accept in ("application/json", "application/msgpack"):
+        response = client.get(f"/games/{game.id}/matrix", headers={"Accept": accept})
+        assert "Accept" in response.headers["Vary"]
+
+
+def test_matrix_single_query(client, db, query_budget):
+    game, _ = _seed(db)
+    game_id = game.id
+    db.commit()
+    with query_budget(1):
+        response = client.get(f"/games/{game_id}/matrix")
+    assert response.json()["bets"] == [[None] * 3] * 3
+
+
+def test_matrix_is_much_smaller_than_rounds(client, db):
+    game, people = _seed(db, total_rounds=50, players=10)
+    db.add_all([
+        Round(game_id=game.id, round_number=r, player_id=p.id, bet=r % 4, success=r % 2 == 0,
+              score=10 + r % 4 if r % 2 == 0 else 0)
+        for r in range(1, 51) for p in people
+    ])
+    db.commit()
+
+    headers = {"Accept-Encoding": "identity"}
+    rounds = client.get(f"/games/{game.id}/rounds", headers=headers).content
+    matrix = client.get(f"/games/{game.id}/matrix", headers=headers).content
+
+    assert len(json.loads(matrix)["bets"]) == 50
+    assert len(rounds) > 5 * len(matrix)
+
+
+def test_matrix_missing_game(client, engine):
+    assert client.get("/games/999/matrix").status_code == 404
@@ -0,0 +1,31 @@
+"""
+Tests for the Prometheus `/metrics` endpoint.
+"""
+
+from observability import metrics_registry
+
+
+def test_metrics_use_route_templates(client, engine):
+    metrics_registry.reset()
+    client.get("/games/1")
+    client.get("/games/2")
+    client.get("/health")
+
+    body = client.get("/metrics").text
+
+    assert 'parvis_http_requests_total{method="GET",route="/games/{game_id}",status="404"} 2' in body
+    assert 'parvis_http_requests_total{method="GET",route="/health",status="200"} 1' in body
+    assert 'parvis_http_request_duration_seconds_count{method="GET",route="/games/{game_id}"} 2' in body
+    assert 'parvis_http_response_size_bytes_bucket{method="GET",route="/health",le="+Inf"} 1' in body
+    # The /metrics request itself is in flight while rendering
+    assert "parvis_http_requests_in_flight 1" in body
+
+
+def test_unmatched_routes_share_one_label(client, engine):
+    metrics_registry.reset()
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+
+    body = client.get("/metrics").text
+
+    assert 'route="<unmatched>",status="404"} 2' in body
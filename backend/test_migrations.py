@@ -0,0 +1,70 @@
+"""
+Tests for schema versioning and the startup schema check.
+"""
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from database import Base
+from migrations import SCHEMA_VERSION, SchemaVersionError, check_schema, run_migrations, unique_round_cells
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'parvis.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_fresh_database_fails_check(file_engine):
+    with pytest.raises(SchemaVersionError, match="python -m migrate"):
+        check_schema(file_engine)
+
+
+def test_migrate_records_version(file_engine):
+    Base.metadata.create_all(bind=file_engine)
+
+    assert run_migrations(file_engine) == (None, SCHEMA_VERSION)
+    assert check_schema(file_engine) == SCHEMA_VERSION
+    # Second run has nothing to do
+    assert run_migrations(file_engine) == (SCHEMA_VERSION, SCHEMA_VERSION)
+
+
+def test_outdated_schema_fails_check(file_engine):
+    Base.metadata.create_all(bind=file_engine)
+    run_migrations(file_engine)
+    with file_engine.begin() as conn:
+        conn.execute(text("UPDATE schema_version SET version = version - 1"))
+
+    with pytest.raises(SchemaVersionError):
+        check_schema(file_engine)
+
+
+def test_check_is_one_query(file_engine):
+    Base.metadata.create_all(bind=file_engine)
+    run_migrations(file_engine)
+
+    statements = []
+    event.listen(file_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    check_schema(file_engine)
+
+    assert statements == ["SELECT version FROM schema_version"]
+
+
+def test_duplicate_cells_are_removed_and_counted(file_engine, caplog):
+    Base.metadata.create_all(bind=file_engine)
+    with file_engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_rounds_cell"))
+        conn.execute(text("INSERT INTO players (id, alias) VALUES (1, 'mor')"))
+        conn.execute(text("INSERT INTO games (id, total_rounds) VALUES (1, 3)"))
+        for round_id, bet in ((1, 0), (2, 1), (3, 2)):
+            conn.execute(text(
+                "INSERT INTO rounds (id, game_id, round_number, player_id, bet, success, score) "
+                "VALUES (:id, 1, 1, 1, :bet, 1, 10)"
+            ), {"id": round_id, "bet": bet})
+
+    with file_engine.begin() as conn:
+        unique_round_cells(conn)
+        assert conn.execute(text("SELECT id, bet FROM rounds")).all() == [(3, 2)]
+    assert "Removed 2 duplicate round cells" in caplog.text
@@ -0,0 +1,149 @@
+"""
+Tests for packed storage of finished games.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Game, GamePlayer, PackedRounds, Player, Round
+from services import ArchiveService, GameService, JOB_HANDLERS, JobRunner, PackService, cell_buffer
+from services.pack_service import RoundRow, pack_cells, unpack_cells
+
+
+@pytest.fixture
+def history(db):
+    """An old and a recent finished game; the second player skipped round 2 of the old one."""
+    players = [Player(alias="mor"), Player(alias="far")]
+    db.add_all(players)
+    db.flush()
+    game_ids = []
+    for played_at in (datetime(2019, 6, 1), datetime.utcnow() - timedelta(days=3)):
+        game = Game(total_rounds=3, current_round=3, is_active=False, is_valid=True, date=played_at)
+        db.add(game)
+        db.flush()
+        for i, player in enumerate(players):
+            db.add(GamePlayer(game_id=game.id, player_id=player.id))
+            for rnd in (1, 2, 3):
+                if i == 1 and rnd == 2 and not game_ids:
+                    continue
+                success = (rnd + i) % 2 == 0
+                db.add(Round(game_id=game.id, round_number=rnd, player_id=player.id,
+                             bet=rnd - 1, success=success, score=9 + rnd if success else 0))
+        game_ids.append(game.id)
+    db.commit()
+    return game_ids[0], game_ids[1], players[1].id
+
+
+def _reads(client, game_id, player_id):
+    return {
+        "rounds": client.get(f"/games/{game_id}/rounds").json(),
+        "matrix": client.get(f"/games/{game_id}/matrix").json(),
+        "game_stats": client.get(f"/games/{game_id}/stats").json(),
+        "player_stats": client.get(f"/players/{player_id}/stats").json(),
+        "window": client.get(f"/players/{player_id}/stats", params={"since": "2020-01-01"}).json(),
+        "distribution": client.get(f"/players/{player_id}/bet-distribution").json(),
+    }
+
+
+def test_pack_cells_round_trip():
+    cells = [RoundRow(7, 1, 1, 2, 0, True, 10), RoundRow(9, 1, 3, 2, 3, False, 0)]
+    packed = pack_cells(1, 2, cells)
+
+    assert len(packed["bets"]) == 6 and len(packed["success"]) == 1
+    assert (packed["rounds_played"], packed["successful_bets"], packed["bet_sum"], packed["total_score"]) == (2, 1, 3, 10)
+    assert unpack_cells(PackedRounds(**packed)) == cells
+
+
+def test_packed_game_reads_identically(client, db, history):
+    old_id, _, player_id = history
+    before = _reads(client, old_id, player_id)
+
+    assert PackService(db).pack_game(old_id) == 5
+    db.commit()
+
+    assert db.query(Round).filter(Round.game_id == old_id).count() == 0
+    assert db.query(PackedRounds).filter(PackedRounds.game_id == old_id).count() == 2
+    assert _reads(client, old_id, player_id) == before
+
+
+def test_packed_stats_skip_rounds_past_total_rounds(client, db, history):
+    old_id, _, player_id = history
+    # A round left over after total_rounds was lowered
+    db.add(Round(game_id=old_id, round_number=4, player_id=player_id, bet=2, success=True, score=12))
+    db.commit()
+
+    def stats():
+        games = client.get("/games", params={"include": "stats"}).json()
+        return [game["stats"] for game in games], client.get(f"/games/{old_id}/stats").json()
+
+    before = stats()
+    assert PackService(db).pack_game(old_id) == 6
+    db.commit()
+
+    assert stats() == before
+
+
+def test_finish_game_packs_and_reactivate_unpacks(client, db, history):
+    old_id, _, _ = history
+    round_ids = sorted(r.id for r in db.query(Round).filter(Round.game_id == old_id))
+
+    GameService(db).finish_game(old_id, pack=True)
+    assert db.get(Game, old_id).is_packed is False  # Queued, not packed in the request
+    assert JobRunner(JOB_HANDLERS).run_pending() == 1
+    db.expire_all()
+    assert db.get(Game, old_id).is_packed is True
+
+    client.post(f"/games/{old_id}/reactivate")
+
+    db.expire_all()
+    assert sorted(r.id for r in db.query(Round).filter(Round.game_id == old_id)) == round_ids
+    assert db.query(PackedRounds).count() == 0
+    assert db.get(Game, old_id).is_packed is False
+
+
+def test_packing_an_archived_game_empties_the_archive(client, db, history):
+    old_id, _, player_id = history
+    ArchiveService(db).archive_games(before=datetime(2020, 1, 1))
+    before = _reads(client, old_id, player_id)
+
+    assert PackService(db).pack_games(before=datetime(2020, 1, 1)) == {"games": 1, "rounds": 5}
+
+    db.expire_all()
+    game = db.get(Game, old_id)
+    assert (game.is_archived, game.is_packed) == (False, True)
+    assert _reads(client, old_id, player_id) == before
+
+
+def test_editing_a_packed_game_unpacks_it(client, db, history):
+    old_id, _, player_id = history
+    PackService(db).pack_game(old_id)
+    db.commit()
+
+    client.post(f"/games/{old_id}/rounds/upsert", params={
+        "round_number": 2, "player_id": player_id, "bet": 1, "success": True
+    })
+
+    rounds = client.get(f"/games/{old_id}/rounds").json()
+    assert len(rounds) == 6
+    assert db.query(PackedRounds).count() == 0
+
+
+def test_every_write_path_unpacks(client, db, history):
+    old_id, _, player_id = history
+    round_ids = {(r["round_number"], r["player_id"]): r["id"] for r in client.get(f"/games/{old_id}/rounds").json()}
+    PackService(db).pack_game(old_id)
+    db.commit()
+
+    # Accepted while the game was active, flushed after it was packed
+    cell_buffer.submit(old_id, 2, player_id, 1, True)
+    rounds = client.get(f"/games/{old_id}/rounds").json()
+    assert len(rounds) == 6
+    assert client.get(f"/games/{old_id}/matrix").json()["bets"][1][1] == 1
+
+    PackService(db).pack_game(old_id)
+    db.commit()
+    response = client.put(f"/games/{old_id}/rounds/{round_ids[(1, player_id)]}", params={"bet": 1, "success": True})
+    assert response.status_code == 200
+    assert db.query(PackedRounds).count() == 0
+    assert db.query(Round).filter(Round.game_id == old_id).count() == 6
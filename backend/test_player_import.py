@@ -0,0 +1,92 @@
+"""
+Tests for bulk player import (POST /players/import) and its CLI.
+"""
+
+from import_players import read_players
+
+
+def _parents(client):
+    players = client.get("/players").json()
+    alias = {p["id"]: p["alias"] for p in players}
+    return {p["alias"]: sorted(alias[i] for i in p["parent_ids"]) for p in players}
+
+
+def _import(client, players):
+    return client.post("/players/import", json={"players": players})
+
+
+def test_import_family_with_keys_and_aliases(client, query_budget):
+    client.post("/players", json={"alias": "oldefar"})
+    players = [
+        {"alias": "bestemor", "first_name": "Kari", "parents": ["oldefar"]},
+        {"key": "m", "alias": "mor", "parents": ["bestemor"]},
+        {"alias": "far"},
+    ] + [{"alias": f"barn{i}", "parents": ["m", "far"]} for i in range(20)]
+
+    # Lookup, ancestry, player insert, link insert, regardless of size
+    with query_budget(4):
+        result = _import(client, players).json()
+
+    assert (result["created"], result["updated"], result["parents_added"]) == (23, 0, 42)
+    assert set(result["ids"]) == {p["alias"] for p in players}
+    family = _parents(client)
+    assert family["bestemor"] == ["oldefar"]
+    assert family["barn7"] == ["far", "mor"]
+
+
+def test_existing_players_are_diffed(client, db):
+    mor = client.post("/players", json={"alias": "mor", "first_name": "Anne"}).json()["id"]
+    far = client.post("/players", json={"alias": "far"}).json()["id"]
+    client.post("/players", json={"alias": "barn", "parent_ids": [mor, far]})
+    client.post("/players", json={"alias": "tante"})
+    seq = client.get("/sync").json()["seq"]
+
+    result = _import(client, [
+        {"alias": "barn", "parents": ["mor", "stefar"]},
+        {"alias": "stefar", "last_name": "Berg"},
+        {"alias": "mor", "last_name": "Hansen"},
+        {"alias": "tante"},
+    ]).json()
+
+    assert {k: result[k] for k in ("created", "updated", "unchanged", "parents_added", "parents_removed")} == {
+        "created": 1, "updated": 2, "unchanged": 1, "parents_added": 1, "parents_removed": 1
+    }
+    assert _parents(client)["barn"] == ["mor", "stefar"]
+    # Omitted fields are kept; untouched players are not re-synced
+    assert client.get(f"/players/{mor}").json()["first_name"] == "Anne"
+    changed = {p[1] for p in client.get("/sync", params={"since": seq}).json()["players"]["rows"]}
+    assert changed == {"barn", "stefar", "mor"}
+
+
+def test_rejected_imports_write_nothing(client):
+    barn = client.post("/players", json={"alias": "barn"}).json()["id"]
+    client.post("/players", json={"alias": "mor", "parent_ids": []})
+    client.put(f"/players/{barn}", json={"alias": "barn", "parent_ids": [barn + 1]})
+
+    unknown = _import(client, [{"alias": "ny", "parents": ["ukjent"]}])
+    assert unknown.status_code == 400 and "ukjent" in unknown.json()["detail"]
+
+    duplicate = _import(client, [{"alias": "ny"}, {"alias": "ny"}])
+    assert duplicate.status_code == 400
+
+    # ny -> barn -> mor -> ny closes a loop through an existing link
+    cycle = _import(client, [{"alias": "ny", "parents": ["barn"]}, {"alias": "mor", "parents": ["ny"]}])
+    assert cycle.status_code == 400
+    assert "ny -> barn -> mor -> ny" in cycle.json()["detail"]
+
+    assert _import(client, [{"alias": "selv", "key": "s", "parents": ["s"]}]).status_code == 400
+    assert sorted(_parents(client)) == ["barn", "mor"]
+
+
+def test_read_players_from_csv(tmp_path):
+    path = tmp_path / "family.csv"
+    path.write_text(
+        "key,alias,first_name,last_name,parents\n"
+        "m,mor,Anne,,\n"
+        ",barn,Per,Hansen,m; far\n",
+        encoding="utf-8"
+    )
+    mor, barn = read_players(str(path))
+    assert (mor.key, mor.alias, mor.parents) == ("m", "mor", None)
+    assert "last_name" not in mor.model_fields_set
+    assert (barn.key, barn.parents) == (None, ["m", "far"])
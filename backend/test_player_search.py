@@ -0,0 +1,63 @@
+"""
+Tests for indexed player search (GET /players/search).
+"""
+
+from datetime import datetime
+
+import pytest
+
+from database import Player
+
+
+@pytest.fixture
+def players(db):
+    db.add_all([
+        Player(alias="kari", first_name="Kari", last_name="Nordmann",
+               last_game_date=datetime(2024, 1, 1)),
+        Player(alias="karinor", first_name="Karin", last_name="Berg",
+               last_game_date=datetime(2025, 1, 1)),
+        Player(alias="oldie", first_name="Ola", middle_name="Kåre", last_name="Hansen"),
+        Player(alias="bestefar", first_name="Per", last_name="Hansen",
+               last_game_date=datetime(2023, 6, 1)),
+    ])
+    db.commit()
+
+
+def _search(client, q, **params):
+    response = client.get("/players/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return [(player["alias"], player["match"]) for player in response.json()]
+
+
+def test_alias_prefix_ranks_exact_then_recent(client, players):
+    assert _search(client, "kari")[:2] == [("kari", "alias"), ("karinor", "alias")]
+    assert _search(client, "KAR")[:2] == [("karinor", "alias"), ("kari", "alias")]
+
+
+def test_name_words_match_by_prefix(client, players):
+    assert _search(client, "hans") == [("bestefar", "name"), ("oldie", "name")]
+    assert _search(client, "per hans") == [("bestefar", "name")]
+    # Diacritics are ignored
+    assert ("oldie", "name") in _search(client, "kare")
+
+
+def test_fuzzy_match_tolerates_typos(client, players):
+    assert ("kari", "fuzzy") in _search(client, "nordman kari x")
+    assert _search(client, "hansne")[:2] == [("bestefar", "fuzzy"), ("oldie", "fuzzy")]
+    assert _search(client, "zzz") == []
+
+
+def test_limit_and_validation(client, players):
+    assert len(_search(client, "k", limit=1)) == 1
+    assert client.get("/players/search", params={"q": ""}).status_code == 422
+    assert client.get("/players/search", params={"q": "a", "limit": 0}).status_code == 422
+
+
+def test_index_follows_updates_and_deletes(client, players):
+    oldie = client.get("/players/search", params={"q": "oldie"}).json()[0]["id"]
+    client.put(f"/players/{oldie}", json={"alias": "young", "first_name": "Ola"})
+    assert _search(client, "oldie") == []
+    assert _search(client, "young") == [("young", "alias")]
+
+    client.delete(f"/players/{oldie}")
+    assert _search(client, "young") == []
@@ -0,0 +1,91 @@
+"""
+Tests for opt-in per-request profiling.
+"""
+
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from observability import profiling
+from observability.profiling import ProfilingRoute
+
+
+TOKEN = {"X-Profile-Token": "s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def profile_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", TOKEN["X-Profile-Token"])
+
+
+def _busy_work(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+
+def _make_client() -> TestClient:
+    app = FastAPI()
+    app.router.route_class = ProfilingRoute
+
+    @app.get("/slow/{item_id}")
+    def get_game_rounds(item_id: int):
+        _busy_work(0.05)
+        return {"item_id": item_id, "payload": [str(i) for i in range(1000)]}
+
+    return TestClient(app)
+
+
+def test_unprofiled_request_is_untouched():
+    response = _make_client().get("/slow/3")
+    assert response.json()["item_id"] == 3
+    assert "X-Profile-Samples" not in response.headers
+
+
+def test_collapsed_stacks_returned():
+    response = _make_client().get("/slow/3", headers={"X-Profile": "collapsed", **TOKEN})
+
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    lines = response.text.splitlines()
+    assert any("test_profiling.py:get_game_rounds;test_profiling.py:_busy_work" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_allocation_snapshot_for_heavy_route():
+    response = _make_client().get("/slow/3?__profile=alloc", headers=TOKEN)
+
+    assert "allocation sites for get_game_rounds" in response.text
+    assert "test_profiling.py" in response.text
+
+
+def test_overlapping_memory_profiles():
+    client = _make_client()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: client.get("/slow/3?__profile=alloc", headers=TOKEN), range(8)))
+
+    assert all(r.status_code == 200 and "allocation sites" in r.text for r in responses)
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiles_need_the_token(monkeypatch):
+    client = _make_client()
+    for headers in ({}, {"X-Profile-Token": "wrong"}):
+        response = client.get("/slow/3", headers={"X-Profile": "collapsed", **headers})
+        assert response.json()["item_id"] == 3
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    response = client.get("/slow/3", headers={"X-Profile": "collapsed", "X-Profile-Token": ""})
+    assert response.json()["item_id"] == 3
+
+
+def test_unknown_format_is_rejected():
+    response = _make_client().get("/slow/3", headers={"X-Profile": "flame", **TOKEN})
+    assert response.status_code == 400
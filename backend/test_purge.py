@@ -0,0 +1,93 @@
+"""
+Tests for game deletion cascades and the bulk purge.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Game, GamePlayer, Player, Round
+from services import cell_buffer
+
+
+def _game(db, player, days_old, is_active, is_valid, rounds=3):
+    game = Game(total_rounds=rounds, is_active=is_active, is_valid=is_valid,
+                date=datetime.utcnow() - timedelta(days=days_old))
+    db.add(game)
+    db.flush()
+    db.add(GamePlayer(game_id=game.id, player_id=player.id))
+    db.add_all([Round(game_id=game.id, round_number=r, player_id=player.id,
+                      bet=0, success=False, score=0) for r in range(1, rounds + 1)])
+    return game
+
+
+@pytest.fixture
+def games(db):
+    player = Player(alias="nana")
+    db.add(player)
+    db.flush()
+    games = {
+        "old_cancelled": _game(db, player, 90, is_active=False, is_valid=False),
+        "new_cancelled": _game(db, player, 1, is_active=False, is_valid=False),
+        "old_abandoned": _game(db, player, 30, is_active=True, is_valid=False),
+        "old_finished": _game(db, player, 400, is_active=False, is_valid=True),
+    }
+    db.commit()
+    return {name: game.id for name, game in games.items()}
+
+
+def test_delete_game_cascades(client, db, games):
+    game_id = games["old_finished"]
+    assert client.delete(f"/games/{game_id}").status_code == 200
+
+    assert db.query(Round).filter(Round.game_id == game_id).count() == 0
+    assert db.query(GamePlayer).filter(GamePlayer.game_id == game_id).count() == 0
+    assert client.delete(f"/games/{game_id}").status_code == 404
+
+
+def test_purge_dry_run_reports_without_deleting(client, db, games):
+    report = client.post("/games/purge", params={
+        "cancelled_older_than_days": 60, "abandoned_older_than_days": 7
+    }).json()
+
+    assert report == {
+        "dry_run": True,
+        "games": 2,
+        "rounds": 6,
+        "game_players": 2,
+        "sample_game_ids": sorted([games["old_cancelled"], games["old_abandoned"]])
+    }
+    assert db.query(Game).count() == 4
+
+
+def test_purge_judges_abandoned_games_by_last_change(client, db, games, monkeypatch):
+    monkeypatch.setattr("services.game_service.PURGE_SAMPLE_SIZE", 1)
+    # Created 30 days ago, but played today
+    client.post(f"/games/{games['old_abandoned']}/rounds/upsert", params={
+        "round_number": 1, "player_id": db.query(Player).one().id, "bet": 1, "success": True
+    })
+
+    report = client.post("/games/purge", params={"abandoned_older_than_days": 7}).json()
+    assert report["games"] == 0
+
+    report = client.post("/games/purge", params={"cancelled_older_than_days": 0}).json()
+    assert report["games"] == 2 and report["sample_game_ids"] == [games["old_cancelled"]]
+
+
+def test_purge_deletes_in_batches_and_invalidates(client, db, games):
+    cell_buffer.submit(games["old_cancelled"], 1, 1, 0, True)
+
+    report = client.post("/games/purge", params={
+        "cancelled_older_than_days": 60, "abandoned_older_than_days": 7,
+        "dry_run": False, "batch_size": 1
+    }).json()
+
+    assert report["games"] == 2
+    remaining = {g.id for g in db.query(Game)}
+    assert remaining == {games["new_cancelled"], games["old_finished"]}
+    assert {r.game_id for r in db.query(Round)} == remaining
+    assert not cell_buffer.has_pending(games["old_cancelled"])
+
+
+def test_purge_requires_a_filter(client, games):
+    assert client.post("/games/purge").status_code == 400
@@ -0,0 +1,133 @@
+"""
+Query budget tests for the main endpoints.
+
+Each test pins the number of SQL statements an endpoint may issue, so N+1
+patterns show up as test failures instead of slow game nights.
+"""
+
+import pytest
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from database import Game, GamePlayer, Player, Round, get_db
+from observability import QueryStatsMiddleware
+
+
+@pytest.fixture
+def seeded_game(db):
+    """A game with 4 players (two of them with parents) and 3 rounds."""
+    grandma = Player(alias="grandma")
+    grandpa = Player(alias="grandpa")
+    db.add_all([grandma, grandpa])
+    db.flush()
+    kids = [Player(alias=f"kid{i}", parents=[grandma, grandpa]) for i in range(2)]
+    db.add_all(kids)
+    db.flush()
+    players = [grandma, grandpa] + kids
+
+    game = Game(total_rounds=5, current_round=3)
+    db.add(game)
+    db.flush()
+    for p in players:
+        db.add(GamePlayer(game_id=game.id, player_id=p.id))
+        for rnd in range(1, 4):
+            db.add(Round(game_id=game.id, round_number=rnd, player_id=p.id,
+                         bet=rnd, success=rnd % 2 == 1, score=10 + rnd if rnd % 2 else 0))
+    db.commit()
+    return game.id, [p.id for p in players]
+
+
+class TestQueryBudgets:
+    """Endpoints must issue a constant number of statements."""
+
+    def test_get_players(self, client, seeded_game, query_budget):
+        with query_budget(2):
+            response = client.get("/players")
+        assert response.status_code == 200
+        kids = [p for p in response.json() if p["alias"].startswith("kid")]
+        assert all(len(k["parent_ids"]) == 2 for k in kids)
+
+    def test_game_stats(self, client, seeded_game, query_budget):
+        game_id, player_ids = seeded_game
+        with query_budget(3):
+            response = client.get(f"/games/{game_id}/stats")
+        stats = response.json()
+        assert [s["player_id"] for s in stats] == player_ids
+        assert all(s["rounds_played"] == 3 for s in stats)
+        assert all(s["total_score"] == 11 + 13 for s in stats)
+        assert all(s["successful_bets"] == 2 and s["failed_bets"] == 1 for s in stats)
+
+    def test_create_player_with_parents(self, client, seeded_game, query_budget):
+        _, player_ids = seeded_game
+        with query_budget(6):
+            response = client.post("/players", json={"alias": "baby", "parent_ids": player_ids})
+        assert response.status_code == 200
+        family = client.get(f"/players/{response.json()['id']}/family").json()
+        assert sorted(family["parent_ids"]) == sorted(player_ids)
+
+    def test_create_game_constant_statements(self, client, db, query_budget):
+        players = [Player(alias=f"cousin{i}") for i in range(12)]
+        db.add_all(players)
+        db.commit()
+        player_ids = [p.id for p in players]
+
+        with query_budget(6):  # Including the game_created event
+            response = client.post("/games", json={
+                "player_ids": player_ids, "total_rounds": 10, "seed_first_round": True
+            })
+        game = response.json()
+        assert (game["current_round"], game["is_active"], game["version"]) == (1, True, 1)
+
+        rounds = client.get(f"/games/{game['id']}/rounds").json()
+        assert [(r["player_id"], r["round_number"], r["bet"]) for r in rounds] == \
+            [(pid, 1, 0) for pid in player_ids]
+        stats = client.get(f"/games/{game['id']}/stats").json()
+        assert [s["player_id"] for s in stats] == player_ids
+        db.expire_all()
+        assert all(p.last_game_date is not None for p in db.query(Player))
+
+    def test_create_game_rejects_unknown_players(self, client, seeded_game, query_budget):
+        _, player_ids = seeded_game
+        with query_budget(1):
+            response = client.post("/games", json={
+                "player_ids": player_ids + [998, 999], "total_rounds": 10
+            })
+        assert response.status_code == 400
+        assert "[998, 999]" in response.json()["detail"]
+        assert len(client.get("/games").json()) == 1
+
+    def test_increment_round(self, client, seeded_game, query_budget):
+        game_id, _ = seeded_game
+        with query_budget(2):  # UPDATE ... RETURNING and its event
+            response = client.post(f"/games/{game_id}/increment-round")
+        assert response.json() == {"current_round": 4, "version": 2}
+
+    def test_player_stats(self, client, seeded_game, query_budget):
+        _, player_ids = seeded_game
+        with query_budget(2):
+            response = client.get(f"/players/{player_ids[0]}/stats")
+        assert response.json()["total_rounds"] == 3
+
+
+def test_budget_exceeded_lists_statements(engine, query_budget):
+    with pytest.raises(AssertionError, match="budget 1"):
+        with query_budget(1):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+
+def test_debug_headers(engine):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/count")
+    def count(db=Depends(get_db)):
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+        return {}
+
+    response = TestClient(app).get("/count")
+    assert response.headers["X-DB-Queries"] == "2"
+    assert float(response.headers["X-DB-Time"]) >= 0.0
@@ -0,0 +1,63 @@
+"""
+Tests for read-replica routing.
+
+Two SQLite files stand in for the primary and a replica that never catches
+up, which makes it visible which database served each read.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from database import Base, SessionLocal, ReadSessionLocal, LAST_WRITE_COOKIE
+from main import app
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        Base.metadata.create_all(bind=engine)
+
+    old_write, old_read = SessionLocal.kw["bind"], ReadSessionLocal.kw["bind"]
+    SessionLocal.configure(bind=primary)
+    ReadSessionLocal.configure(bind=replica)
+    yield
+    SessionLocal.configure(bind=old_write)
+    ReadSessionLocal.configure(bind=old_read)
+    primary.dispose()
+    replica.dispose()
+
+
+def _create_game(client):
+    player = client.post("/players", json={"alias": "bestefar"}).json()
+    return client.post("/games", json={"player_ids": [player["id"]], "total_rounds": 3}).json()
+
+
+def test_reads_go_to_replica(primary_and_replica):
+    writer = TestClient(app)
+    game = _create_game(writer)
+
+    reader = TestClient(app)  # no last-write cookie
+    assert reader.get("/games").json() == []
+    assert reader.get(f"/games/{game['id']}/rounds").json() == []
+    # Non-listing reads still use the primary
+    assert reader.get(f"/games/{game['id']}").json()["id"] == game["id"]
+
+
+def test_client_reads_its_own_writes(primary_and_replica):
+    client = TestClient(app)
+    game = _create_game(client)
+
+    assert LAST_WRITE_COOKIE in client.cookies
+    assert [g["id"] for g in client.get("/games").json()] == [game["id"]]
+    assert len(client.get(f"/games/{game['id']}/stats").json()) == 1
+
+
+def test_failed_writes_do_not_pin_to_primary(primary_and_replica):
+    client = TestClient(app)
+    response = client.post("/games/999/finish")
+
+    assert response.status_code == 404
+    assert LAST_WRITE_COOKIE not in client.cookies
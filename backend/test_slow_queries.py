@@ -0,0 +1,40 @@
+"""
+Tests for the slow-query log.
+"""
+
+import logging
+
+import pytest
+
+from database import Game, GamePlayer, Player
+from observability import install_slow_query_log
+from services import GameService
+
+
+@pytest.fixture
+def log_everything(engine, tmp_path):
+    plan_file = tmp_path / "plans.log"
+    slow_log = install_slow_query_log(engine, threshold_ms=0, explain_rate=1.0,
+                                      plan_file=str(plan_file))
+    yield plan_file
+    slow_log.uninstall()
+
+
+def test_slow_queries_logged_with_origin_and_plan(db, log_everything, caplog):
+    player = Player(alias="ada")
+    game = Game(total_rounds=3)
+    db.add_all([player, game])
+    db.flush()
+    db.add(GamePlayer(game_id=game.id, player_id=player.id))
+    db.commit()
+
+    with caplog.at_level(logging.WARNING, logger="parvis.slow_query"):
+        GameService(db).get_game_stats(game.id)
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("GameService.get_game_stats" in m and "FROM rounds" in m for m in messages)
+    assert all("params=" in m for m in messages)
+
+    plans = log_everything.read_text()
+    assert "GameService.get_game_stats" in plans
+    assert "SCAN" in plans or "SEARCH" in plans
@@ -0,0 +1,114 @@
+"""
+Tests for the embedded SQLite mode: connection pragmas, portable upserts
+and the Postgres dump importer.
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select, text
+
+from database import ArchivedRound, Game, GamePlayer, Player, Round, engine_options, player_parents
+from pg_to_sqlite import read_dump, write_sqlite
+from models import RoundCreate
+from services import PlayerService, RoundService
+
+
+DUMP = """\
+--
+-- PostgreSQL database dump
+--
+
+COPY public.players (id, alias, first_name, middle_name, last_name, birthdate, registration_date, last_game_date) FROM stdin;
+1	bestefar	Ola\\tJr	\\N	Nordmann	1950-03-01	2024-01-01	2024-06-01 19:30:00.123456
+2	barnebarn	\\N	\\N	\\N	\\N	2024-01-01	\\N
+\\.
+
+
+COPY public.player_parents (player_id, parent_id) FROM stdin;
+2	1
+\\.
+
+
+COPY public.games (id, game_type, date, notes, location, total_rounds, current_round, is_active, is_valid, version, is_archived) FROM stdin;
+7	standard	2019-12-24 18:00:00	Jul	Hytta	10	10	f	t	3	t
+\\.
+
+
+COPY public.rounds_archive_2019 (id, game_date, game_id, round_number, player_id, bet, success, score) FROM stdin;
+40	2019-12-24 18:00:00	7	1	1	1	t	11
+41	2019-12-24 18:00:00	7	1	2	0	f	0
+\\.
+"""
+
+
+def test_file_connections_use_wal(tmp_path):
+    url = f"sqlite:///{tmp_path / 'parvis.db'}"
+    engine = create_engine(url, **engine_options(url))
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    engine.dispose()
+
+
+def test_upsert_round_updates_in_place(db):
+    player = Player(alias="bestefar")
+    game = Game(total_rounds=5)
+    db.add_all([player, game])
+    db.commit()
+
+    service = RoundService(db)
+    first = service.upsert_round(game.id, 1, player.id, 1, False)
+    second = service.upsert_round(game.id, 1, player.id, 1, True)
+
+    assert second["id"] == first["id"]
+    assert second["score"] == 11
+    assert db.query(Round).count() == 1
+
+    stats = PlayerService(db).get_player_stats(player.id)
+    assert stats.successful_bets == 1
+
+
+
+def test_add_round_does_not_overwrite_cells(db):
+    player = Player(alias="bestefar")
+    game = Game(total_rounds=5)
+    db.add_all([player, game])
+    db.flush()
+    db.add(GamePlayer(game_id=game.id, player_id=player.id))
+    db.commit()
+
+    service = RoundService(db)
+    service.upsert_round(game.id, 2, player.id, 2, True)  # Filled in ahead of round 2
+    with pytest.raises(HTTPException) as exc:
+        service.add_round(game.id, RoundCreate(bets=[{"player_id": player.id, "bet": 0, "success": True}]))
+
+    assert exc.value.status_code == 409
+    db.expire_all()
+    assert db.get(Game, game.id).current_round == 1
+    assert [(r.round_number, r.bet) for r in db.query(Round)] == [(2, 2)]
+
+
+def test_import_pg_dump(tmp_path):
+    url = f"sqlite:///{tmp_path / 'imported.db'}"
+    counts = write_sqlite(url, read_dump(DUMP.splitlines(keepends=True)))
+
+    assert counts["players"] == 2
+    assert counts["rounds_archive"] == 2
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        grandpa = conn.execute(select(Player).where(Player.id == 1)).one()
+        assert grandpa.first_name == "Ola\tJr"
+        assert grandpa.middle_name is None
+        assert grandpa.last_game_date == datetime(2024, 6, 1, 19, 30, 0, 123456)
+
+        game = conn.execute(select(Game)).one()
+        assert game.is_archived is True and game.is_active is False
+
+        assert conn.execute(select(func.sum(ArchivedRound.score))).scalar() == 11
+        assert conn.execute(select(player_parents)).all() == [(2, 1)]
+    engine.dispose()
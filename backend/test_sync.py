@@ -0,0 +1,121 @@
+"""
+Tests for delta sync (GET /sync) and replaying offline edits (POST /sync).
+"""
+
+import pytest
+from sqlalchemy import func, select, update
+
+import main
+from database import Round
+
+
+@pytest.fixture
+def game(client):
+    mor = client.post("/players", json={"alias": "mor"}).json()["id"]
+    far = client.post("/players", json={"alias": "far"}).json()["id"]
+    game = client.post("/games", json={"player_ids": [mor, far], "total_rounds": 3}).json()
+    return game["id"], mor, far
+
+
+def _rows(changes, table):
+    columns = changes[table]["columns"]
+    return [dict(zip(columns, row)) for row in changes[table]["rows"]]
+
+
+def test_full_then_delta_sync(client, game):
+    game_id, mor, far = game
+    full = client.get("/sync").json()
+    assert {p["alias"] for p in _rows(full, "players")} == {"mor", "far"}
+    assert [g["id"] for g in _rows(full, "games")] == [game_id]
+    assert len(full["game_players"]["rows"]) == 2
+    assert full["more"] is False
+
+    client.post(f"/games/{game_id}/rounds/upsert", params={
+        "round_number": 1, "player_id": mor, "bet": 1, "success": True
+    })
+    client.put(f"/players/{far}", json={"alias": "far", "parent_ids": [mor]})
+
+    delta = client.get("/sync", params={"since": full["seq"]}).json()
+    assert delta["seq"] > full["seq"]
+    assert [(r["player_id"], r["score"]) for r in _rows(delta, "rounds")] == [(mor, 11)]
+    assert [(p["alias"], p["parent_ids"]) for p in _rows(delta, "players")] == [("far", [mor])]
+    assert delta["games"]["rows"] == [] and delta["game_players"]["rows"] == []
+
+    assert client.get("/sync", params={"since": delta["seq"]}).json()["rounds"]["rows"] == []
+
+
+def test_deletes_leave_tombstones(client, game):
+    game_id, _, _ = game
+    loner = client.post("/players", json={"alias": "loner"}).json()["id"]
+    seq = client.get("/sync").json()["seq"]
+
+    client.delete(f"/games/{game_id}")
+    client.delete(f"/players/{loner}")
+
+    delta = client.get("/sync", params={"since": seq}).json()
+    assert delta["deleted"] == {"games": [game_id], "players": [loner]}
+
+
+def test_sync_pages_through_changes(client, game, monkeypatch):
+    game_id, mor, far = game
+    for round_number in (1, 2, 3):
+        client.post(f"/games/{game_id}/rounds/upsert", params={
+            "round_number": round_number, "player_id": mor, "bet": 0, "success": True
+        })
+    monkeypatch.setattr(main, "SYNC_PAGE_SIZE", 2)
+
+    seen, since, pages = [], 0, 0
+    while True:
+        page = client.get("/sync", params={"since": since}).json()
+        seen += [row for table in ("players", "games", "game_players", "rounds") for row in page[table]["rows"]]
+        since, pages = page["seq"], pages + 1
+        if not page["more"]:
+            break
+    assert len(seen) == 2 + 1 + 2 + 3
+    assert pages >= 4
+
+
+def test_sync_keeps_rows_with_one_number_together(client, db, game, monkeypatch):
+    game_id, mor, far = game
+    for round_number in (1, 2, 3):
+        client.post(f"/games/{game_id}/rounds/upsert", params={
+            "round_number": round_number, "player_id": mor, "bet": 0, "success": True
+        })
+    # On Postgres every row written by one transaction gets the same number
+    shared = db.scalar(select(func.max(Round.updated_seq)))
+    db.execute(update(Round).where(Round.updated_seq != shared).values(updated_seq=shared))
+    db.commit()
+    monkeypatch.setattr(main, "SYNC_PAGE_SIZE", 2)
+
+    round_pages, since = [], 0
+    while True:
+        page = client.get("/sync", params={"since": since}).json()
+        round_pages.append(len(page["rounds"]["rows"]))
+        since = page["seq"]
+        if not page["more"]:
+            break
+    assert [count for count in round_pages if count] == [3]
+
+
+def test_push_applies_each_op_once(client, game):
+    game_id, mor, far = game
+    ops = [
+        {"op_id": "a", "kind": "cell", "game_id": game_id, "round_number": 1,
+         "player_id": mor, "bet": 1, "success": True},
+        {"op_id": "b", "kind": "next_round", "game_id": game_id},
+        {"op_id": "c", "kind": "cell", "game_id": game_id, "round_number": 1, "player_id": far},
+        {"op_id": "d", "kind": "cell", "game_id": 999, "round_number": 1,
+         "player_id": far, "bet": 0, "success": True},
+        {"op_id": "e", "kind": "cell", "game_id": game_id, "round_number": 1,
+         "player_id": 999, "bet": 0, "success": True},
+    ]
+
+    first = client.post("/sync", json={"ops": ops}).json()["results"]
+    assert [(r["op_id"], r["status"], r["duplicate"]) for r in first] == [
+        ("a", 200, False), ("b", 200, False), ("c", 400, False), ("d", 404, False), ("e", 409, False)
+    ]
+
+    again = client.post("/sync", json={"ops": ops[:2]}).json()["results"]
+    assert [r["duplicate"] for r in again] == [True, True]
+    assert client.get(f"/games/{game_id}").json()["current_round"] == 2
+    assert len(client.get(f"/games/{game_id}/rounds").json()) == 1
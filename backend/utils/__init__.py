@@ -5,21 +5,79 @@ This package contains reusable utilities for:
 - Scoring calculations
 - Input validation
 - Database queries
-- Model serialization
+- Round sources spanning hot, archived and packed storage
+- Fast JSON responses for list endpoints
+- Response compression and content negotiation
+- In-process request batching
+- Sparse fieldsets and include-expansion
+- Cross-process cache invalidation
 """
 
 from .scoring import calculate_score
 from .validators import validate_bet, validate_positive_int
-from .db_helpers import get_game_or_404, get_player_or_404, get_round_or_404, get_player_by_alias
-from .serializers import player_to_dict_with_relations
+from .db_helpers import (
+    get_game_or_404,
+    update_game_or_404,
+    get_player_or_404,
+    get_round_or_404,
+    get_player_by_alias,
+    upsert_rounds,
+    dialect_insert,
+    add_tombstones,
+    add_event,
+    cell_payload
+)
+from .round_sources import all_rounds, packed_past_total_rounds, packed_rounds, round_totals
+from .fast_json import FastJSONResponse, fast_json_response, row_dicts, rows_to_json
+from .compression import CompressionCache, CompressionMiddleware
+from .negotiation import MsgpackResponse, negotiated_response, wants_msgpack
+from .fieldsets import parse_fields, parse_include, response_keys
+from .batching import WRITE_METHODS, batch_body, read_limited_body, run_batch
+from .invalidation import (
+    InvalidationBus,
+    MemoryInvalidationBus,
+    PostgresInvalidationBus,
+    invalidate,
+    set_invalidation_bus
+)
 
 __all__ = [
     'calculate_score',
     'validate_bet',
     'validate_positive_int',
     'get_game_or_404',
+    'update_game_or_404',
     'get_player_or_404',
     'get_round_or_404',
     'get_player_by_alias',
-    'player_to_dict_with_relations',
+    'upsert_rounds',
+    'dialect_insert',
+    'add_tombstones',
+    'add_event',
+    'cell_payload',
+    'all_rounds',
+    'packed_past_total_rounds',
+    'packed_rounds',
+    'round_totals',
+    'FastJSONResponse',
+    'fast_json_response',
+    'row_dicts',
+    'rows_to_json',
+    'CompressionCache',
+    'CompressionMiddleware',
+    'MsgpackResponse',
+    'negotiated_response',
+    'wants_msgpack',
+    'parse_fields',
+    'parse_include',
+    'response_keys',
+    'WRITE_METHODS',
+    'batch_body',
+    'read_limited_body',
+    'run_batch',
+    'InvalidationBus',
+    'MemoryInvalidationBus',
+    'PostgresInvalidationBus',
+    'invalidate',
+    'set_invalidation_bus',
 ]
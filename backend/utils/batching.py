@@ -0,0 +1,169 @@
+"""
+In-process execution of batched API requests.
+
+Pages that fan out with `Promise.all` (stats per player, game plus rounds
+plus stats) can send the calls as one `POST /batch`. Each sub-request is
+run through the application itself, so routing, validation, services and
+response models behave exactly as for a direct call, but without HTTP
+round trips; the route shares one database session between them (see
+`database.batch_session`).
+
+Sub-responses that are JSON are spliced into the batch response as they
+are, without decoding them again.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from .fast_json import dumps
+
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+SKIPPED_BODY = dumps({"detail": "Not run: an earlier request in the batch failed"})
+
+
+async def read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read a request body, refusing bodies larger than `max_bytes`.
+
+    Raises:
+        HTTPException: 413 as soon as the limit is exceeded
+    """
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Batch body is larger than {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Batch body is larger than {max_bytes} bytes")
+    return bytes(body)
+
+
+def _query_string(path: str, params: Dict[str, Any]) -> Tuple[str, str]:
+    path, _, query = path.partition("?")
+    if params:
+        encoded = urlencode({
+            name: ("true" if value else "false") if isinstance(value, bool) else value
+            for name, value in params.items()
+        }, doseq=True)
+        query = f"{query}&{encoded}" if query else encoded
+    return path, query
+
+
+async def call_app(
+    app,
+    method: str,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    body: Any = None,
+    client: Optional[Tuple[str, int]] = None
+) -> Tuple[int, str, bytes]:
+    """
+    Run one request through an ASGI app in-process.
+
+    Args:
+        app: The application (middleware included)
+        method: HTTP method
+        path: Path, optionally with a query string
+        params: Extra query parameters
+        body: JSON body, if any
+        client: Client address of the outer request
+
+    Returns:
+        (status, content type, body)
+    """
+    path, query = _query_string(path, params or {})
+    payload = b"" if body is None else dumps(body)
+    headers = [(b"host", b"batch"), (b"accept", b"application/json")]
+    if payload:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode("latin-1"),
+        "headers": headers,
+        "client": client,
+        "server": None,
+    }
+
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    status, content_type, chunks = 500, "", []
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for name, value in message.get("headers", []):
+                if name.lower() == b"content-type":
+                    content_type = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Logged by the app's error middleware; report it as this entry's status
+        status = 500
+    return status, content_type, b"".join(chunks)
+
+
+def _entry(request_id: str, status: int, content_type: str, body: bytes) -> bytes:
+    """One `{"id", "status", "body"}` object, reusing JSON bodies as they are."""
+    if not body:
+        content = b"null"
+    elif content_type.startswith("application/json"):
+        content = body
+    else:
+        content = dumps(body.decode("utf-8", "replace"))
+    return dumps({"id": request_id, "status": status})[:-1] + b',"body":' + content + b"}"
+
+
+async def run_batch(app, items: List, stop_on_error: bool, client=None) -> Tuple[List[bytes], bool]:
+    """
+    Run sub-requests in order.
+
+    Args:
+        app: The application
+        items: Sub-requests with id, method, path, params and body
+        stop_on_error: Skip the remaining requests (status 424) after one fails
+        client: Client address of the outer request
+
+    Returns:
+        (encoded entries, whether any sub-request failed)
+    """
+    entries, failed = [], False
+    for item in items:
+        if failed and stop_on_error:
+            entries.append(_entry(item.id, 424, "application/json", SKIPPED_BODY))
+            continue
+        status, content_type, body = await call_app(
+            app, item.method, item.path, item.params, item.body, client
+        )
+        failed = failed or status >= 400
+        entries.append(_entry(item.id, status, content_type, body))
+    return entries, failed
+
+
+def batch_body(entries: List[bytes], committed: bool) -> bytes:
+    """The batch response: `{"committed": ..., "responses": [...]}`."""
+    return b'{"committed":' + (b"true" if committed else b"false") + \
+        b',"responses":[' + b",".join(entries) + b"]}"
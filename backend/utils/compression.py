@@ -0,0 +1,188 @@
+"""
+Response compression with a shared cache of compressed bodies.
+
+`CompressionMiddleware` compresses buffered responses above a size threshold
+with brotli (if the `brotli` package is installed and the client accepts it)
+or gzip. Small responses, streamed responses and responses that are already
+encoded pass through untouched.
+
+Many clients poll the same large payloads (the round matrix, the player
+directory), so compressed bodies are kept in a small LRU keyed by encoding
+and a digest of the uncompressed body: an identical payload is hashed, not
+compressed again. Hit/miss counters are exposed on `/metrics`.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "text/",
+    "application/javascript",
+)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br", "gzip" or None
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    # Highest quality wins; brotli on ties
+    best = max(supported, key=lambda name: accepted.get(name, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+class CompressionCache:
+    """Thread-safe LRU of compressed bodies, bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def stats(self) -> Tuple[int, int]:
+        """(hits, misses), for `metrics_registry.register_cache`."""
+        return self.hits, self.misses
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Return `body` compressed with `encoding`, reusing a cached result if possible."""
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        compressed = _compress(body, encoding)
+        if len(compressed) > self.max_bytes:
+            return compressed
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = compressed
+                self._size += len(compressed)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return compressed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large responses according to Accept-Encoding."""
+
+    def __init__(self, app, minimum_size: int = 1024, cache: Optional[CompressionCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else CompressionCache(8 * 1024 * 1024)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers = start.get("headers", [])
+            content_type = ""
+            already_encoded = False
+            for name, value in response_headers:
+                lowered = name.lower()
+                if lowered == b"content-type":
+                    content_type = value.decode("latin-1")
+                elif lowered == b"content-encoding":
+                    already_encoded = True
+
+            if (message.get("more_body", False) or already_encoded
+                    or len(body) < self.minimum_size
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                # Streaming, small or binary: send as is
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self.cache.compress(body, encoding)
+            kept = [
+                (name, value) for name, value in response_headers
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in response_headers if name.lower() == b"vary"]
+            vary.append(b"Accept-Encoding")
+            kept += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b", ".join(vary)),
+            ]
+            await send({**start, "headers": kept})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -6,9 +6,12 @@ across the API.
 """
 
 from fastapi import HTTPException
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
-from database import Game, Player, Round
-from typing import Optional
+from database import Game, GameEvent, Player, Round, SyncTombstone
+from typing import Iterable, Optional
+
+from .invalidation import invalidate
 
 
 def get_game_or_404(game_id: int, db: Session) -> Game:
@@ -31,6 +34,63 @@ def get_game_or_404(game_id: int, db: Session) -> Game:
     return game
 
 
+def update_game_or_404(
+    game_id: int,
+    db: Session,
+    values: dict,
+    expected_version: Optional[int] = None,
+    where=None,
+    where_error: str = "Game cannot be updated in its current state",
+    event: str = "game_updated"
+) -> Game:
+    """
+    Update a game with a single conditional UPDATE ... RETURNING.
+    
+    The game's version is incremented by every update, and the new values
+    are appended to the game's event log. The caller commits.
+    
+    Args:
+        game_id: The ID of the game to update
+        db: Database session
+        values: Column values (or SQL expressions) to set
+        expected_version: Only update if the game is still at this version
+        where: Extra condition the game must satisfy (e.g. is_active)
+        where_error: Error detail when `where` does not hold
+        event: Kind of the logged event (e.g. "game_finished")
+        
+    Returns:
+        The updated Game object
+        
+    Raises:
+        HTTPException: 404 if game not found, 409 if the version changed,
+            400 if `where` does not hold
+    """
+    stmt = update(Game).where(Game.id == game_id)
+    if expected_version is not None:
+        stmt = stmt.where(Game.version == expected_version)
+    if where is not None:
+        stmt = stmt.where(where)
+    stmt = stmt.values(**values, version=Game.version + 1).returning(Game)
+    
+    game = db.execute(stmt, execution_options={"populate_existing": True}).scalar_one_or_none()
+    if game is not None:
+        add_event(db, game_id, event, {
+            "values": {name: getattr(game, name) for name in [*values, "version"]}
+        })
+        return game
+    
+    # Nothing matched; one more query to report why
+    current_version = db.query(Game.version).filter(Game.id == game_id).scalar()
+    if current_version is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if expected_version is not None and current_version != expected_version:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Game was modified by another client (now at version {current_version})"
+        )
+    raise HTTPException(status_code=400, detail=where_error)
+
+
 def get_player_or_404(player_id: int, db: Session) -> Player:
     """
     Fetch a player by ID or raise 404 if not found.
@@ -87,3 +147,86 @@ def get_player_by_alias(alias: str, db: Session) -> Optional[Player]:
         The Player object or None if not found
     """
     return db.query(Player).filter(Player.alias == alias).first()
+
+
+def dialect_insert(db: Session, model):
+    """
+    INSERT for the session's database, with `on_conflict_do_update` / `_do_nothing`.
+    
+    Args:
+        db: Database session
+        model: Mapped class or table to insert into
+        
+    Returns:
+        Postgres or SQLite insert statement
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+    return insert(model)
+
+
+def upsert_rounds(db: Session):
+    """
+    Build an INSERT ... ON CONFLICT DO UPDATE for round cells.
+    
+    Postgres and SQLite share the syntax but SQLAlchemy exposes it per
+    dialect, so the statement is built for the session's database. Execute
+    it with one dict per cell (bet, success, score plus the cell columns);
+    existing cells get the new bet, success and score.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Insert statement (add `.returning(...)` as needed)
+    """
+    stmt = dialect_insert(db, Round)
+    return stmt.on_conflict_do_update(
+        index_elements=["game_id", "round_number", "player_id"],  # uq_rounds_cell
+        set_={column: stmt.excluded[column] for column in ("bet", "success", "score")}
+    )
+
+
+def add_tombstones(db: Session, entity: str, ids: Iterable[int]) -> None:
+    """
+    Record deleted games or players for `GET /sync`, in the caller's transaction.
+    
+    Args:
+        db: Database session
+        entity: "game" or "player"
+        ids: IDs of the deleted rows
+    """
+    rows = [{"entity": entity, "entity_id": entity_id} for entity_id in ids]
+    if rows:
+        db.execute(insert(SyncTombstone), rows)
+
+
+def add_event(db: Session, game_id: int, kind: str, payload: dict) -> None:
+    """
+    Append an event to a game's log, in the caller's transaction.
+    
+    See services/event_log.py for the event kinds and their payloads. As
+    every change to a game logs an event, this also tells the other
+    workers to drop the game from their caches once the transaction commits.
+    
+    Args:
+        db: Database session
+        game_id: ID of the game
+        kind: Event kind (e.g. "cells_set")
+        payload: JSON-serializable event data
+    """
+    db.execute(insert(GameEvent), [{"game_id": game_id, "kind": kind, "payload": payload}])
+    invalidate(db, "game", game_id)
+
+
+def cell_payload(rows) -> dict:
+    """A "cells_set" payload from round rows or dicts: [round, player, bet, success, score] each."""
+    return {"cells": [
+        [row["round_number"], row["player_id"], row["bet"], row["success"], row["score"]]
+        for row in rows
+    ]}
@@ -0,0 +1,94 @@
+"""
+Sparse fieldsets and include-expansion for list endpoints.
+
+`GET /players?fields=id,alias` returns only the named fields: the service
+selects only those columns and skips lookups for relation fields that were
+not asked for (a player's parent_ids). `include=` adds related aggregates
+computed in the same request, e.g. `GET /players?include=stats` or
+`GET /games?include=participants,stats`, so pages don't need a call per
+row. Without either parameter the endpoints answer exactly as before.
+"""
+
+from typing import List, Optional, Sequence, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def _names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_fields(
+    value: Optional[str],
+    schema: Type[BaseModel],
+    always: Sequence[str] = ("id",)
+) -> Optional[List[str]]:
+    """
+    Parse a `fields=` parameter against a response schema.
+
+    Args:
+        value: Comma-separated field names, or None if not given
+        schema: The route's response model (item type)
+        always: Fields returned even if not requested
+
+    Returns:
+        The requested fields in schema field order, or None for all fields
+
+    Raises:
+        HTTPException: 400 for unknown field names
+    """
+    if value is None:
+        return None
+    allowed = list(schema.model_fields)
+    requested = set(_names(value))
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s) {', '.join(sorted(unknown))}; allowed: {', '.join(allowed)}"
+        )
+    return [name for name in allowed if name in requested or name in always]
+
+
+def parse_include(value: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """
+    Parse an `include=` parameter.
+
+    Args:
+        value: Comma-separated names, or None if not given
+        allowed: Expansions the endpoint supports
+
+    Returns:
+        The requested expansions in `allowed` order (empty if none)
+
+    Raises:
+        HTTPException: 400 for unsupported names
+    """
+    if value is None:
+        return []
+    requested = set(_names(value))
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot include {', '.join(sorted(unknown))}; allowed: {', '.join(allowed)}"
+        )
+    return [name for name in allowed if name in requested]
+
+
+def response_keys(
+    schema: Type[BaseModel],
+    fields: Optional[List[str]],
+    include: Sequence[str]
+) -> Optional[List[str]]:
+    """
+    Keys of the response rows for `negotiated_response`.
+
+    Returns:
+        None if the rows match the schema, else the fields (all of the
+        schema's if not narrowed) followed by the included expansions
+    """
+    if fields is None and not include:
+        return None
+    return list(fields or schema.model_fields) + list(include)
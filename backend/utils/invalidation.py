@@ -0,0 +1,229 @@
+"""
+Cross-process invalidation of in-process caches.
+
+With several API workers, each keeps its own in-process caches (the
+active-game store), and a write handled by one worker must drop the
+matching entries in the others. Services call `invalidate(db, kind, id)`
+in the transaction that changes the entity; the messages are sent only if
+that transaction commits:
+
+- `PostgresInvalidationBus` (the default on Postgres) sends them with
+  NOTIFY inside the transaction, so other workers receive them right after
+  the commit and never for a rollback. A listener thread per worker
+  delivers them to the subscribed caches.
+- `MemoryInvalidationBus` delivers them to peer buses in the same process
+  after the commit: for tests, and a no-op for single-process deployments.
+
+A worker never receives its own messages; it updates its caches directly
+(write-through). Messages are `(kind, entity_id)` pairs, with kinds "game"
+and "player". If the listener loses its connection, messages may have been
+missed, so it delivers `("all", 0)` after reconnecting.
+"""
+
+import logging
+import select
+import threading
+import uuid
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "parvis_invalidate"
+MESSAGES_PER_NOTIFY = 200
+"""Keeps each NOTIFY payload well below Postgres' 8000-byte limit."""
+
+_PENDING_KEY = "invalidations"
+_SENT_KEY = "invalidations_sent"
+
+Message = Tuple[str, int]
+Handler = Callable[[str, int], None]
+
+
+def encode(origin: str, messages: Iterable[Message]) -> str:
+    """A NOTIFY payload: the sender's node ID followed by kind:id pairs."""
+    return " ".join([origin, *(f"{kind}:{entity_id}" for kind, entity_id in messages)])
+
+
+def decode(payload: str) -> Tuple[str, List[Message]]:
+    origin, *pairs = payload.split(" ")
+    messages = []
+    for pair in pairs:
+        kind, _, entity_id = pair.partition(":")
+        messages.append((kind, int(entity_id)))
+    return origin, messages
+
+
+class InvalidationBus:
+    """Delivers invalidation messages committed by other workers to subscribed caches."""
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self._handlers: List[Handler] = []
+
+    def subscribe(self, handler: Handler) -> None:
+        """Call `handler(kind, entity_id)` for every message from another worker."""
+        self._handlers.append(handler)
+
+    def send(self, session: Session, messages: List[Message]) -> None:
+        """Send messages within the session's transaction, just before it commits."""
+
+    def sent(self, messages: List[Message]) -> None:
+        """Called after the transaction that sent `messages` committed."""
+
+    def deliver(self, origin: str, messages: Iterable[Message]) -> None:
+        if origin == self.node_id:
+            return
+        for kind, entity_id in messages:
+            for handler in self._handlers:
+                try:
+                    handler(kind, entity_id)
+                except Exception:
+                    logger.exception("Invalidation handler failed for %s %s", kind, entity_id)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class MemoryInvalidationBus(InvalidationBus):
+    """Bus for workers in one process; buses created with the same `peers` list see each other."""
+
+    def __init__(self, peers: Optional[List["MemoryInvalidationBus"]] = None):
+        super().__init__()
+        self.peers = peers if peers is not None else []
+        self.peers.append(self)
+
+    def sent(self, messages: List[Message]) -> None:
+        for peer in list(self.peers):
+            peer.deliver(self.node_id, messages)
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """Bus across processes through Postgres LISTEN/NOTIFY."""
+
+    def __init__(self, engine: Engine, reconnect_delay: float = 1.0):
+        super().__init__()
+        self.engine = engine
+        self.reconnect_delay = reconnect_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def send(self, session: Session, messages: List[Message]) -> None:
+        for start in range(0, len(messages), MESSAGES_PER_NOTIFY):
+            payload = encode(self.node_id, messages[start:start + MESSAGES_PER_NOTIFY])
+            session.execute(sql_select(func.pg_notify(CHANNEL, payload)))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _listen(self) -> None:
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.exception("Invalidation listener could not connect; retrying")
+                self._stop.wait(self.reconnect_delay)
+                continue
+            try:
+                if connected_before:
+                    # Messages sent while disconnected are lost
+                    self.deliver("", [("all", 0)])
+                connected_before = True
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.deliver(*decode(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Invalidation listener lost its connection; reconnecting")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _connect(self):
+        """A dedicated autocommit psycopg2 connection listening on the channel."""
+        pooled = self.engine.raw_connection()
+        pooled.detach()  # Owned by the listener, never returned to the pool
+        conn = pooled.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+
+_bus: Optional[InvalidationBus] = None
+
+
+def set_invalidation_bus(bus: Optional[InvalidationBus]) -> Optional[InvalidationBus]:
+    """
+    Make `bus` carry the messages of committed transactions.
+
+    Args:
+        bus: The bus, or None to drop messages (the default)
+
+    Returns:
+        The previous bus
+    """
+    global _bus
+    previous, _bus = _bus, bus
+    return previous
+
+
+def invalidate(db: Session, kind: str, entity_id: int) -> None:
+    """
+    Tell the other workers to drop cached state of an entity if this transaction commits.
+
+    Args:
+        db: Session whose transaction changes the entity
+        kind: "game" or "player"
+        entity_id: ID of the entity
+    """
+    if _bus is not None:
+        pending: Set[Message] = db.info.setdefault(_PENDING_KEY, set())
+        pending.add((kind, entity_id))
+
+
+@event.listens_for(Session, "before_commit")
+def _send_pending(session: Session) -> None:
+    messages = session.info.pop(_PENDING_KEY, None)
+    if messages and _bus is not None:
+        messages = sorted(messages)
+        _bus.send(session, messages)
+        session.info[_SENT_KEY] = messages
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_sent(session: Session) -> None:
+    messages = session.info.pop(_SENT_KEY, None)
+    if messages and _bus is not None:
+        _bus.sent(messages)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_SENT_KEY, None)
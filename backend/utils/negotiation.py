@@ -0,0 +1,81 @@
+"""
+Content negotiation for the heavy list endpoints.
+
+Clients sending `Accept: application/msgpack` get the rows as a MessagePack
+array of maps (dates and datetimes as ISO strings, as in JSON), which is
+smaller and cheaper to parse on phones than JSON. msgpack is optional: if it
+is not installed the endpoints answer with JSON.
+"""
+
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Sequence, Type, Union
+
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .fast_json import RowLike, FastJSONResponse, fast_json_response, row_dicts
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def _encode_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as msgpack")
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True if the client asked for MessagePack and it can be produced."""
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return msgpack.packb(content, default=_encode_default, datetime=False)
+
+
+def negotiated_response(
+    request: Request,
+    response: Response,
+    rows: Iterable[RowLike],
+    schema: Type[BaseModel],
+    fast_json: bool = False,
+    fields: Optional[Sequence[str]] = None
+) -> Union[Response, List[RowLike]]:
+    """
+    Encode rows in the format the client accepts.
+
+    Args:
+        request: Incoming request (its Accept header decides the format)
+        response: The route's injected Response, which gets `Vary: Accept`
+            when the rows go through the default path
+        rows: Rows from a column-only select (see `rows_to_json`)
+        schema: The route's response model (item type)
+        fast_json: Encode JSON directly instead of through the response model
+        fields: Keys of the rows if they don't match the schema (sparse
+            fieldsets, included expansions); always encoded directly
+
+    Returns:
+        A MsgpackResponse or FastJSONResponse, or the rows unchanged for
+        FastAPI's default response-model path
+    """
+    if wants_msgpack(request):
+        fields = list(fields or schema.model_fields)
+        return MsgpackResponse(row_dicts(rows, fields), headers={"Vary": "Accept"})
+    if fast_json or fields is not None:
+        encoded = fast_json_response(rows, schema, fields)
+        encoded.headers["Vary"] = "Accept"
+        return encoded
+    response.headers["Vary"] = "Accept"
+    return rows
@@ -0,0 +1,172 @@
+"""
+Selectables over hot and archived rounds.
+
+Round data lives in `rounds` (recent and active games) and `rounds_archive`
+(old finished games). Queries that need every round read from `all_rounds`,
+which unions both with the same columns. Finished games may instead be
+packed into one `packed_rounds` row per player (services/pack_service.py);
+`packed_rounds` selects those rows with the same filters, and
+`round_totals` aggregates all three per game and player.
+
+A packed row's stored totals cover all of its rounds. Where rounds past
+the game's total_rounds must not count, `packed_past_total_rounds` finds
+the games whose packed rows have such rounds, to be totalled from their
+unpacked rounds instead.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, func, select, union_all
+from database import ArchivedRound, Game, PackedRounds, Round
+
+
+def all_rounds(
+    game_id: Optional[int] = None,
+    player_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Build a subquery of rounds from both the hot and archive tables.
+    
+    Filters are pushed into each branch. The date filters apply to the
+    archive's game_date partition key directly, so Postgres prunes archive
+    partitions outside [since, until).
+    
+    Args:
+        game_id: Only rounds of this game
+        player_id: Only rounds of this player
+        since: Only games played at or after this time
+        until: Only games played before this time
+        
+    Returns:
+        Subquery with columns id, game_id, round_number, player_id, bet,
+        success, score
+    """
+    columns = ("id", "game_id", "round_number", "player_id", "bet", "success", "score")
+    
+    hot = select(*(getattr(Round, c) for c in columns))
+    archived = select(*(getattr(ArchivedRound, c) for c in columns))
+    
+    if game_id is not None:
+        hot = hot.where(Round.game_id == game_id)
+        archived = archived.where(ArchivedRound.game_id == game_id)
+    if player_id is not None:
+        hot = hot.where(Round.player_id == player_id)
+        archived = archived.where(ArchivedRound.player_id == player_id)
+    if since is not None or until is not None:
+        hot = hot.join(Game, Game.id == Round.game_id)
+        if since is not None:
+            hot = hot.where(Game.date >= since)
+            archived = archived.where(ArchivedRound.game_date >= since)
+        if until is not None:
+            hot = hot.where(Game.date < until)
+            archived = archived.where(ArchivedRound.game_date < until)
+    
+    return union_all(hot, archived).subquery("all_rounds")
+
+
+def packed_rounds(
+    game_id: Optional[int] = None,
+    player_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Build a select of packed_rounds rows, filtered like `all_rounds`.
+    
+    Args:
+        game_id: Only rows of this game
+        player_id: Only rows of this player
+        since: Only games played at or after this time
+        until: Only games played before this time
+        
+    Returns:
+        Select of PackedRounds columns
+    """
+    query = select(*PackedRounds.__table__.c)
+    if game_id is not None:
+        query = query.where(PackedRounds.game_id == game_id)
+    if player_id is not None:
+        query = query.where(PackedRounds.player_id == player_id)
+    if since is not None or until is not None:
+        query = query.join(Game, Game.id == PackedRounds.game_id)
+        if since is not None:
+            query = query.where(Game.date >= since)
+        if until is not None:
+            query = query.where(Game.date < until)
+    return query
+
+
+def _past_total_rounds(packed):
+    """True for packed rows with rounds past their game's total_rounds (bets hold two bytes per round)."""
+    return func.length(packed.c.bets) > 2 * Game.total_rounds
+
+
+def packed_past_total_rounds(game_ids):
+    """
+    Build a select of packed games with rounds past their total_rounds.
+    
+    Args:
+        game_ids: Only these games (a select of game IDs)
+        
+    Returns:
+        Select of game_id, total_rounds
+    """
+    packed = PackedRounds.__table__
+    return select(Game.id.label("game_id"), Game.total_rounds)\
+        .join(packed, packed.c.game_id == Game.id)\
+        .where(Game.id.in_(game_ids), _past_total_rounds(packed))\
+        .distinct()
+
+
+def round_totals(
+    player_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    game_ids=None,
+    within_total_rounds: bool = False
+):
+    """
+    Build a subquery of per-game, per-player totals over hot, archived and packed rounds.
+    
+    Args:
+        player_id: Only totals of this player
+        since: Only games played at or after this time
+        until: Only games played before this time
+        game_ids: Only these games (a select of game IDs)
+        within_total_rounds: Skip rounds past the game's total_rounds, as
+            game stats do. Packed rows with such rounds are left out; see
+            `packed_past_total_rounds`.
+        
+    Returns:
+        Subquery with columns game_id, player_id, rounds_played,
+        total_score, successful_bets, bet_sum (one row per game and player)
+    """
+    rounds = all_rounds(player_id=player_id, since=since, until=until)
+    packed = packed_rounds(player_id=player_id, since=since, until=until).subquery()
+    
+    hot = select(
+        rounds.c.game_id,
+        rounds.c.player_id,
+        func.count(rounds.c.id).label('rounds_played'),
+        func.sum(rounds.c.score).label('total_score'),
+        func.sum(case((rounds.c.success == True, 1), else_=0)).label('successful_bets'),
+        func.sum(rounds.c.bet).label('bet_sum')
+    ).group_by(rounds.c.game_id, rounds.c.player_id)
+    cold = select(
+        packed.c.game_id, packed.c.player_id, packed.c.rounds_played,
+        packed.c.total_score, packed.c.successful_bets, packed.c.bet_sum
+    )
+    
+    if game_ids is not None:
+        hot = hot.where(rounds.c.game_id.in_(game_ids))
+        cold = cold.where(packed.c.game_id.in_(game_ids))
+    if within_total_rounds:
+        hot = hot.join(Game, Game.id == rounds.c.game_id)\
+            .where(rounds.c.round_number <= Game.total_rounds)
+        cold = cold.join(Game, Game.id == packed.c.game_id)\
+            .where(~_past_total_rounds(packed))
+    
+    return union_all(hot, cold).subquery("round_totals")
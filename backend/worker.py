@@ -0,0 +1,47 @@
+"""
+Run background jobs outside the API process.
+
+Claims jobs from the `jobs` table until interrupted; any number of these
+workers can run next to the API (start the API with PARVIS_JOB_WORKERS=0
+to run jobs only here). With --drain, runs the jobs that are runnable now
+and exits.
+
+Usage (from the backend directory):
+    python -m worker --concurrency 2
+    python -m worker --drain
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from services import JOB_HANDLERS, JobRunner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Jobs run at the same time (default: 1)")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between looks for new jobs when idle (default: 1)")
+    parser.add_argument("--drain", action="store_true",
+                        help="Run the runnable jobs once and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    runner = JobRunner(JOB_HANDLERS, concurrency=args.concurrency, poll_interval=args.poll_interval)
+    if args.drain:
+        print(f"Ran {runner.run_pending()} jobs")
+        return
+
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+    runner.start()
+    stopped.wait()
+    runner.stop()  # Finishes the jobs in progress
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,9 @@ const api = axios.create({
 });
 
 export const playersApi = {
-  getAll: () => api.get('/players'),
+  getAll: (params = {}) => api.get('/players', { params }),
+  // Prefix and typo-tolerant search by alias and names, best matches first
+  search: (q, limit = 50) => api.get('/players/search', { params: { q, limit } }),
   get: (id) => api.get(`/players/${id}`),
   getFamily: (id) => api.get(`/players/${id}/family`),
   create: (data) => api.post('/players', data),
@@ -30,12 +32,17 @@ export const gamesApi = {
   adjustRounds: (id, newTotal) => api.post(`/games/${id}/adjust-rounds`, null, { params: { new_total: newTotal } }),
   incrementRound: (id) => api.post(`/games/${id}/increment-round`),
   getRounds: (id) => api.get(`/games/${id}/rounds`),
+  getMatrix: (id) => api.get(`/games/${id}/matrix`),
   addRound: (id, data) => api.post(`/games/${id}/rounds`, data),
   getStats: (id) => api.get(`/games/${id}/stats`),
   upsertRound: (gameId, roundNumber, playerId, bet, success) => 
     api.post(`/games/${gameId}/rounds/upsert`, null, {
       params: { round_number: roundNumber, player_id: playerId, bet, success }
     }),
+  bufferRound: (gameId, roundNumber, playerId, bet, success) =>
+    api.post(`/games/${gameId}/rounds/buffered`, null, {
+      params: { round_number: roundNumber, player_id: playerId, bet, success }
+    }),
   reactivate: (gameId) => api.post(`/games/${gameId}/reactivate`),
   updateMetadata: (gameId, data) => api.put(`/games/${gameId}/metadata`, null, {
     params: {
@@ -45,4 +52,37 @@ export const gamesApi = {
   }),
 };
 
+export const syncApi = {
+  // Changes after a cursor; keep the returned seq and call again while `more`
+  pull: (since = 0) => api.get('/sync', { params: { since } }),
+  // Replay queued offline edits; each op needs a unique op_id
+  push: (ops) => api.post('/sync', { ops }),
+};
+
+// Server-side limit on sub-requests per POST /batch (PARVIS_BATCH_MAX_REQUESTS)
+const BATCH_MAX_REQUESTS = 25;
+
+/**
+ * Fetch several GET paths with POST /batch instead of one request each.
+ * Resolves to `{ data }` per path, in order, like Promise.all over api.get;
+ * rejects if any sub-request failed.
+ */
+export const batchGet = async (paths) => {
+  const chunks = [];
+  for (let i = 0; i < paths.length; i += BATCH_MAX_REQUESTS) {
+    chunks.push(paths.slice(i, i + BATCH_MAX_REQUESTS));
+  }
+  const results = await Promise.all(chunks.map(chunk =>
+    api.post('/batch', {
+      requests: chunk.map((path, i) => ({ id: String(i), path })),
+    })
+  ));
+  return results.flatMap(res => res.data.responses.map(entry => {
+    if (entry.status >= 400) {
+      throw new Error(`Batched GET failed with ${entry.status}: ${JSON.stringify(entry.body)}`);
+    }
+    return { data: entry.body };
+  }));
+};
+
 export default api;
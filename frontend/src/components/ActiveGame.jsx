@@ -11,7 +11,7 @@ import Leaderboard from './Leaderboard';
  * 
  * @param {Object} game - Active game object
  * @param {Array} gameStats - Player statistics
- * @param {Array} rounds - Round data
+ * @param {Object} matrix - Game matrix (bets, results, totals)
  * @param {Array} chartData - Chart visualization data
  * @param {Function} onRoundUpdate - Handler for round updates
  * @param {Function} onReload - Handler to reload game data
@@ -24,7 +24,7 @@ import Leaderboard from './Leaderboard';
 function ActiveGame({
   game,
   gameStats,
-  rounds,
+  matrix,
   chartData,
   onRoundUpdate,
   onReload,
@@ -52,7 +52,7 @@ function ActiveGame({
       <GameMatrix
         game={game}
         players={gameStats}
-        rounds={rounds}
+        matrix={matrix}
         onRoundsUpdate={onRoundUpdate}
         onReload={onReload}
         onFinishGame={onFinishGame}
@@ -1,6 +1,7 @@
 import React, { useState, useMemo, useCallback, useEffect } from 'react';
 import Tree from 'react-d3-tree';
 import debounce from 'lodash.debounce';
+import { playersApi } from '../api';
 import { buildFamilyTree, convertToD3TreeFormat, getRecentPlayers } from '../utils/familyTree';
 import { getSetting } from '../utils/settings';
 import '../styles/FamilyTreeSelector.css';
@@ -8,6 +9,7 @@ import '../styles/FamilyTreeSelector.css';
 function FamilyTreeSelector({ players, selectedPlayerIds, onSelectionChange }) {
   const [searchTerm, setSearchTerm] = useState('');
   const [debouncedSearchTerm, setDebouncedSearchTerm] = useState('');
+  const [matchingIds, setMatchingIds] = useState(null);
   const [translate, setTranslate] = useState({ x: 0, y: 0 });
   const [dimensions, setDimensions] = useState({ width: 800, height: 600 });
   
@@ -27,6 +29,20 @@ function FamilyTreeSelector({ players, selectedPlayerIds, onSelectionChange }) {
     return () => debouncedSearch.cancel();
   }, [searchTerm, debouncedSearch]);
 
+  // Server-side search (indexed, typo-tolerant); on failure the tree
+  // falls back to matching the loaded players locally
+  useEffect(() => {
+    setMatchingIds(null);
+    if (!debouncedSearchTerm.trim()) return;
+    let cancelled = false;
+    playersApi.search(debouncedSearchTerm.trim(), 100)
+      .then(response => {
+        if (!cancelled) setMatchingIds(new Set(response.data.map(p => p.id)));
+      })
+      .catch(error => console.error('Player search failed:', error));
+    return () => { cancelled = true; };
+  }, [debouncedSearchTerm]);
+
   // Build tree data
   const treeData = useMemo(() => {
     if (!players || players.length === 0) {
@@ -48,14 +64,14 @@ function FamilyTreeSelector({ players, selectedPlayerIds, onSelectionChange }) {
     }
     
     // Build full tree with all players, then filter to show only selected IDs
-    const familyTree = buildFamilyTree(players, debouncedSearchTerm, idsToShow);
+    const familyTree = buildFamilyTree(players, debouncedSearchTerm, idsToShow, matchingIds);
     console.log('Family tree built:', familyTree);
     
     const d3Tree = convertToD3TreeFormat(familyTree);
     console.log('D3 tree data:', d3Tree);
     
     return d3Tree;
-  }, [players, debouncedSearchTerm, displayNodes]);
+  }, [players, debouncedSearchTerm, displayNodes, matchingIds]);
 
   // Handle node click
   const handleNodeClick = useCallback((nodeData) => {
@@ -1,12 +1,13 @@
 import React, { useState } from 'react';
 import { getSetting } from '../utils/settings';
 import { gamesApi } from '../api';
+import { readMatrix } from '../utils/matrix';
 import '../styles/GameMatrix.css';
 
 function GameMatrix({ 
   game, 
   players, 
-  rounds, 
+  matrix: gameMatrix, 
   onRoundsUpdate,
   onReload,
   onFinishGame
@@ -15,7 +16,9 @@ function GameMatrix({
   const [editingCell, setEditingCell] = useState(null);
   const [editValue, setEditValue] = useState('');
   
-  // Build matrix from rounds data
+  const reader = React.useMemo(() => readMatrix(gameMatrix), [gameMatrix]);
+
+  // Cells in display order (players as listed in game stats)
   const matrix = React.useMemo(() => {
     if (!players || players.length === 0) {
       return [];
@@ -23,31 +26,19 @@ function GameMatrix({
     
     const m = [];
     for (let r = 0; r < game.total_rounds; r++) {
-      const row = [];
-      for (let p = 0; p < players.length; p++) {
-        const round = rounds.find(
-          rd => rd.round_number === r + 1 && rd.player_id === players[p].player_id
-        );
-        row.push({
-          round: r + 1,
-          playerId: players[p].player_id,
-          bet: round?.bet ?? null,
-          success: round?.success ?? false,
-          score: round?.score ?? null
-        });
-      }
-      m.push(row);
+      m.push(players.map(player => ({
+        round: r + 1,
+        playerId: player.player_id,
+        ...reader.cell(r + 1, player.player_id)
+      })));
     }
     return m;
-  }, [rounds, players, game.total_rounds]);
+  }, [reader, players, game.total_rounds]);
 
-  // Calculate totals
+  // Totals are precomputed by the backend
   const totals = React.useMemo(() => {
-    return players.map(player => {
-      const playerRounds = rounds.filter(r => r.player_id === player.player_id);
-      return playerRounds.reduce((sum, r) => sum + (r.score || 0), 0);
-    });
-  }, [rounds, players]);
+    return players.map(player => reader.total(player.player_id));
+  }, [reader, players]);
 
   const handleNextRound = async () => {
     if (!game || game.current_round >= game.total_rounds) return;
@@ -1,39 +1,38 @@
 import { useMemo } from 'react';
+import { readMatrix } from '../utils/matrix';
 
 /**
- * Custom hook for calculating chart data from game stats and rounds.
+ * Custom hook for calculating chart data from game stats and the game matrix.
  * 
  * Builds cumulative score data for each round to display on line chart.
  * 
  * @param {Array} gameStats - Array of player statistics
- * @param {Array} rounds - Array of round data
+ * @param {Object} matrix - Game matrix (GET /games/{id}/matrix)
  * @param {Object} activeGame - Current active game
  * @returns {Array} Chart data formatted for Recharts LineChart
  */
-export function useChartData(gameStats, rounds, activeGame) {
+export function useChartData(gameStats, matrix, activeGame) {
   return useMemo(() => {
-    if (!gameStats?.length || !rounds?.length || !activeGame) {
+    if (!gameStats?.length || !matrix || !activeGame) {
       return [];
     }
 
+    const reader = readMatrix(matrix);
+    const running = gameStats.map(() => 0);
     const data = [];
 
     // Build cumulative scores for each round
     for (let i = 1; i <= activeGame.total_rounds; i++) {
       const point = { round: i };
       
-      gameStats.forEach(stat => {
-        // Sum all scores up to this round for this player
-        const cumulativeScore = rounds
-          .filter(r => r.player_id === stat.player_id && r.round_number <= i)
-          .reduce((sum, r) => sum + (r.score || 0), 0);
-        
-        point[stat.player_alias] = cumulativeScore;
+      gameStats.forEach((stat, idx) => {
+        running[idx] += reader.cell(i, stat.player_id).score || 0;
+        point[stat.player_alias] = running[idx];
       });
       
       data.push(point);
     }
 
     return data;
-  }, [rounds, gameStats, activeGame]);
+  }, [matrix, gameStats, activeGame]);
 }
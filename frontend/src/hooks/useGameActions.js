@@ -17,14 +17,8 @@ export function useGameActions(activeGame, loadGameData, clearGame, navigate) {
    */
   const createGame = useCallback(async (gameData) => {
     try {
-      const res = await gamesApi.create(gameData);
-      
-      // Initialize Round 1 with bet=0 for all players
-      await Promise.all(
-        gameData.player_ids.map(playerId =>
-          gamesApi.upsertRound(res.data.id, 1, playerId, 0, false)
-        )
-      );
+      // Round 1 is initialized with bet=0 for all players server-side
+      const res = await gamesApi.create({ ...gameData, seed_first_round: true });
       
       // Load game data
       await loadGameData(res.data.id);
@@ -1,5 +1,5 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
-import { gamesApi, playersApi } from '../api';
+import { gamesApi, playersApi, batchGet } from '../api';
 
 /**
  * Custom hook for managing game state and data loading.
@@ -7,7 +7,7 @@ import { gamesApi, playersApi } from '../api';
  * Handles:
  * - Loading all players
  * - Loading active game
- * - Loading game details (rounds, stats)
+ * - Loading game details (matrix, stats)
  * - Preventing duplicate loads
  * 
  * @param {Object} location - React Router location object (optional, for reload detection)
@@ -21,25 +21,25 @@ export function useGameState(location = null) {
   
   // Active game data
   const [activeGame, setActiveGame] = useState(null);
-  const [rounds, setRounds] = useState([]);
+  const [matrix, setMatrix] = useState(null);
   const [gameStats, setGameStats] = useState([]);
   
   // Loading state
   const [loading, setLoading] = useState(true);
 
   /**
-   * Load game-specific data (rounds, stats).
+   * Load game-specific data (matrix, stats).
    */
   const loadGameData = useCallback(async (gameId) => {
     try {
-      const [gameRes, roundsRes, statsRes] = await Promise.all([
-        gamesApi.get(gameId),
-        gamesApi.getRounds(gameId),
-        gamesApi.getStats(gameId)
+      const [gameRes, matrixRes, statsRes] = await batchGet([
+        `/games/${gameId}`,
+        `/games/${gameId}/matrix`,
+        `/games/${gameId}/stats`
       ]);
       
       setActiveGame(gameRes.data);
-      setRounds(roundsRes.data);
+      setMatrix(matrixRes.data);
       setGameStats(statsRes.data);
     } catch (error) {
       console.error('Error loading game data:', error);
@@ -73,7 +73,7 @@ export function useGameState(location = null) {
         await loadGameData(game.id);
       } else {
         setActiveGame(null);
-        setRounds([]);
+        setMatrix(null);
         setGameStats([]);
       }
     } catch (error) {
@@ -89,7 +89,7 @@ export function useGameState(location = null) {
    */
   const clearGame = useCallback(() => {
     setActiveGame(null);
-    setRounds([]);
+    setMatrix(null);
     setGameStats([]);
   }, []);
 
@@ -109,7 +109,7 @@ export function useGameState(location = null) {
     // State
     players,
     activeGame,
-    rounds,
+    matrix,
     gameStats,
     loading,
     
@@ -118,7 +118,7 @@ export function useGameState(location = null) {
     loadGameData,
     clearGame,
     setActiveGame,
-    setRounds,
+    setMatrix,
     setGameStats,
   };
 }
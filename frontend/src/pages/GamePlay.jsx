@@ -19,7 +19,7 @@ function GamePlay() {
   const {
     players,
     activeGame,
-    rounds,
+    matrix,
     gameStats,
     loading,
     loadGameData,
@@ -36,7 +36,7 @@ function GamePlay() {
     editMetadata,
   } = useGameActions(activeGame, loadGameData, clearGame, navigate);
 
-  const chartData = useChartData(gameStats, rounds, activeGame);
+  const chartData = useChartData(gameStats, matrix, activeGame);
   
   // New game form state
   const [selectedPlayers, setSelectedPlayers] = useState([]);
@@ -91,7 +91,7 @@ function GamePlay() {
         <ActiveGame
           game={activeGame}
           gameStats={gameStats}
-          rounds={rounds}
+          matrix={matrix}
           chartData={chartData}
           onRoundUpdate={updateRound}
           onReload={() => loadGameData(activeGame.id)}
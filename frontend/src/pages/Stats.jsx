@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, LineChart, Line, Legend } from 'recharts';
-import { playersApi, gamesApi } from '../api';
+import { playersApi, gamesApi, batchGet } from '../api';
 import { getSetting } from '../utils/settings';
 import { useNavigate, useLocation } from 'react-router-dom';
 
@@ -77,22 +77,21 @@ function Stats() {
 
   const loadPlayers = async () => {
     try {
-      const res = await playersApi.getAll();
+      // Career totals come along with the players, so no stats call per player
+      const res = await playersApi.getAll({ include: 'stats' });
       setPlayers(res.data);
       
       if (res.data.length > 0) {
-        // Fetch stats for all players to find highest win rate
-        const statsPromises = res.data.map(p => playersApi.getStats(p.id));
-        const statsResults = await Promise.all(statsPromises);
-        
         // Find player with highest win rate
         let highestWinRatePlayer = res.data[0];
         let highestWinRate = -1;
         
-        statsResults.forEach((result, idx) => {
-          if (result.data.win_rate > highestWinRate) {
-            highestWinRate = result.data.win_rate;
-            highestWinRatePlayer = res.data[idx];
+        res.data.forEach(player => {
+          const { total_rounds, successful_bets } = player.stats;
+          const winRate = total_rounds > 0 ? successful_bets / total_rounds * 100 : 0;
+          if (winRate > highestWinRate) {
+            highestWinRate = winRate;
+            highestWinRatePlayer = player;
           }
         });
         
@@ -116,11 +115,12 @@ function Stats() {
 
     try {
       // Fetch stats for all selected players
-      const statsPromises = playerIds.map(id => playersApi.getStats(id));
-      const distPromises = playerIds.map(id => playersApi.getBetDistribution(id));
-      
-      const statsResults = await Promise.all(statsPromises);
-      const distResults = await Promise.all(distPromises);
+      const results = await batchGet(playerIds.flatMap(id => [
+        `/players/${id}/stats`,
+        `/players/${id}/bet-distribution`
+      ]));
+      const statsResults = results.filter((_, i) => i % 2 === 0);
+      const distResults = results.filter((_, i) => i % 2 === 1);
       
       // Combine stats
       const combinedStats = {
@@ -178,10 +178,10 @@ function Stats() {
     }
 
     try {
-      const [gameRes, statsRes, roundsRes] = await Promise.all([
-        gamesApi.get(gameId),
-        gamesApi.getStats(gameId),
-        gamesApi.getRounds(gameId)
+      const [gameRes, statsRes, roundsRes] = await batchGet([
+        `/games/${gameId}`,
+        `/games/${gameId}/stats`,
+        `/games/${gameId}/rounds`
       ]);
       
       setGameDetails(gameRes.data);
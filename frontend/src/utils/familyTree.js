@@ -4,9 +4,11 @@
  * @param {Array} players - All players (needed for building complete relationships)
  * @param {string} searchTerm - Optional search filter
  * @param {Set} idsToShow - Set of player IDs to show (when not searching)
+ * @param {Set} matchingIds - IDs matching searchTerm (from GET /players/search);
+ *   without it, players are matched locally by substring
  */
 
-export const buildFamilyTree = (players, searchTerm = '', idsToShow = null) => {
+export const buildFamilyTree = (players, searchTerm = '', idsToShow = null, matchingIds = null) => {
   if (!players || players.length === 0) return [];
   
   // Create lookup map with ALL players (so relationships work)
@@ -51,15 +53,17 @@ export const buildFamilyTree = (players, searchTerm = '', idsToShow = null) => {
   
   // If searching, show matching nodes and their families
   if (searchTerm) {
-    const filteredPlayers = players.filter(p => 
-      p.alias.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      (p.first_name && p.first_name.toLowerCase().includes(searchTerm.toLowerCase())) ||
-      (p.last_name && p.last_name.toLowerCase().includes(searchTerm.toLowerCase()))
-    );
+    if (!matchingIds) {
+      const filteredPlayers = players.filter(p => 
+        p.alias.toLowerCase().includes(searchTerm.toLowerCase()) ||
+        (p.first_name && p.first_name.toLowerCase().includes(searchTerm.toLowerCase())) ||
+        (p.last_name && p.last_name.toLowerCase().includes(searchTerm.toLowerCase()))
+      );
+      matchingIds = new Set(filteredPlayers.map(p => p.id));
+    }
     
-    if (filteredPlayers.length === 0) return [];
+    if (matchingIds.size === 0) return [];
     
-    const matchingIds = new Set(filteredPlayers.map(p => p.id));
     const relevantIds = new Set();
     
     // Add all ancestors and descendants of matching nodes
@@ -0,0 +1,35 @@
+/**
+ * Read access to the dense game matrix from GET /games/{id}/matrix.
+ *
+ * The matrix holds bets as a rounds x players array (columns in
+ * `player_ids` order), results as a base64 bitmap and per-player totals.
+ * Cell scores are derived with the response's `success_base_score`.
+ *
+ * @param {Object} matrix - Matrix response (may be null while loading)
+ * @returns {Object} { cell(roundNumber, playerId), total(playerId) }
+ */
+export function readMatrix(matrix) {
+  const columns = new Map((matrix?.player_ids || []).map((id, i) => [id, i]));
+  const bits = matrix?.success
+    ? Uint8Array.from(atob(matrix.success), c => c.charCodeAt(0))
+    : new Uint8Array(0);
+
+  const cell = (roundNumber, playerId) => {
+    const column = columns.get(playerId);
+    const bet = column === undefined ? null : (matrix.bets[roundNumber - 1]?.[column] ?? null);
+    if (bet === null) {
+      return { bet: null, success: false, score: null };
+    }
+    const bit = (roundNumber - 1) * columns.size + column;
+    const success = (bits[bit >> 3] & (1 << (bit & 7))) !== 0;
+    // The backend's calculate_score, with its constant from the response
+    return { bet, success, score: success ? matrix.success_base_score + bet : 0 };
+  };
+
+  const total = (playerId) => {
+    const column = columns.get(playerId);
+    return column === undefined ? 0 : matrix.totals[column];
+  };
+
+  return { cell, total };
+}